@@ -0,0 +1,292 @@
+"""
+Versioned JSON API for Byte-Sized Business Boost
+
+Every GET response carries an ETag and a Last-Modified header derived from
+the data version of what it returns. Versions are the store's mutation
+sequence numbers, so every worker process sharing the store (and the same
+process after a restart) gives the same data the same ETag. A client that
+sends the ETag back in If-None-Match gets an empty 304 reply without the
+response body ever being built. If-Modified-Since is not honored: Last-Modified only has one-second
+resolution, so a change within the same second would look unmodified.
+"""
+
+import functools
+from datetime import datetime, timezone
+from typing import Callable, Dict
+
+from flask import Blueprint, current_app, jsonify, request, session, url_for
+
+from geo_index import distance_km, parse_near, valid_coordinates
+from models import Business, BusinessBoost
+from pagination import (Page, ordered_reach, paginate_list, paginate_ordered, paginate_subset, paginate_view,
+                        parse_per_page)
+
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+_STARTED_AT = datetime.now(timezone.utc)
+
+
+def _boost() -> BusinessBoost:
+    return current_app.extensions['business_boost']
+
+
+def _reading(view):
+    """Run a view while holding the data's read lock, so it sees one consistent state."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        with _boost().lock.read():
+            return view(*args, **kwargs)
+    return wrapper
+
+
+def _error(message: str, status: int):
+    return jsonify({'error': message}), status
+
+
+def _conditional(tag: str, last_modified: datetime, build: Callable[[], Dict]):
+    """Answer 304 if the client's ETag is current, otherwise build and send the body."""
+    if request.if_none_match.contains_weak(tag):
+        response = current_app.response_class(status=304)
+    else:
+        response = jsonify(build())
+    response.set_etag(tag, weak=True)
+    response.last_modified = last_modified
+    # Let clients cache, but make them revalidate every time
+    response.cache_control.no_cache = True
+    return response
+
+
+def _business_summary(business: Business) -> Dict:
+    return {
+        'id': business.id,
+        'name': business.name,
+        'category': business.category,
+        'address': business.address,
+        'phone': business.phone,
+        'average_rating': round(business.get_average_rating(), 2),
+        'review_count': business.get_review_count(),
+        'deal_count': len(business.deals),
+        'latitude': business.latitude,
+        'longitude': business.longitude,
+        'url': url_for('api.get_business', business_id=business.id, _external=True)
+    }
+
+
+def _business_detail(business: Business) -> Dict:
+    detail = _business_summary(business)
+    detail.update({
+        'description': business.description,
+        'deals': business.deals,
+        'rating_histogram': {str(stars): count for stars, count in business.get_rating_histogram().items()},
+        'created_at': business.created_at,
+        'reviews_url': url_for('api.list_reviews', business_id=business.id, _external=True)
+    })
+    return detail
+
+
+def _page_info(page: Page) -> Dict:
+    return {
+        'total': page.total,
+        'per_page': page.per_page,
+        'next_cursor': page.next_cursor,
+        'prev_cursor': page.prev_cursor
+    }
+
+
+def _verification_error():
+    """Check the answer to the question issued by /get_verification, as the web forms do."""
+    data = request.get_json(silent=True) or {}
+    if 'review_verification_answer' not in session:
+        return _error('Request a verification question from /get_verification first.', 403)
+    expected = str(session.pop('review_verification_answer'))
+    if str(data.get('verification_answer', '')).strip() != expected:
+        return _error('Verification failed.', 403)
+    return None
+
+
+@api.route('/businesses', methods=['GET'])
+@_reading
+def list_businesses():
+    """List businesses with the same search, category, location and sort options as the home page."""
+    boost = _boost()
+    search = request.args.get('q', '').strip()
+    category = request.args.get('category', '').strip()
+    near = None
+    if request.args.get('near'):
+        try:
+            near = parse_near(request.args['near'], request.args.get('radius', ''))
+        except ValueError as e:
+            return _error(f'{str(e).capitalize()}.', 400)
+    sort_by = request.args.get('sort', 'distance' if near else 'name')
+    cursor = request.args.get('cursor')
+    per_page = parse_per_page(request.args.get('per_page'))
+
+    def build():
+        if not search and not near:
+            # Every business, or one category, straight from its sorted view
+            page = paginate_view(boost.get_sorted_view(sort_by, category), cursor, per_page)
+        elif sort_by == 'relevance' and search:
+            # Only rank as many matches as it takes to reach the requested page
+            businesses = boost.search_ranked(search, ordered_reach(cursor, per_page), category, near)
+            page = paginate_ordered(businesses, cursor, per_page, boost.count_ranked(search, category, near))
+        else:
+            businesses = boost.filter_businesses(search, category, near=near)
+            if near and sort_by == 'distance':
+                page = paginate_ordered(businesses, cursor, per_page)
+            else:
+                page = paginate_subset(boost.get_sorted_view(sort_by), businesses, cursor, per_page)
+        summaries = [_business_summary(b) for b in page.items]
+        if near:
+            for summary, business in zip(summaries, page.items):
+                summary['distance_km'] = round(distance_km(near[0], near[1], business.latitude,
+                                                           business.longitude), 3)
+        return {'businesses': summaries, **_page_info(page)}
+
+    return _conditional(f"all-{boost.data_version}", boost.last_modified, build)
+
+
+@api.route('/businesses', methods=['POST'])
+def create_business():
+    """Add a business from a JSON body."""
+    error = _verification_error()
+    if error:
+        return error
+
+    data = request.get_json(silent=True) or {}
+    name = str(data.get('name', '')).strip()
+    category = str(data.get('category', '')).strip()
+    address = str(data.get('address', '')).strip()
+    if not name or not category or not address:
+        return _error('Name, category, and address are required.', 400)
+
+    deals = data.get('deals') or []
+    if not isinstance(deals, list) or not all(isinstance(d, dict) for d in deals):
+        return _error('Deals must be a list of objects.', 400)
+    deals = [{'title': str(d.get('title', '')), 'description': str(d.get('description', '')),
+              'expires': str(d.get('expires', ''))} for d in deals]
+
+    latitude, longitude = data.get('latitude'), data.get('longitude')
+    if latitude is not None or longitude is not None:
+        if isinstance(latitude, bool) or isinstance(longitude, bool) or not valid_coordinates(latitude, longitude):
+            return _error('Latitude and longitude must both be given and on the map.', 400)
+        latitude, longitude = float(latitude), float(longitude)
+
+    boost = _boost()
+    business = boost.add_business(name, category, address, str(data.get('phone', '')).strip(),
+                                  str(data.get('description', '')).strip(), deals,
+                                  latitude=latitude, longitude=longitude)
+    with boost.lock.read():
+        response = jsonify(_business_detail(business))
+    response.status_code = 201
+    response.headers['Location'] = url_for('api.get_business', business_id=business.id, _external=True)
+    return response
+
+
+@api.route('/businesses/<business_id>', methods=['GET'])
+@_reading
+def get_business(business_id):
+    """Show one business."""
+    business = _boost().find_business_by_id(business_id)
+    if not business:
+        return _error('Business not found.', 404)
+    return _conditional(f"{business.id}-{business.version}", business.updated_at or _STARTED_AT,
+                        lambda: _business_detail(business))
+
+
+@api.route('/businesses/<business_id>/reviews', methods=['GET'])
+@_reading
+def list_reviews(business_id):
+    """List a business's reviews, newest first."""
+    business = _boost().find_business_by_id(business_id)
+    if not business:
+        return _error('Business not found.', 404)
+
+    cursor = request.args.get('cursor')
+    per_page = parse_per_page(request.args.get('per_page'))
+
+    def build():
+        # Newest first, keyed by each review's original position (negated) so
+        # cursors still point at the same reviews after new ones arrive
+        reviews = list(reversed(business.reviews))
+        keys = [(position - len(reviews) + 1,) for position in range(len(reviews))]
+        page = paginate_list(reviews, keys, cursor, per_page)
+        return {'reviews': [dict(r) for r in page.items], **_page_info(page)}
+
+    return _conditional(f"{business.id}-{business.version}", business.updated_at or _STARTED_AT, build)
+
+
+@api.route('/businesses/<business_id>/reviews', methods=['POST'])
+def create_review(business_id):
+    """Add a review from a JSON body."""
+    boost = _boost()
+    if not boost.find_business_by_id(business_id):
+        return _error('Business not found.', 404)
+
+    error = _verification_error()
+    if error:
+        return error
+
+    data = request.get_json(silent=True) or {}
+    user_name = str(data.get('user_name', '')).strip()
+    if not user_name:
+        return _error('Please enter your name.', 400)
+    rating = data.get('rating')
+    # JSON true is an int to Python, and int() would quietly truncate 4.7
+    if not isinstance(rating, int) or isinstance(rating, bool):
+        return _error('Invalid rating.', 400)
+    # Hold the write lock across both steps so reviews[-1] is this request's review
+    with boost.lock.write():
+        if not boost.add_review(business_id, user_name, rating, str(data.get('comment', '')).strip()):
+            return _error('Rating must be between 1 and 5.', 400)
+        # Look the business up again under the lock; the one found above may be stale
+        response = jsonify(dict(boost.find_business_by_id(business_id).reviews[-1]))
+    response.status_code = 201
+    return response
+
+
+@api.route('/categories', methods=['GET'])
+@_reading
+def list_categories():
+    """List categories with the number of businesses in each."""
+    boost = _boost()
+    return _conditional(f"all-{boost.data_version}", boost.last_modified,
+                        lambda: {'categories': boost.get_category_counts()})
+
+
+@api.route('/favorites', methods=['GET'])
+@_reading
+def list_favorites():
+    """List the session user's favorite businesses."""
+    username = session.get('username')
+    if not username:
+        return _error('Set a username first.', 401)
+
+    boost = _boost()
+    cursor = request.args.get('cursor')
+    per_page = parse_per_page(request.args.get('per_page'))
+
+    def build():
+        page = paginate_ordered(boost.get_favorites(username), cursor, per_page)
+        return {'businesses': [_business_summary(b) for b in page.items], **_page_info(page)}
+
+    response = _conditional(f"all-{boost.data_version}", boost.last_modified, build)
+    response.vary.add('Cookie')
+    return response
+
+
+@api.route('/favorites/<business_id>', methods=['PUT', 'DELETE'])
+def update_favorite(business_id):
+    """Add (PUT) or remove (DELETE) a business from the session user's favorites."""
+    username = session.get('username')
+    if not username:
+        return _error('Set a username first.', 401)
+
+    boost = _boost()
+    if request.method == 'PUT':
+        if not boost.find_business_by_id(business_id):
+            return _error('Business not found.', 404)
+        boost.add_to_favorites(username, business_id)
+    else:
+        boost.remove_from_favorites(username, business_id)
+    return '', 204
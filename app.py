@@ -13,77 +13,215 @@ from datetime import datetime
 from typing import Dict, List, Optional
 
 app = Flask(__name__)
-app.secret_key = os.urandom(24).hex()  # Generate a secret key for sessions
+# Generate a secret key for sessions; set SECRET_KEY when running several
+# worker processes so that every worker accepts the same session cookies
+app.secret_key = os.environ.get('SECRET_KEY') or os.urandom(24).hex()
 
 # Import business models
+from geo_index import distance_km, parse_near, parse_point
 from models import Business, BusinessBoost
+from page_cache import PageCache
+from pagination import Page, ordered_reach, paginate_ordered, paginate_subset, paginate_view, parse_per_page
 
-# Initialize the business boost system
-business_boost = BusinessBoost()
+
+def report_load_progress(done: int, total: int):
+    """Show how far startup has got through a data file large enough to take a while."""
+    if total >= 64 * 1024 * 1024:
+        print(f"\rLoading data: {done * 100 // total}%", end="\n" if done >= total else "", flush=True)
+
+
+# Initialize the business boost system; mutations are journaled so a review
+# or favorite toggle appends one record instead of rewriting the whole file.
+# The store is shared, so any number of worker processes can serve the app.
+# LAZY_REVIEWS=1 keeps reviews out of the snapshot and loads them on demand
+# (the original CLI cannot read that layout).
+business_boost = BusinessBoost(journal=True, shared=True,
+                               lazy_reviews=os.environ.get('LAZY_REVIEWS') == '1',
+                               load_progress=report_load_progress)
+app.extensions['business_boost'] = business_boost
+
+# Rendered business listings, shared by every visitor. The navbar and flash
+# messages are rendered per request around the cached part.
+page_cache = PageCache(max_bytes=32 * 1024 * 1024)
+
+# Query arguments the listing pages read; anything else is left out of the cache key
+LISTING_ARGS = ('search', 'category', 'sort', 'cursor', 'per_page', 'near', 'radius')
+
+
+def invalidate_pages(op: str, business: Optional[Business], categories_changed: bool):
+    """Drop the cached listings a mutation affects."""
+    if op == 'reload':
+        page_cache.clear()
+        return
+    if business is None:
+        return  # favorites are not part of any cached listing
+    page_cache.invalidate('all')
+    page_cache.invalidate(f'category:{business.category}')
+    if op in ('add_business', 'remove_business'):
+        page_cache.invalidate('counts')
+    if categories_changed:
+        page_cache.invalidate('categories')
+
+
+business_boost.add_listener(invalidate_pages)
+
+
+@app.before_request
+def refresh_data():
+    """Pick up changes other worker processes made to the shared data file."""
+    business_boost.refresh()
+
+# Versioned JSON API
+from api import api
+app.register_blueprint(api)
+
+# Caching OpenStreetMap proxy for the GitHub Pages front end. The upstream
+# URLs can be pointed at a local stub server for testing.
+from geo_proxy import GeoProxy, NOMINATIM_URL, OVERPASS_URL, geo
+app.extensions['geo_proxy'] = GeoProxy(cache_dir=os.environ.get('GEO_CACHE_DIR', 'geo_cache'),
+                                       ttl=float(os.environ.get('GEO_CACHE_TTL', 86400)),
+                                       overpass_url=os.environ.get('OVERPASS_URL', OVERPASS_URL),
+                                       nominatim_url=os.environ.get('NOMINATIM_URL', NOMINATIM_URL))
+app.register_blueprint(geo)
+
+
+def paginate_businesses(sort_by: str, businesses: Optional[List[Business]] = None,
+                        limit: Optional[int] = None, category: str = '') -> Page:
+    """Page through businesses in sorted-view order using the request's cursor.
+    
+    Without a list of businesses the page comes straight from the sorted view of
+    every business, or of just one category.
+    """
+    cursor = request.args.get('cursor')
+    per_page = parse_per_page(request.args.get('per_page'))
+    view = business_boost.get_sorted_view(sort_by, category)
+    if businesses is None:
+        return paginate_view(view, cursor, per_page, limit)
+    return paginate_subset(view, businesses, cursor, per_page)
+
+
+def paginate_ranked(businesses: List[Business], total: Optional[int] = None) -> Page:
+    """Page through a list that is already in display order (e.g. search rank).
+    
+    businesses may be just the start of a listing of total businesses, as
+    long as it reaches as far as the requested page (see ranked_limit).
+    """
+    cursor = request.args.get('cursor')
+    per_page = parse_per_page(request.args.get('per_page'))
+    return paginate_ordered(businesses, cursor, per_page, total)
+
+
+def ranked_limit() -> Optional[int]:
+    """How many of the best search matches the request's page needs ranked (None for all)."""
+    return ordered_reach(request.args.get('cursor'), parse_per_page(request.args.get('per_page')))
+
+
+def listing_args() -> Dict[str, str]:
+    """Get the non-empty listing arguments of the current request."""
+    return {key: value for key, value in request.args.items() if key in LISTING_ARGS and value}
+
+
+@app.template_global()
+def page_url(cursor: str) -> str:
+    """Build a link to another page of the current listing."""
+    args = listing_args()
+    args['cursor'] = cursor
+    return url_for(request.endpoint, **(request.view_args or {}), **args)
+
+
+def render_listing(page_title: Optional[str], tags: List[str], build) -> str:
+    """Render a business listing page, reusing the cached listing when there is one.
+    
+    build() does the filtering and sorting and returns the template context for
+    _listing.html; it only runs on a cache miss. The cache key is the route plus
+    its normalized query arguments, and tags say which mutations evict the entry.
+    """
+    key = (request.endpoint,
+           tuple(sorted((request.view_args or {}).items())),
+           tuple(sorted(listing_args().items())))
+    # Filter, sort and render against one consistent state of the data
+    with business_boost.lock.read():
+        listing = page_cache.fetch(key, tags,
+                                   lambda: render_template('_listing.html', page_title=page_title, **build()))
+    
+    return render_template('index.html',
+                         listing=listing,
+                         page_title=page_title,
+                         username=session.get('username', ''))
 
 
 @app.route('/')
 def index():
     """Home page - show all businesses."""
     category = request.args.get('category', '')
-    sort_by = request.args.get('sort', 'name')
     search = request.args.get('search', '')
+    near = None
+    if request.args.get('near'):
+        try:
+            near = parse_near(request.args['near'], request.args.get('radius', ''))
+        except ValueError as e:
+            flash(f'{str(e).capitalize()}.', 'error')
+    sort_by = request.args.get('sort', 'distance' if near else 'name')
     
-    businesses = business_boost.businesses
-    
-    # Filter by category
-    if category:
-        businesses = business_boost.get_businesses_by_category(category)
-    
-    # Search filter
-    if search:
-        search_lower = search.lower()
-        businesses = [
-            b for b in businesses
-            if search_lower in b.name.lower() or 
-               search_lower in b.category.lower() or 
-               search_lower in b.address.lower()
-        ]
+    def build():
+        # Sort and paginate (relevance and distance results are already in order);
+        # reviewed businesses come first in the rating order since unreviewed ones average 0
+        if not search and not near:
+            # Every business, or one category, straight from its sorted view
+            page = paginate_businesses(sort_by, category=category)
+        elif sort_by == 'relevance' and search:
+            # Only rank as many matches as it takes to reach the requested page
+            businesses = business_boost.search_ranked(search, ranked_limit(), category, near)
+            page = paginate_ranked(businesses, business_boost.count_ranked(search, category, near))
+        else:
+            businesses = business_boost.filter_businesses(search, category, near=near)
+            if sort_by == 'distance' and near:
+                page = paginate_ranked(businesses)
+            else:
+                page = paginate_businesses(sort_by, businesses)
+        
+        distances = {}
+        if near:
+            distances = {b.id: distance_km(near[0], near[1], b.latitude, b.longitude) for b in page.items}
+        return dict(businesses=page.items,
+                    page=page,
+                    distances=distances,
+                    near_query=request.args.get('near', ''),
+                    radius=request.args.get('radius', ''),
+                    categories=business_boost.get_all_categories(),
+                    category_counts=business_boost.get_category_counts(),
+                    current_category=category,
+                    current_sort=sort_by,
+                    search_query=search)
     
-    # Sort businesses
-    if sort_by == 'rating':
-        businesses = sorted(businesses, key=lambda b: b.get_average_rating(), reverse=True)
-        businesses = [b for b in businesses if b.get_review_count() > 0] + [b for b in businesses if b.get_review_count() == 0]
-    elif sort_by == 'reviews':
-        businesses = sorted(businesses, key=lambda b: b.get_review_count(), reverse=True)
+    # A plain category listing only changes with that category, its sidebar
+    # counts and the category list; anything else (including relevance scores,
+    # which use corpus-wide statistics) can change with any business
+    if category and not (search and sort_by == 'relevance'):
+        tags = [f'category:{category.lower()}', 'categories', 'counts']
     else:
-        businesses = sorted(businesses, key=lambda b: b.name)
-    
-    categories = business_boost.get_all_categories()
-    username = session.get('username', '')
-    
-    return render_template('index.html', 
-                         businesses=businesses, 
-                         categories=categories,
-                         current_category=category,
-                         current_sort=sort_by,
-                         search_query=search,
-                         username=username,
-                         page_title=None)
+        tags = ['all', 'counts']
+    return render_listing(None, tags, build)
 
 
 @app.route('/business/<business_id>')
 def business_detail(business_id):
     """Show detailed view of a single business."""
-    business = business_boost.find_business_by_id(business_id)
-    if not business:
-        flash('Business not found.', 'error')
-        return redirect(url_for('index'))
-    
-    username = session.get('username', '')
-    is_favorite = False
-    if username and business_id in business_boost.user_favorites.get(username, []):
-        is_favorite = True
-    
-    return render_template('business_detail.html', 
-                         business=business, 
-                         username=username,
-                         is_favorite=is_favorite)
+    with business_boost.lock.read():
+        business = business_boost.find_business_by_id(business_id)
+        if not business:
+            flash('Business not found.', 'error')
+            return redirect(url_for('index'))
+        
+        username = session.get('username', '')
+        is_favorite = False
+        if username and business_id in business_boost.user_favorites.get(username, []):
+            is_favorite = True
+        
+        return render_template('business_detail.html', 
+                             business=business, 
+                             username=username,
+                             is_favorite=is_favorite)
 
 
 @app.route('/favorites')
@@ -94,10 +232,12 @@ def favorites():
         flash('Please enter your name to view favorites.', 'info')
         return redirect(url_for('index'))
     
-    favorites_list = business_boost.get_favorites(username)
-    return render_template('favorites.html', 
-                         businesses=favorites_list, 
-                         username=username)
+    with business_boost.lock.read():
+        page = paginate_ranked(business_boost.get_favorites(username))
+        return render_template('favorites.html', 
+                             businesses=page.items, 
+                             page=page,
+                             username=username)
 
 
 @app.route('/add_business', methods=['GET', 'POST'])
@@ -129,6 +269,14 @@ def add_business():
             flash('Name, category, and address are required.', 'error')
             return redirect(url_for('add_business'))
         
+        latitude = longitude = None
+        if request.form.get('location', '').strip():
+            try:
+                latitude, longitude = parse_point(request.form['location'].strip())
+            except ValueError as e:
+                flash(f'{str(e).capitalize()}.', 'error')
+                return redirect(url_for('add_business'))
+        
         # Handle deals
         deals = []
         deal_title = request.form.get('deal_title', '').strip()
@@ -141,7 +289,8 @@ def add_business():
                 "expires": deal_expires
             })
         
-        if business_boost.add_business(name, category, address, phone, description, deals):
+        if business_boost.add_business(name, category, address, phone, description, deals,
+                                       latitude=latitude, longitude=longitude):
             flash(f'Business "{name}" added successfully!', 'success')
             return redirect(url_for('index'))
         else:
@@ -244,57 +393,78 @@ def get_verification():
     })
 
 
+@app.route('/api/search')
+def api_search():
+    """Ranked full-text search as JSON."""
+    query = request.args.get('q', '').strip()
+    category = request.args.get('category', '').lower()
+    try:
+        limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+    except ValueError:
+        limit = 20
+    
+    results = []
+    if query:
+        with business_boost.lock.read():
+            where = (lambda b: b.category == category) if category else None
+            for business, score in business_boost.text_index.search(query, limit, where):
+                results.append({
+                    'id': business.id,
+                    'name': business.name,
+                    'category': business.category,
+                    'address': business.address,
+                    'average_rating': round(business.get_average_rating(), 2),
+                    'review_count': business.get_review_count(),
+                    'score': round(score, 4)
+                })
+    
+    return jsonify({'query': query, 'results': results})
+
+
 @app.route('/top-rated')
 def top_rated():
     """Show top rated businesses."""
-    businesses = business_boost.sort_businesses_by_rating()
-    # Filter out businesses with no reviews
-    businesses = [b for b in businesses if b.get_review_count() > 0]
-    categories = business_boost.get_all_categories()
-    username = session.get('username', '')
+    def build():
+        page = paginate_businesses('rating', limit=business_boost.get_reviewed_count())
+        return dict(businesses=page.items,
+                    page=page,
+                    categories=business_boost.get_all_categories(),
+                    current_category='',
+                    current_sort='rating',
+                    search_query='')
     
-    return render_template('index.html', 
-                         businesses=businesses, 
-                         categories=categories,
-                         current_category='',
-                         current_sort='rating',
-                         search_query='',
-                         username=username,
-                         page_title='Top Rated Businesses')
+    return render_listing('Top Rated Businesses', ['all'], build)
 
 
 @app.route('/most-reviewed')
 def most_reviewed():
     """Show most reviewed businesses."""
-    businesses = business_boost.sort_businesses_by_review_count()
-    categories = business_boost.get_all_categories()
-    username = session.get('username', '')
+    def build():
+        page = paginate_businesses('reviews')
+        return dict(businesses=page.items,
+                    page=page,
+                    categories=business_boost.get_all_categories(),
+                    current_category='',
+                    current_sort='reviews',
+                    search_query='')
     
-    return render_template('index.html', 
-                         businesses=businesses, 
-                         categories=categories,
-                         current_category='',
-                         current_sort='reviews',
-                         search_query='',
-                         username=username,
-                         page_title='Most Reviewed Businesses')
+    return render_listing('Most Reviewed Businesses', ['all'], build)
 
 
 @app.route('/category/<category_name>')
 def category_view(category_name):
     """Show businesses in a specific category."""
-    businesses = business_boost.get_businesses_by_category(category_name)
-    categories = business_boost.get_all_categories()
-    username = session.get('username', '')
+    def build():
+        page = paginate_businesses('name', category=category_name)
+        return dict(businesses=page.items,
+                    page=page,
+                    categories=business_boost.get_all_categories(),
+                    current_category=category_name,
+                    current_sort='name',
+                    search_query='')
     
-    return render_template('index.html', 
-                         businesses=businesses, 
-                         categories=categories,
-                         current_category=category_name,
-                         current_sort='name',
-                         search_query='',
-                         username=username,
-                         page_title=f'{category_name.title()} Businesses')
+    return render_listing(f'{category_name.title()} Businesses',
+                          [f'category:{category_name.lower()}', 'categories'], build)
 
 
 if __name__ == '__main__':
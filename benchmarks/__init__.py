@@ -0,0 +1,5 @@
+"""
+Byte-Sized Business Boost - Benchmarks
+Times the BusinessBoost hot paths and the listing page on deterministic
+synthetic data. Run with ``python3 -m benchmarks``.
+"""
@@ -0,0 +1,149 @@
+"""
+Run the hot-path benchmarks at several data sizes.
+
+Each size is generated deterministically, written as a JSON data file and
+timed in a fresh process. Results are saved as JSON; given a baseline from an
+earlier run, any case that got slower by more than the threshold is reported
+and the run exits with status 1. Cases are compared by their fastest sample,
+which is far less noisy than the median for the microsecond-scale ones.
+
+Usage: python3 -m benchmarks [--scales 1000,100000,1000000] [--reviews-per-business 2]
+                             [--users N] [--seed 42] [--output benchmark_results.json]
+                             [--baseline earlier.json] [--threshold 0.25]
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from benchmarks.data import default_users, generate
+from benchmarks.hot_paths import DATA_FILE
+from storage import JSONStorage
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def git_commit() -> Optional[str]:
+    try:
+        output = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                                capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.stdout.strip()
+
+
+def run(scales: List[int], reviews_per_business: float, users: Optional[int], seed: int) -> Dict:
+    """Time every case at every scale and return the results document."""
+    results = {}
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [HERE, os.environ.get("PYTHONPATH")])))
+    for scale in scales:
+        # A fresh directory each time; the app leaves lock, state and cache files behind
+        with tempfile.TemporaryDirectory() as data_dir:
+            user_count = default_users(scale) if users is None else users
+            started = time.perf_counter()
+            data = generate(scale, int(scale * reviews_per_business), user_count, seed)
+            JSONStorage(os.path.join(data_dir, DATA_FILE)).save(data)
+            del data
+            print(f"{scale:,} businesses, {user_count:,} users "
+                  f"(generated in {time.perf_counter() - started:.1f}s)")
+
+            output = subprocess.run([sys.executable, "-m", "benchmarks.hot_paths", str(seed)], cwd=data_dir,
+                                    env=env, capture_output=True, text=True)
+            if output.returncode != 0:
+                print(output.stderr)
+                print(f"❌ Benchmark process failed at {scale:,} businesses")
+                sys.exit(1)
+            cases = json.loads(output.stdout.strip().splitlines()[-1])
+            for name, timing in cases.items():
+                print(f"   {name:<34} {format_ms(timing['median_ms']):>10}  "
+                      f"(min {format_ms(timing['min_ms'])}, {timing['calls']:,} calls)")
+            results[str(scale)] = cases
+
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": seed,
+        "reviews_per_business": reviews_per_business,
+        "users": users,
+        "results": results,
+    }
+
+
+def format_ms(ms: float) -> str:
+    if ms < 1:
+        return f"{ms * 1000:.1f}µs"
+    if ms < 1000:
+        return f"{ms:.2f}ms"
+    return f"{ms / 1000:.2f}s"
+
+
+def compare(baseline: Dict, current: Dict, threshold: float) -> List[str]:
+    """Print how each case moved against a baseline and return the regressions."""
+    regressions = []
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'} from {baseline.get('created', '?')}:")
+    for scale, cases in current["results"].items():
+        for name, timing in cases.items():
+            before = baseline.get("results", {}).get(scale, {}).get(name)
+            if not before or before["min_ms"] <= 0:
+                continue
+            ratio = timing["min_ms"] / before["min_ms"]
+            line = (f"{int(scale):>11,}  {name:<34} {format_ms(before['min_ms']):>10} -> "
+                    f"{format_ms(timing['min_ms']):>10}  {ratio:5.2f}x")
+            if ratio > 1 + threshold:
+                regressions.append(line)
+                line += "  ❌"
+            print(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark BusinessBoost hot paths on synthetic data.")
+    parser.add_argument("--scales", default="1000,100000,1000000",
+                        help="comma-separated business counts (default 1000,100000,1000000)")
+    parser.add_argument("--reviews-per-business", type=float, default=2.0,
+                        help="reviews to generate per business, on average (default 2)")
+    parser.add_argument("--users", type=int,
+                        help="users with favorites (default one per 100 businesses, at least 10)")
+    parser.add_argument("--seed", type=int, default=42, help="random seed for the data (default 42)")
+    parser.add_argument("--output", default="benchmark_results.json", help="where to save the results")
+    parser.add_argument("--baseline", help="results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="fail when a case is this much slower than the baseline (default 0.25 = 25%%)")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        try:
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"❌ Cannot read baseline {args.baseline}: {e}")
+            sys.exit(1)
+
+    document = run([int(scale) for scale in args.scales.split(",")], args.reviews_per_business,
+                   args.users, args.seed)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2)
+    print(f"✅ Results saved to {args.output}")
+
+    if baseline is not None:
+        regressions = compare(baseline, document, args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} case(s) more than {args.threshold:.0%} slower than the baseline:")
+            for line in regressions:
+                print(f"   {line.strip()}")
+            sys.exit(1)
+        print(f"✅ No case more than {args.threshold:.0%} slower than the baseline")
+
+
+if __name__ == "__main__":
+    main()
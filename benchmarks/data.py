@@ -0,0 +1,67 @@
+"""
+Deterministic synthetic data for the benchmarks
+"""
+
+import random
+from typing import Dict
+
+FAVORITES_PER_USER = 20
+
+# Vocabulary for generated businesses and reviews (also used by the load test and startup_bench.py)
+WORDS = ("corner", "family", "golden", "harbor", "maple", "riverside", "sunny", "urban", "village", "vintage")
+KINDS = {
+    "food": ("Cafe", "Bakery", "Diner", "Pizzeria"),
+    "retail": ("Books", "Boutique", "Hardware", "Florist"),
+    "services": ("Repair", "Salon", "Tailor", "Cleaners"),
+}
+COMMENTS = ("Great service and friendly staff", "Would come back again", "A bit pricey but worth it",
+            "Fast, helpful and local", "Not my favorite visit")
+
+
+def default_users(businesses: int) -> int:
+    """One user with favorites per hundred businesses, and at least ten."""
+    return max(10, businesses // 100)
+
+
+def generate(businesses: int, reviews: int, users: int, seed: int = 42,
+             favorites_per_user: int = FAVORITES_PER_USER) -> Dict:
+    """Build a snapshot with the given numbers of businesses, reviews and users.
+
+    Reviews are spread over the businesses at random, so some have several
+    and many have none. Every user has up to ``favorites_per_user`` favorites.
+    The same arguments always give the same data.
+    """
+    rng = random.Random(seed)
+    records = []
+    for i in range(businesses):
+        category = rng.choice(tuple(KINDS))
+        records.append({
+            "id": f"B{i:011d}",
+            "name": f"{rng.choice(WORDS).title()} {rng.choice(KINDS[category])} {i}",
+            "category": category,
+            "address": f"{rng.randint(1, 9999)} {rng.choice(WORDS).title()} Street",
+            "phone": f"(555) {rng.randint(100, 999)}-{rng.randint(1000, 9999)}",
+            "description": f"A {rng.choice(WORDS)} {category} business",
+            "latitude": round(rng.uniform(40.5, 40.9), 6),
+            "longitude": round(rng.uniform(-74.2, -73.7), 6),
+            "deals": [],
+            "reviews": [],
+            "created_at": "2024-01-01T00:00:00"
+        })
+
+    user_names = [f"user{i}" for i in range(users)]
+    if records:
+        for _ in range(reviews):
+            records[rng.randrange(businesses)]["reviews"].append({
+                "user_name": rng.choice(user_names) if user_names else "guest",
+                "rating": rng.randint(1, 5),
+                "comment": rng.choice(COMMENTS),
+                "verified": True,
+                "date": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T12:00:00"
+            })
+
+    favorites = {}
+    for name in user_names:
+        picks = rng.sample(range(businesses), min(favorites_per_user, businesses))
+        favorites[name] = [records[i]["id"] for i in picks]
+    return {"businesses": records, "user_favorites": favorites}
@@ -0,0 +1,113 @@
+"""
+Hot-path timings for one data file
+
+Run in a fresh process per data size by ``python3 -m benchmarks``, from the
+directory holding the data as business_data.json (where app.py looks for it).
+Prints the timings as JSON on its last line of output.
+"""
+
+import gc
+import itertools
+import json
+import random
+import statistics
+import sys
+import time
+from typing import Callable, Dict
+
+MIN_SECONDS = 0.5   # sample a case for at least this long...
+MAX_SECONDS = 10.0  # ...but no longer than this
+MIN_SAMPLES = 3
+MAX_SAMPLES = 200
+
+DATA_FILE = "business_data.json"
+
+
+def measure(fn: Callable[[], object], number: int = 1) -> Dict:
+    """Time ``number`` calls per sample until enough samples are in; milliseconds per call."""
+    gc.collect()
+    samples = []
+    started = time.perf_counter()
+    while len(samples) < MAX_SAMPLES:
+        sample_started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - sample_started) * 1000 / number)
+        elapsed = time.perf_counter() - started
+        if elapsed >= MAX_SECONDS or (len(samples) >= MIN_SAMPLES and elapsed >= MIN_SECONDS):
+            break
+    return {
+        "median_ms": statistics.median(samples),
+        "min_ms": min(samples),
+        "samples": len(samples),
+        "calls": number * len(samples),
+    }
+
+
+def model_cases(seed: int) -> Dict[str, Dict]:
+    """Time the BusinessBoost methods the web app leans on."""
+    from models import BusinessBoost
+
+    boost = BusinessBoost(data_file=DATA_FILE)
+    rng = random.Random(seed)
+    ids = itertools.cycle([b.id for b in rng.sample(boost.businesses, min(1000, len(boost.businesses)))])
+    categories = itertools.cycle(boost.get_all_categories())
+    users = itertools.cycle(sorted(boost.user_favorites) or ["nobody"])
+
+    results = {"load_data": measure(boost.load_data)}
+    # Keep the full-text index build that a load starts from sharing the CPU with the other cases
+    boost.wait_for_text_index()
+    results.update({
+        "find_business_by_id": measure(lambda: boost.find_business_by_id(next(ids)), number=1000),
+        "get_businesses_by_category": measure(lambda: boost.get_businesses_by_category(next(categories))),
+        "sort_businesses_by_rating": measure(boost.sort_businesses_by_rating),
+        "sort_businesses_by_review_count": measure(boost.sort_businesses_by_review_count),
+        "get_favorites": measure(lambda: boost.get_favorites(next(users)), number=100),
+        # Last, so the other cases read the file as generated
+        "save_data": measure(boost.save_data),
+    })
+    boost.close()
+    return results
+
+
+def app_cases() -> Dict[str, Dict]:
+    """Time the search and sort logic of the home page through the Flask test client."""
+    import app as web
+
+    client = web.app.test_client()
+    # Time searches against the finished full-text index, not while it is built
+    web.business_boost.wait_for_text_index()
+
+    def get(query: str, cached: bool = False) -> Callable[[], None]:
+        def request():
+            if not cached:
+                # Time the filtering, sorting and rendering rather than a page cache hit
+                web.page_cache.clear()
+            response = client.get(f"/?{query}")
+            if response.status_code != 200:
+                raise RuntimeError(f"GET /?{query} returned {response.status_code}")
+        return request
+
+    results = {
+        "index_sort_name": measure(get("sort=name")),
+        "index_sort_rating": measure(get("sort=rating")),
+        "index_sort_reviews": measure(get("sort=reviews")),
+        "index_category": measure(get("category=food&sort=rating")),
+        "index_search": measure(get("search=maple&sort=name")),
+        "index_search_relevance": measure(get("search=maple+cafe&sort=relevance")),
+        "index_cached": measure(get("sort=name", cached=True)),
+    }
+    web.business_boost.close()
+    return results
+
+
+def main():
+    seed = int(sys.argv[1]) if len(sys.argv) > 1 else 42
+    results = model_cases(seed)
+    gc.collect()
+    results.update(app_cases())
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,443 @@
+"""
+End-to-end load test for the web app
+
+Starts the real Flask app on generated data (or targets a running server with
+--url), then drives it from many concurrent clients, each with its own session
+cookie. Each scenario is a weighted mix of what visitors do:
+
+    browse     listings in every sort order, category pages and detail pages
+    search     full-text searches on the home page and /api/search
+    reviews    a review storm: /get_verification then POST /add_review, plus
+               the occasional new business (question read off the form)
+    favorites  favorites churn: toggle favorites and view the favorites page
+
+Writes follow their redirect and only count as successful if the page shows
+the success message. Reports throughput, latency percentiles and histograms,
+error rates and how the data files grew while the test ran.
+
+Usage: python3 -m benchmarks.load_test [--scenarios browse,search,reviews,favorites]
+                                       [--clients 16] [--seconds 20] [--businesses 10000]
+                                       [--url http://127.0.0.1:5000] [--output load_report.json]
+"""
+
+import argparse
+import bisect
+import http.cookiejar
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from typing import Callable, Dict, List, Optional, Tuple
+
+from benchmarks.data import COMMENTS, KINDS, WORDS, default_users, generate
+from benchmarks.hot_paths import DATA_FILE
+from storage import JSONStorage
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+QUESTION = re.compile(r"(\d+)\s*\+\s*(\d+)\s*=\s*\?")
+FLASH = re.compile(r'class="flash flash-[^"]*"[^>]*>\s*(?:<i[^>]*></i>)?\s*([^<]+)')
+
+# Runs the app the way app.py does, minus the reloader and debugger
+SERVER = """
+import sys
+sys.path.insert(0, {here!r})
+import app
+app.app.run(host="127.0.0.1", port={port}, threaded=True, debug=False)
+"""
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Hand redirects back to the caller, so each hop is timed on its own."""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class Recorder:
+    """Latencies and errors per action, shared by every client thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.error_samples: List[str] = []
+
+    def record(self, action: str, milliseconds: float, error: Optional[str] = None):
+        with self._lock:
+            self.latencies.setdefault(action, []).append(milliseconds)
+            if error is not None:
+                self.errors[action] = self.errors.get(action, 0) + 1
+                if len(self.error_samples) < 10:
+                    self.error_samples.append(f"{action}: {error}")
+
+    def fail(self, action: str, error: str):
+        """Count an already recorded request as failed after all, e.g. a rejected form."""
+        with self._lock:
+            self.errors[action] = self.errors.get(action, 0) + 1
+            if len(self.error_samples) < 10:
+                self.error_samples.append(f"{action}: {error}")
+
+
+class Client:
+    """One visitor: a cookie jar and the actions a scenario picks from."""
+
+    def __init__(self, base_url: str, number: int, business_ids: List[str], recorder: Recorder, seed: int):
+        self.base_url = base_url.rstrip("/")
+        self.username = f"loadtest{number}"
+        self.business_ids = business_ids
+        self.recorder = recorder
+        self.rng = random.Random(seed + number)
+        self.favorites: set = set()
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), NoRedirect)
+
+    def request(self, action: str, path: str, form: Optional[Dict] = None,
+                headers: Optional[Dict] = None) -> Tuple[int, str, Optional[str]]:
+        """Send one request and record it; returns status, body and redirect target."""
+        data = urllib.parse.urlencode(form).encode() if form is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, headers=headers or {})
+        started = time.perf_counter()
+        try:
+            with self.opener.open(req, timeout=60) as response:
+                status, body, location = response.status, response.read().decode("utf-8", "replace"), None
+        except urllib.error.HTTPError as e:
+            status, body, location = e.code, e.read().decode("utf-8", "replace"), e.headers.get("Location")
+        except (OSError, ValueError) as e:
+            self.recorder.record(action, (time.perf_counter() - started) * 1000, str(e))
+            return 0, "", None
+        elapsed = (time.perf_counter() - started) * 1000
+        ok = status < 400
+        self.recorder.record(action, elapsed, None if ok else f"HTTP {status}")
+        return status, body, location
+
+    def write(self, action: str, path: str, form: Dict, success: str, headers: Optional[Dict] = None):
+        """POST a form, follow its redirect and check the page shows ``success``."""
+        status, _, location = self.request(action, path, form, headers)
+        if status != 302 or not location:
+            if status and status < 400:
+                self.recorder.fail(action, f"expected a redirect, got HTTP {status}")
+            return
+        page = urllib.parse.urlsplit(location)
+        target = page.path + (f"?{page.query}" if page.query else "")
+        status, body, _ = self.request(f"{action} (result page)", target)
+        if status == 200 and success not in body:
+            message = FLASH.search(body)
+            self.recorder.fail(action, message.group(1).strip() if message else "no success message")
+
+    # --- actions ---
+
+    def view_listing(self):
+        sort = self.rng.choice(("name", "rating", "reviews"))
+        self.request(f"index sort={sort}", f"/?sort={sort}")
+
+    def view_category(self):
+        self.request("category", f"/category/{self.rng.choice(tuple(KINDS))}")
+
+    def view_top_rated(self):
+        self.request("top-rated", self.rng.choice(("/top-rated", "/most-reviewed")))
+
+    def view_business(self):
+        self.request("business detail", f"/business/{self.rng.choice(self.business_ids)}")
+
+    def search_page(self):
+        term = self.rng.choice(WORDS)
+        sort = self.rng.choice(("name", "relevance"))
+        self.request(f"index search sort={sort}", f"/?search={term}&sort={sort}")
+
+    def search_api(self):
+        terms = " ".join(self.rng.sample(WORDS, self.rng.randint(1, 2)))
+        self.request("api search", f"/api/search?q={urllib.parse.quote(terms)}")
+
+    def add_review(self):
+        status, body, _ = self.request("get_verification", "/get_verification")
+        if status != 200:
+            return
+        answer = json.loads(body)["answer"]
+        business_id = self.rng.choice(self.business_ids)
+        self.write("add_review", "/add_review", {
+            "business_id": business_id,
+            "user_name": self.username,
+            "rating": self.rng.randint(1, 5),
+            "comment": self.rng.choice(COMMENTS),
+            "verification_answer": answer,
+        }, "Review added successfully!")
+
+    def add_business(self):
+        status, body, _ = self.request("add_business form", "/add_business")
+        question = QUESTION.search(body) if status == 200 else None
+        if question is None:
+            if status == 200:
+                self.recorder.fail("add_business form", "no verification question on the form")
+            return
+        category = self.rng.choice(tuple(KINDS))
+        self.write("add_business", "/add_business", {
+            "name": f"{self.rng.choice(WORDS).title()} {self.rng.choice(KINDS[category])} {self.rng.randrange(10**9)}",
+            "category": category,
+            "address": f"{self.rng.randint(1, 9999)} {self.rng.choice(WORDS).title()} Street",
+            "phone": "",
+            "description": "Added by the load test",
+            "verification_answer": int(question.group(1)) + int(question.group(2)),
+        }, "added successfully")
+
+    def toggle_favorite(self):
+        # Removals grow likelier as the list fills, so it hovers around ten favorites
+        if self.favorites and self.rng.random() < len(self.favorites) / 20:
+            business_id = self.rng.choice(sorted(self.favorites))
+        else:
+            business_id = self.rng.choice(self.business_ids)
+        removing = business_id in self.favorites
+        self.write("toggle_favorite", "/toggle_favorite",
+                   {"business_id": business_id, "action": "remove" if removing else "add"},
+                   "removed from favorites" if removing else "added to favorites",
+                   headers={"Referer": f"{self.base_url}/favorites"})
+        if removing:
+            self.favorites.discard(business_id)
+        else:
+            self.favorites.add(business_id)
+
+    def view_favorites(self):
+        self.request("favorites page", "/favorites")
+
+    def sign_in(self):
+        self.request("set_username", "/set_username", {"username": self.username})
+
+
+# Weighted actions per scenario
+SCENARIOS: Dict[str, List[Tuple[Callable[[Client], None], int]]] = {
+    "browse": [(Client.view_listing, 40), (Client.view_category, 20), (Client.view_top_rated, 10),
+               (Client.view_business, 30)],
+    "search": [(Client.search_page, 50), (Client.search_api, 40), (Client.view_business, 10)],
+    "reviews": [(Client.add_review, 70), (Client.view_business, 20), (Client.add_business, 10)],
+    "favorites": [(Client.toggle_favorite, 60), (Client.view_favorites, 30), (Client.view_business, 10)],
+}
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+def histogram(latencies: List[float]) -> List[int]:
+    """Counts per BUCKETS_MS bucket, plus one for anything slower."""
+    counts = [0] * (len(BUCKETS_MS) + 1)
+    for ms in latencies:
+        counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+    return counts
+
+
+def data_size(data_dir: str) -> int:
+    """Bytes in the data file and its journal, state and review files."""
+    total = 0
+    for name in os.listdir(data_dir):
+        if name.startswith(DATA_FILE) and not name.endswith((".lock", ".tmp")):
+            try:
+                total += os.path.getsize(os.path.join(data_dir, name))
+            except OSError:
+                pass  # replaced while we looked
+    return total
+
+
+def business_ids(base_url: str, limit: int = 2000) -> List[str]:
+    """Collect up to ``limit`` business ids through the JSON API."""
+    ids = []
+    cursor = None
+    while len(ids) < limit:
+        query = {"per_page": 100, **({"cursor": cursor} if cursor else {})}
+        with urllib.request.urlopen(f"{base_url}/api/v1/businesses?{urllib.parse.urlencode(query)}",
+                                    timeout=60) as response:
+            page = json.loads(response.read())
+        ids.extend(b["id"] for b in page["businesses"])
+        cursor = page.get("next_cursor")
+        if not cursor:
+            break
+    return ids[:limit]
+
+
+def run_scenario(name: str, base_url: str, clients: int, seconds: float, ids: List[str],
+                 data_dir: Optional[str], seed: int) -> Dict:
+    """Drive one scenario for ``seconds`` and return its report."""
+    recorder = Recorder()
+    actions, weights = zip(*SCENARIOS[name])
+    visitors = [Client(base_url, i, ids, recorder, seed) for i in range(clients)]
+    if name == "favorites":
+        for visitor in visitors:
+            visitor.sign_in()
+        recorder.latencies.clear()
+        recorder.errors.clear()
+
+    growth = []
+    stop = threading.Event()
+    started = time.perf_counter()
+
+    def visit(visitor: Client):
+        while not stop.is_set():
+            visitor.rng.choices(actions, weights)[0](visitor)
+
+    def watch_data():
+        while True:
+            growth.append((round(time.perf_counter() - started, 1), data_size(data_dir)))
+            if stop.wait(1.0):
+                break
+
+    threads = [threading.Thread(target=visit, args=(visitor,)) for visitor in visitors]
+    if data_dir is not None:
+        threads.append(threading.Thread(target=watch_data))
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    if data_dir is not None:
+        growth.append((round(elapsed, 1), data_size(data_dir)))
+
+    report = {"seconds": elapsed, "clients": clients, "actions": {}, "data_growth": growth,
+              "error_samples": recorder.error_samples}
+    everything = []
+    for action, latencies in sorted(recorder.latencies.items()):
+        ordered = sorted(latencies)
+        everything.extend(ordered)
+        report["actions"][action] = summarize(ordered, recorder.errors.get(action, 0), elapsed)
+    everything.sort()
+    report["total"] = summarize(everything, sum(recorder.errors.values()), elapsed)
+    return report
+
+
+def summarize(ordered: List[float], errors: int, seconds: float) -> Dict:
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "error_rate": errors / len(ordered) if ordered else 0.0,
+        "throughput": len(ordered) / seconds if seconds else 0.0,
+        "p50_ms": percentile(ordered, 0.50),
+        "p90_ms": percentile(ordered, 0.90),
+        "p99_ms": percentile(ordered, 0.99),
+        "max_ms": ordered[-1] if ordered else 0.0,
+        "histogram": histogram(ordered),
+    }
+
+
+def print_report(name: str, report: Dict):
+    total = report["total"]
+    print(f"\n{name}: {total['requests']:,} requests in {report['seconds']:.1f}s from {report['clients']} clients, "
+          f"{total['throughput']:,.0f} req/s, {total['error_rate']:.2%} errors")
+    print(f"   {'action':<30} {'requests':>9} {'errors':>7} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}")
+    for action, stats in report["actions"].items():
+        print(f"   {action:<30} {stats['requests']:>9,} {stats['errors']:>7,} {stats['p50_ms']:>7.1f}ms "
+              f"{stats['p90_ms']:>7.1f}ms {stats['p99_ms']:>7.1f}ms {stats['max_ms']:>7.1f}ms")
+
+    print("   latency histogram (all requests):")
+    counts = total["histogram"]
+    widest = max(counts) or 1
+    labels = [f"<{ms}ms" if ms < 1000 else f"<{ms // 1000}s" for ms in BUCKETS_MS] + [f">={BUCKETS_MS[-1] // 1000}s"]
+    for label, count in zip(labels, counts):
+        if count:
+            print(f"   {label:>8} {'#' * max(1, round(40 * count / widest)):<40} {count:,}")
+
+    growth = report["data_growth"]
+    if growth:
+        first, last = growth[0][1], growth[-1][1]
+        rate = (last - first) / report["seconds"] if report["seconds"] else 0.0
+        print(f"   data files: {first / 1024:,.0f} KB -> {last / 1024:,.0f} KB ({rate / 1024:+,.1f} KB/s)")
+        step = max(1, len(growth) // 10)
+        print("   " + ", ".join(f"{t:g}s {size / 1024:,.0f}KB" for t, size in growth[::step]))
+    for sample in report["error_samples"]:
+        print(f"   ❌ {sample}")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(data_dir: str, port: int) -> subprocess.Popen:
+    """Run the app on the data in ``data_dir`` and wait until it answers."""
+    server = subprocess.Popen([sys.executable, "-c", SERVER.format(here=HERE, port=port)], cwd=data_dir,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 300
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("the app exited during startup")
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/api/v1/categories", timeout=5).close()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("the app did not start within 5 minutes")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the web app with concurrent simulated visitors.")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"comma-separated scenarios to run in turn (default {','.join(SCENARIOS)})")
+    parser.add_argument("--clients", type=int, default=16, help="concurrent visitors (default 16)")
+    parser.add_argument("--seconds", type=float, default=20.0, help="how long each scenario runs (default 20)")
+    parser.add_argument("--businesses", type=int, default=10000,
+                        help="businesses to generate for the app started here (default 10000)")
+    parser.add_argument("--url", help="load-test a server that is already running instead")
+    parser.add_argument("--seed", type=int, default=42, help="random seed for data and visitors (default 42)")
+    parser.add_argument("--output", help="also save the report as JSON")
+    args = parser.parse_args()
+
+    scenarios = args.scenarios.split(",")
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        print(f"❌ Unknown scenario(s): {', '.join(unknown)}")
+        sys.exit(1)
+
+    server = None
+    data_dir = None
+    temp_dir = None
+    if args.url:
+        base_url = args.url.rstrip("/")
+    else:
+        temp_dir = tempfile.TemporaryDirectory()
+        data_dir = temp_dir.name
+        data = generate(args.businesses, 2 * args.businesses, default_users(args.businesses), args.seed)
+        JSONStorage(os.path.join(data_dir, DATA_FILE)).save(data)
+        del data
+        port = free_port()
+        print(f"Starting the app on {args.businesses:,} businesses...")
+        server = start_server(data_dir, port)
+        base_url = f"http://127.0.0.1:{port}"
+
+    reports = {}
+    try:
+        ids = business_ids(base_url)
+        if not ids:
+            print("❌ The server has no businesses to visit")
+            sys.exit(1)
+        for name in scenarios:
+            reports[name] = run_scenario(name, base_url, args.clients, args.seconds, ids, data_dir, args.seed)
+            print_report(name, reports[name])
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        if temp_dir is not None:
+            temp_dir.cleanup()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"url": args.url, "businesses": None if args.url else args.businesses,
+                       "histogram_buckets_ms": list(BUCKETS_MS), "scenarios": reports}, f, indent=2)
+        print(f"\n✅ Report saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Byte-Sized Business Boost - Bulk Import
+Adds a whole region's businesses to a data file in one go. The source can be
+
+    CSV     with name, category, address, phone and description columns
+            (plus optional id, latitude, longitude, deal_title,
+            deal_description and deal_expires)
+    NDJSON  one business object per line, with the same fields and "deals"
+    OSM     an OpenStreetMap extract in the Overpass JSON format the web
+            front end (docs/assets/app.js) reads, mapped the same way
+
+Records are parsed and checked by a pool of worker processes, duplicates are
+dropped, and the rest are added in batches, each written with one snapshot
+instead of one save per business. Throughput is printed while it runs.
+
+Usage: python3 bulk_import.py SOURCE [--format csv|ndjson|osm] [--data-file business_data.json]
+                              [--workers N] [--chunk-size 2000] [--batch-size 100000]
+                              [--lazy-reviews]
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from geo_index import valid_coordinates
+from storage import SnapshotReader
+
+FORMATS = ("csv", "ndjson", "osm")
+
+# Same keyword buckets as mapOSMCategory in docs/assets/app.js
+FOOD_WORDS = ("restaurant", "cafe", "food", "bar", "pub", "bakery", "fast_food", "ice_cream")
+RETAIL_WORDS = ("shop", "store", "market", "supermarket", "retail", "mall")
+
+
+def detect_format(path: str) -> str:
+    """Guess a source's format from its file extension."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return "csv"
+    if extension in (".ndjson", ".jsonl"):
+        return "ndjson"
+    if extension in (".json", ".osm"):
+        return "osm"
+    raise ValueError(f"cannot tell the format of {path}; pass --format")
+
+
+def _text(value) -> str:
+    return "" if value is None else str(value).strip()
+
+
+def normalize_record(raw: Dict) -> Dict:
+    """Check one CSV row or NDJSON object and turn it into add_business arguments."""
+    if not isinstance(raw, dict):
+        raise ValueError("not an object")
+    name, category, address = _text(raw.get("name")), _text(raw.get("category")), _text(raw.get("address"))
+    if not name or not category or not address:
+        raise ValueError("name, category and address are required")
+
+    deals = raw.get("deals")
+    if deals is None:
+        # CSV has one deal per row, in the columns the add business form uses
+        deals = [{"title": raw.get("deal_title"), "description": raw.get("deal_description"),
+                  "expires": raw.get("deal_expires")}] if _text(raw.get("deal_title")) else []
+    if not isinstance(deals, list) or not all(isinstance(d, dict) for d in deals):
+        raise ValueError("deals must be a list of objects")
+
+    record = {
+        "name": name,
+        "category": category.lower(),
+        "address": address,
+        "phone": _text(raw.get("phone")),
+        "description": _text(raw.get("description")),
+        "deals": [{"title": _text(d.get("title")), "description": _text(d.get("description")),
+                   "expires": _text(d.get("expires"))} for d in deals]
+    }
+    if _text(raw.get("id")):
+        record["id"] = _text(raw.get("id"))
+    latitude, longitude = _text(raw.get("latitude")), _text(raw.get("longitude"))
+    if latitude or longitude:
+        if not valid_coordinates(latitude, longitude):
+            raise ValueError("latitude and longitude must both be given and on the map")
+        record["latitude"], record["longitude"] = float(latitude), float(longitude)
+    return record
+
+
+def map_osm_category(tags: Dict) -> str:
+    """Map OSM shop/amenity tags onto our three categories, like the web front end."""
+    combined = f"{tags.get('shop', '')} {tags.get('amenity', '')}".lower()
+    if any(word in combined for word in FOOD_WORDS):
+        return "food"
+    if any(word in combined for word in RETAIL_WORDS):
+        return "retail"
+    return "services"
+
+
+def normalize_osm(element: Dict) -> Optional[Dict]:
+    """Turn one Overpass element into add_business arguments; None for unnamed places."""
+    if not isinstance(element, dict):
+        raise ValueError("not an object")
+    tags = element.get("tags") or {}
+    if not _text(tags.get("name")):
+        return None  # the front end skips these too
+    center = element.get("center") or {"lat": element.get("lat"), "lon": element.get("lon")}
+    located = valid_coordinates(center.get("lat"), center.get("lon"))
+
+    parts = [_text(tags.get(key)) for key in ("addr:housenumber", "addr:street", "addr:city", "addr:postcode")]
+    address = " ".join(part for part in parts if part)
+    if not address:
+        if not located:
+            raise ValueError("no address and no coordinates")
+        address = f"Near {float(center['lat']):.4f}, {float(center['lon']):.4f}"
+
+    description = [_text(tags.get("shop")), _text(tags.get("amenity"))]
+    if tags.get("cuisine"):
+        description.append(f"{_text(tags['cuisine'])} cuisine")
+    description.append(_text(tags.get("brand")))
+    record = {
+        "id": f"osm_{element.get('type', 'node')}_{element.get('id')}",
+        "name": _text(tags["name"]),
+        "category": map_osm_category(tags),
+        "address": address,
+        "phone": _text(tags.get("phone") or tags.get("contact:phone")),
+        "description": ", ".join(part for part in description if part) or "Local business",
+        "deals": []
+    }
+    if located:
+        record["latitude"], record["longitude"] = float(center["lat"]), float(center["lon"])
+    return record
+
+
+def normalize_chunk(task: Tuple[str, int, List]) -> Tuple[List[Dict], List[str], int]:
+    """Worker: normalize one chunk of raw items.
+
+    Returns the good records, a message per invalid one and how many items
+    were ignored (unnamed OSM elements).
+    """
+    source_format, first, items = task
+    records = []
+    errors = []
+    ignored = 0
+    for number, item in enumerate(items, first):
+        try:
+            if source_format == "ndjson":
+                item = json.loads(item)
+            record = normalize_osm(item) if source_format == "osm" else normalize_record(item)
+        except (TypeError, ValueError) as e:
+            errors.append(f"record {number}: {e}")
+            continue
+        if record is None:
+            ignored += 1
+        else:
+            records.append(record)
+    return records, errors, ignored
+
+
+def read_chunks(path: str, source_format: str, chunk_size: int) -> Iterator[Tuple[str, int, List]]:
+    """Split a source into chunks of raw items for the workers, numbering items from 1."""
+    chunk = []
+    first = 1
+    number = 0
+    if source_format == "csv":
+        f = open(path, newline='', encoding='utf-8-sig')
+        items = csv.DictReader(f)
+    elif source_format == "ndjson":
+        f = open(path, encoding='utf-8')
+        items = (line for line in f if line.strip())
+    else:
+        f = open(path, 'rb')
+        reader = SnapshotReader(f, array_key="elements")
+        items = (value for key, value in reader if key == "elements")
+    with f:
+        for item in items:
+            number += 1
+            chunk.append(item)
+            if len(chunk) >= chunk_size:
+                yield source_format, first, chunk
+                chunk = []
+                first = number + 1
+        if chunk:
+            yield source_format, first, chunk
+        if source_format == "osm" and reader.damaged:
+            print(f"❌ {path} is not valid JSON after element {number}; importing what came before")
+
+
+class ImportStats:
+    """Counts records through the pipeline and prints throughput now and then."""
+
+    def __init__(self, every: float = 2.0):
+        self.started = time.perf_counter()
+        self.parsed = 0
+        self.invalid = 0
+        self.ignored = 0
+        self.errors: List[str] = []
+        self._every = every
+        self._last_report = self.started
+
+    def add(self, records: int, errors: List[str], ignored: int):
+        self.parsed += records
+        self.invalid += len(errors)
+        self.ignored += ignored
+        self.errors.extend(errors[:10 - len(self.errors)])
+        now = time.perf_counter()
+        if now - self._last_report >= self._every:
+            self._last_report = now
+            print(f"   parsed {self.parsed:,} records ({self.rate(self.parsed):,.0f}/s), {self.invalid:,} invalid")
+
+    def rate(self, count: int) -> float:
+        elapsed = time.perf_counter() - self.started
+        return count / elapsed if elapsed > 0 else 0.0
+
+
+def parse_source(path: str, source_format: str, workers: Optional[int] = None,
+                 chunk_size: int = 2000, stats: Optional[ImportStats] = None) -> Iterator[Dict]:
+    """Yield normalized records from a source, in source order, parsed by a process pool.
+
+    Only a few chunks per worker are in flight at a time, so a large source
+    is never held in memory as a whole.
+    """
+    stats = stats or ImportStats()
+    workers = workers or os.cpu_count() or 1
+    chunks = read_chunks(path, source_format, chunk_size)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = deque()
+        limit = 2 * workers
+        for chunk in chunks:
+            in_flight.append(pool.submit(normalize_chunk, chunk))
+            while len(in_flight) >= limit:
+                yield from _collect(in_flight.popleft(), stats)
+        while in_flight:
+            yield from _collect(in_flight.popleft(), stats)
+
+
+def _collect(future, stats: ImportStats) -> List[Dict]:
+    records, errors, ignored = future.result()
+    stats.add(len(records), errors, ignored)
+    return records
+
+
+def bulk_import(path: str, data_file: str = "business_data.json", source_format: Optional[str] = None,
+                workers: Optional[int] = None, chunk_size: int = 2000, lazy_reviews: bool = False,
+                batch_size: int = 100_000) -> Dict:
+    """Import a source file into a data file and return the counts and timings.
+
+    Records go to ``BusinessBoost.bulk_import`` batch_size at a time as they
+    are parsed, so at most one batch is held in memory, and the store's lock
+    is only held while a batch is added.
+    """
+    from models import BusinessBoost
+
+    source_format = source_format or detect_format(path)
+    # Shared, like the web app; running workers see the import and reload.
+    # A new data file holds only the imported businesses, not the sample ones
+    boost = BusinessBoost(data_file=data_file, journal=True, shared=True, lazy_reviews=lazy_reviews,
+                          sample_data=False)
+    stats = ImportStats()
+    records = parse_source(path, source_format, workers, chunk_size, stats)
+    added = duplicates = 0
+    import_seconds = 0.0
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            break
+        started = time.perf_counter()
+        batch_added, batch_duplicates = boost.bulk_import(batch)
+        import_seconds += time.perf_counter() - started
+        added += batch_added
+        duplicates += batch_duplicates
+        print(f"   added {added:,} businesses so far ({duplicates:,} duplicates)")
+    return {
+        "added": added,
+        "duplicates": duplicates,
+        "invalid": stats.invalid,
+        "ignored": stats.ignored,
+        "errors": stats.errors,
+        # Parsing only runs while the import waits for the next batch
+        "parse_seconds": time.perf_counter() - stats.started - import_seconds,
+        "import_seconds": import_seconds,
+        "total": len(boost.businesses),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-import businesses from CSV, NDJSON or an OSM extract.")
+    parser.add_argument("source", help="file to import")
+    parser.add_argument("--format", choices=FORMATS, help="source format (default: from the extension)")
+    parser.add_argument("--data-file", default="business_data.json", help="data file to import into")
+    parser.add_argument("--workers", type=int, help="parser processes (default: one per CPU)")
+    parser.add_argument("--chunk-size", type=int, default=2000, help="records per worker task (default 2000)")
+    parser.add_argument("--batch-size", type=int, default=100_000,
+                        help="records added and saved at a time (default 100000)")
+    parser.add_argument("--lazy-reviews", action="store_true",
+                        help="keep the data file in the lazy review layout")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.source):
+        print(f"❌ {args.source} not found")
+        sys.exit(1)
+    try:
+        result = bulk_import(args.source, args.data_file, args.format, args.workers, args.chunk_size,
+                             args.lazy_reviews, max(args.batch_size, 1))
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    for error in result["errors"]:
+        print(f"   skipped {error}")
+    if result["invalid"] > len(result["errors"]):
+        print(f"   ... and {result['invalid'] - len(result['errors']):,} more invalid records")
+    seconds = result["parse_seconds"] + result["import_seconds"]
+    print(f"✅ Imported {result['added']:,} businesses into {args.data_file} in {seconds:.1f}s "
+          f"({result['added'] / seconds if seconds else 0:,.0f}/s; indexing and saving took "
+          f"{result['import_seconds']:.1f}s)")
+    print(f"   {result['duplicates']:,} duplicates, {result['invalid']:,} invalid, "
+          f"{result['ignored']:,} unnamed places skipped; {result['total']:,} businesses in total")
+
+
+if __name__ == "__main__":
+    main()
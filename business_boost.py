@@ -12,6 +12,8 @@ from datetime import datetime
 from typing import Dict, List, Optional
 from collections import defaultdict
 
+from search_index import TrigramIndex
+
 
 class Business:
     """Represents a local business."""
@@ -94,6 +96,7 @@ class BusinessBoost:
         self.data_file = data_file
         self.businesses: List[Business] = []
         self.user_favorites: Dict[str, List[str]] = {}  # username -> [business_ids]
+        self.search_index = TrigramIndex()
         self.load_data()
     
     def load_data(self):
@@ -111,6 +114,10 @@ class BusinessBoost:
         else:
             # Initialize with sample data
             self._initialize_sample_data()
+        
+        self.search_index = TrigramIndex()
+        for business in self.businesses:
+            self.search_index.add(business)
     
     def save_data(self):
         """Save businesses and user data to JSON file."""
@@ -189,6 +196,7 @@ class BusinessBoost:
         
         business = Business(name, category, address, phone, description, deals)
         self.businesses.append(business)
+        self.search_index.add(business)
         self.save_data()
         print(f"✅ Business '{name}' added successfully!")
         return True
@@ -202,6 +210,10 @@ class BusinessBoost:
         categories = set(b.category for b in self.businesses)
         return sorted(categories)
     
+    def search_businesses(self, query: str) -> List[Business]:
+        """Find businesses whose name, category or address contains the query."""
+        return self.search_index.search(query)
+    
     def sort_businesses_by_rating(self, reverse: bool = True) -> List[Business]:
         """Sort businesses by average rating."""
         return sorted(self.businesses, key=lambda b: b.get_average_rating(), reverse=reverse)
@@ -387,12 +399,7 @@ def main():
         elif choice == "3":
             search_term = input("\nEnter search term (name, category, or address): ").strip().lower()
             if search_term:
-                results = [
-                    b for b in app.businesses
-                    if search_term in b.name.lower() or 
-                       search_term in b.category.lower() or 
-                       search_term in b.address.lower()
-                ]
+                results = app.search_businesses(search_term)
                 app.display_business_list(results)
             else:
                 print("❌ Please enter a search term.")
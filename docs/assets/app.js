@@ -23,11 +23,46 @@ const state = {
   favorites: new Set(),
   filters: { search: "", category: "", sort: "name" },
   currentLocation: null,
-  loading: false
+  loading: false,
+  dataVersion: 0 // bumped when a business changes in place, e.g. a new review
 };
 
 const els = {};
 
+// Base URL of a Business Boost server's caching OpenStreetMap proxy, set in
+// <meta name="boost-proxy">; without one the public APIs are called directly
+const proxyBase = (document.querySelector('meta[name="boost-proxy"]')?.content || '').replace(/\/+$/, '');
+
+// OSM results are cached per map tile, the same tiles the server's proxy uses
+const TILE_DEGREES = 0.02;
+const TILE_TTL_MS = 24 * 60 * 60 * 1000;
+const EARTH_RADIUS_M = 6371008.8;
+const METERS_PER_DEGREE = (Math.PI * EARTH_RADIUS_M) / 180;
+
+// Filtering and sorting run in a Web Worker (assets/filter-worker.js) when the
+// browser allows one; filteredBusinesses() is the fallback on the main thread
+const filter = {
+  worker: null,
+  latest: 0,         // id of the newest query; older replies are dropped
+  loaded: null,      // the businesses array the worker last got...
+  loadedLength: 0,
+  loadedVersion: -1  // ...and state.dataVersion at that time
+};
+
+// The business grid is windowed: only the cards in and near the viewport are
+// in the DOM, and padding above and below stands in for the rest.
+// CARD_MIN_WIDTH and GRID_GAP must match .grid in styles.css.
+const CARD_MIN_WIDTH = 280;
+const GRID_GAP = 16;
+const OVERSCAN_ROWS = 2;
+const grid = {
+  items: [],
+  first: -1,
+  last: -1,
+  rowHeight: 320,   // estimate, refined from the rows actually drawn
+  cards: new Map()  // business id -> card element currently drawn
+};
+
 function qs(id) {
   return document.getElementById(id);
 }
@@ -96,37 +131,11 @@ async function searchBusinesses(location) {
       lon = location.longitude;
     }
 
-    // Build Overpass query to find businesses within 2km radius
+    // Find businesses within 2km radius
     const radius = 2000; // 2km in meters
-    const categoryTags = getOSMCategoryTags();
-    
-    const query = `
-      [out:json][timeout:25];
-      (
-        node["shop"~"${categoryTags.shop}"](around:${radius},${lat},${lon});
-        node["amenity"~"${categoryTags.amenity}"](around:${radius},${lat},${lon});
-        way["shop"~"${categoryTags.shop}"](around:${radius},${lat},${lon});
-        way["amenity"~"${categoryTags.amenity}"](around:${radius},${lat},${lon});
-      );
-      out center meta;
-    `;
-
-    // Use Overpass API (free, no key needed)
-    const response = await fetch('https://overpass-api.de/api/interpreter', {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/x-www-form-urlencoded',
-      },
-      body: `data=${encodeURIComponent(query)}`
-    });
-
-    if (!response.ok) {
-      throw new Error(`API error: ${response.statusText}`);
-    }
+    const elements = await nearbyOSMElements(lat, lon, radius);
 
-    const data = await response.json();
-    
-    if (!data.elements || data.elements.length === 0) {
+    if (elements.length === 0) {
       showStatus("No businesses found. Try a different location or add businesses manually!", "info");
       state.businesses = sampleBusinesses;
       buildCategories();
@@ -136,7 +145,7 @@ async function searchBusinesses(location) {
     }
 
     // Transform OpenStreetMap data to our format
-    state.businesses = data.elements
+    state.businesses = elements
       .filter(element => element.tags && element.tags.name) // Only include named places
       .map(element => {
         const center = element.center || { lat: element.lat, lon: element.lon };
@@ -158,6 +167,7 @@ async function searchBusinesses(location) {
         };
       });
 
+    await rememberBusinesses(state.businesses);
     showStatus(`Found ${state.businesses.length} businesses from OpenStreetMap!`, "success");
     buildCategories();
     render();
@@ -165,8 +175,14 @@ async function searchBusinesses(location) {
 
   } catch (error) {
     console.error("Error fetching businesses:", error);
-    showStatus(`Error: ${error.message}. Using sample data.`, "error");
-    state.businesses = sampleBusinesses;
+    const saved = await savedBusinessesInCategory(state.filters.category);
+    if (saved.length) {
+      showStatus(`Error: ${error.message}. Showing businesses saved on this device.`, "error");
+      state.businesses = saved;
+    } else {
+      showStatus(`Error: ${error.message}. Using sample data.`, "error");
+      state.businesses = sampleBusinesses;
+    }
     buildCategories();
     render();
     state.loading = false;
@@ -176,14 +192,16 @@ async function searchBusinesses(location) {
 // Geocode location string to coordinates using Nominatim (free)
 async function geocodeLocation(locationString) {
   try {
-    const response = await fetch(
-      `https://nominatim.openstreetmap.org/search?format=json&q=${encodeURIComponent(locationString)}&limit=1`,
-      {
-        headers: {
-          'User-Agent': 'BusinessBoost/1.0' // Required by Nominatim
+    const response = proxyBase
+      ? await fetch(`${proxyBase}/api/v1/geo/geocode?q=${encodeURIComponent(locationString)}`)
+      : await fetch(
+        `https://nominatim.openstreetmap.org/search?format=json&q=${encodeURIComponent(locationString)}&limit=1`,
+        {
+          headers: {
+            'User-Agent': 'BusinessBoost/1.0' // Required by Nominatim
+          }
         }
-      }
-    );
+      );
     
     if (!response.ok) return null;
     
@@ -201,6 +219,81 @@ async function geocodeLocation(locationString) {
   }
 }
 
+// OSM elements within radius metres of a point. Results are fetched for the
+// whole map tile around the point and kept on the device for TILE_TTL_MS, so
+// searching again anywhere in the tile needs no network.
+async function nearbyOSMElements(lat, lon, radius) {
+  const tile = [Math.floor(lat / TILE_DEGREES), Math.floor(lon / TILE_DEGREES)];
+  const key = `${osmCategory()}:${tile[0]}:${tile[1]}:${radius}`;
+  let elements = await cachedTile(key);
+  if (!elements) {
+    const response = await fetchOSMElements(tile, radius);
+    if (!response.ok) {
+      throw new Error(`API error: ${response.statusText}`);
+    }
+    elements = (await response.json()).elements || [];
+    saveTile(key, elements);
+  }
+  return elements.filter(element => {
+    const center = element.center || { lat: element.lat, lon: element.lon };
+    return distanceMeters(lat, lon, center.lat, center.lon) <= radius;
+  });
+}
+
+// The categories the Overpass tag filters (and the proxy) know; others search everything
+function osmCategory() {
+  return ['food', 'retail', 'services'].includes(state.filters.category) ? state.filters.category : '';
+}
+
+// Ask Overpass, or the proxy when there is one, for businesses within radius of a tile
+async function fetchOSMElements(tile, radius) {
+  const south = tile[0] * TILE_DEGREES;
+  const west = tile[1] * TILE_DEGREES;
+  if (proxyBase) {
+    // A circle around the tile's middle that covers the tile plus radius
+    const lat = south + TILE_DEGREES / 2;
+    const lon = west + TILE_DEGREES / 2;
+    const reach = Math.ceil(radius + TILE_DEGREES * METERS_PER_DEGREE * Math.SQRT1_2);
+    return fetch(`${proxyBase}/api/v1/geo/places?lat=${lat}&lon=${lon}&radius=${reach}&category=${osmCategory()}`);
+  }
+
+  const latMargin = radius / METERS_PER_DEGREE;
+  const edge = Math.min(Math.max(Math.abs(south), Math.abs(south + TILE_DEGREES)) + latMargin, 89.9);
+  const lonMargin = radius / (METERS_PER_DEGREE * Math.cos(edge * Math.PI / 180));
+  const bbox = [
+    Math.max(south - latMargin, -90), west - lonMargin,
+    Math.min(south + TILE_DEGREES + latMargin, 90), west + TILE_DEGREES + lonMargin
+  ].map(n => n.toFixed(6)).join(",");
+  const categoryTags = getOSMCategoryTags();
+  const query = `
+    [out:json][timeout:25];
+    (
+      node["shop"~"${categoryTags.shop}"](${bbox});
+      node["amenity"~"${categoryTags.amenity}"](${bbox});
+      way["shop"~"${categoryTags.shop}"](${bbox});
+      way["amenity"~"${categoryTags.amenity}"](${bbox});
+    );
+    out center meta;
+  `;
+
+  // Use Overpass API (free, no key needed)
+  return fetch('https://overpass-api.de/api/interpreter', {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/x-www-form-urlencoded',
+    },
+    body: `data=${encodeURIComponent(query)}`
+  });
+}
+
+function distanceMeters(lat1, lon1, lat2, lon2) {
+  const rad = Math.PI / 180;
+  const a =
+    Math.sin(((lat2 - lat1) * rad) / 2) ** 2 +
+    Math.cos(lat1 * rad) * Math.cos(lat2 * rad) * Math.sin(((lon2 - lon1) * rad) / 2) ** 2;
+  return 2 * EARTH_RADIUS_M * Math.asin(Math.min(1, Math.sqrt(a)));
+}
+
 function getOSMCategoryTags() {
   const category = state.filters.category;
   
@@ -285,15 +378,85 @@ function showStatus(message, type = 'info') {
   }
 }
 
-function loadState() {
-  const stored = localStorage.getItem("bsbb-data");
-  if (stored) {
+// Businesses, favorites and cached OSM tiles live in IndexedDB, one record
+// each, so a review or favorite writes only what changed. Without IndexedDB
+// everything is kept under one localStorage key as before.
+const DB_NAME = "bsbb";
+const store = { db: null };
+
+function openStore() {
+  return new Promise(resolve => {
+    if (!window.indexedDB) {
+      resolve(null);
+      return;
+    }
+    const request = indexedDB.open(DB_NAME, 1);
+    request.onupgradeneeded = () => {
+      const db = request.result;
+      db.createObjectStore("businesses", { keyPath: "id" }).createIndex("category", "category");
+      db.createObjectStore("favorites", { keyPath: "id" });
+      db.createObjectStore("tiles", { keyPath: "key" }).createIndex("fetchedAt", "fetchedAt");
+      db.createObjectStore("meta", { keyPath: "key" }); // "view": ids of the businesses on screen
+    };
+    request.onsuccess = () => resolve(request.result);
+    request.onerror = () => {
+      console.warn("IndexedDB unavailable; using localStorage", request.error);
+      resolve(null);
+    };
+  });
+}
+
+// Run fn with the named object stores in one transaction; resolves once it commits
+function transact(names, mode, fn) {
+  return new Promise((resolve, reject) => {
+    const tx = store.db.transaction(names, mode);
+    const result = fn(...names.map(name => tx.objectStore(name)));
+    tx.oncomplete = () => resolve(result);
+    tx.onerror = tx.onabort = () => reject(tx.error);
+  });
+}
+
+// Fill in out[key] when an IndexedDB request succeeds
+function collect(request, out, key) {
+  request.onsuccess = () => {
+    out[key] = request.result;
+  };
+}
+
+async function loadState() {
+  store.db = await openStore();
+  if (store.db) {
     try {
-      const parsed = JSON.parse(stored);
-      state.businesses = parsed.businesses || [];
-      state.favorites = new Set(parsed.favorites || []);
+      await importLocalStorage();
+      const saved = await transact(["meta", "favorites"], "readonly", (meta, favorites) => {
+        const out = {};
+        collect(meta.get("view"), out, "view");
+        collect(favorites.getAllKeys(), out, "favorites");
+        return out;
+      });
+      state.favorites = new Set(saved.favorites);
+      if (saved.view) {
+        const byId = await savedBusinesses(saved.view.ids);
+        state.businesses = saved.view.ids.map(id => byId.get(id)).filter(Boolean);
+      } else {
+        // The sample businesses may have picked up reviews
+        const byId = await savedBusinesses(sampleBusinesses.map(b => b.id));
+        state.businesses = sampleBusinesses.map(b => byId.get(b.id) || b);
+      }
+      pruneTiles();
     } catch (e) {
-      console.warn("Failed to parse stored data", e);
+      console.warn("Failed to read stored data", e);
+    }
+  } else {
+    const stored = localStorage.getItem("bsbb-data");
+    if (stored) {
+      try {
+        const parsed = JSON.parse(stored);
+        state.businesses = parsed.businesses || [];
+        state.favorites = new Set(parsed.favorites || []);
+      } catch (e) {
+        console.warn("Failed to parse stored data", e);
+      }
     }
   }
   
@@ -310,6 +473,135 @@ function loadState() {
   }
 }
 
+// Move data saved by older versions of the site from localStorage
+async function importLocalStorage() {
+  const stored = localStorage.getItem("bsbb-data");
+  if (!stored) return;
+  let parsed;
+  try {
+    parsed = JSON.parse(stored);
+  } catch (e) {
+    console.warn("Failed to parse stored data", e);
+    localStorage.removeItem("bsbb-data");
+    return;
+  }
+  const businesses = (parsed.businesses || []).filter(b => b && b.id);
+  await transact(["businesses", "favorites", "meta"], "readwrite", (records, favorites, meta) => {
+    businesses.forEach(b => records.put(b));
+    (parsed.favorites || []).forEach(id => favorites.put({ id }));
+    meta.put({ key: "view", ids: businesses.map(b => b.id) });
+  });
+  localStorage.removeItem("bsbb-data");
+}
+
+// Map of id -> saved business for the given ids, read in one transaction
+async function savedBusinesses(ids) {
+  const found = await transact(["businesses"], "readonly", records => {
+    const out = Object.create(null);
+    ids.forEach(id => collect(records.get(id), out, id));
+    return out;
+  });
+  return new Map(Object.entries(found).filter(([, biz]) => biz));
+}
+
+// Businesses saved on this device, e.g. from earlier searches, for when OSM is unreachable
+async function savedBusinessesInCategory(category) {
+  if (!store.db) return [];
+  try {
+    const out = await transact(["businesses"], "readonly", records => {
+      const out = {};
+      collect(category ? records.index("category").getAll(category) : records.getAll(), out, "list");
+      return out;
+    });
+    return out.list || [];
+  } catch (e) {
+    console.warn("Failed to read stored businesses", e);
+    return [];
+  }
+}
+
+// Save the businesses a search found and which ones are on screen. Reviews
+// left on a place earlier are kept, even if other searches came in between.
+async function rememberBusinesses(businesses) {
+  if (!store.db) return;
+  try {
+    await transact(["businesses", "meta"], "readwrite", (records, meta) => {
+      businesses.forEach(biz => {
+        const request = records.get(biz.id);
+        request.onsuccess = () => {
+          const saved = request.result;
+          if (saved?.reviews?.length) biz.reviews = saved.reviews;
+          if (saved?.deals?.length && !biz.deals.length) biz.deals = saved.deals;
+          records.put(biz);
+        };
+      });
+      meta.put({ key: "view", ids: businesses.map(b => b.id) });
+    });
+  } catch (e) {
+    console.warn("Failed to save businesses", e);
+  }
+}
+
+// Save one new or changed business (and the list on screen, which may now include it)
+function persistBusiness(biz) {
+  if (!store.db) {
+    saveState();
+    return;
+  }
+  transact(["businesses", "meta"], "readwrite", (records, meta) => {
+    records.put(biz);
+    meta.put({ key: "view", ids: state.businesses.map(b => b.id) });
+  }).catch(e => console.warn("Failed to save business", e));
+}
+
+function persistFavorite(id) {
+  if (!store.db) {
+    saveState();
+    return;
+  }
+  transact(["favorites"], "readwrite", favorites => {
+    if (state.favorites.has(id)) favorites.put({ id });
+    else favorites.delete(id);
+  }).catch(e => console.warn("Failed to save favorite", e));
+}
+
+async function cachedTile(key) {
+  if (!store.db) return null;
+  try {
+    const out = await transact(["tiles"], "readonly", tiles => {
+      const out = {};
+      collect(tiles.get(key), out, "tile");
+      return out;
+    });
+    return out.tile && Date.now() - out.tile.fetchedAt < TILE_TTL_MS ? out.tile.elements : null;
+  } catch (e) {
+    console.warn("Failed to read cached tile", e);
+    return null;
+  }
+}
+
+function saveTile(key, elements) {
+  if (!store.db) return;
+  transact(["tiles"], "readwrite", tiles => {
+    tiles.put({ key, fetchedAt: Date.now(), elements });
+  }).catch(e => console.warn("Failed to cache tile", e));
+}
+
+// Drop expired tiles so the cache does not grow forever
+function pruneTiles() {
+  transact(["tiles"], "readwrite", tiles => {
+    const expired = IDBKeyRange.upperBound(Date.now() - TILE_TTL_MS);
+    tiles.index("fetchedAt").openCursor(expired).onsuccess = e => {
+      const cursor = e.target.result;
+      if (cursor) {
+        cursor.delete();
+        cursor.continue();
+      }
+    };
+  }).catch(e => console.warn("Failed to prune cached tiles", e));
+}
+
+// Without IndexedDB: save everything under one localStorage key
 function saveState() {
   localStorage.setItem(
     "bsbb-data",
@@ -408,23 +700,139 @@ function filteredBusinesses() {
   return list;
 }
 
+const NO_RESULTS = "No businesses found. Try another search or location, or add businesses manually!";
+
 function render() {
   renderStats();
   updateFiltersUI();
-  const list = qs("businessList");
-  list.innerHTML = "";
-  
+
   if (state.loading) {
-    list.innerHTML = `<div class="empty"><i class="fas fa-spinner fa-spin"></i> Loading businesses...</div>`;
+    filter.latest++; // drop replies still on their way
+    showCards([], `<i class="fas fa-spinner fa-spin"></i> Loading businesses...`);
     return;
   }
-  
-  const data = filteredBusinesses();
-  if (!data.length) {
-    list.innerHTML = `<div class="empty">No businesses found. Try another search or location, or add businesses manually!</div>`;
+
+  refreshList();
+}
+
+// Re-run the search, category filter and sort, and show the result
+function refreshList() {
+  if (!filter.worker) {
+    showCards(filteredBusinesses(), NO_RESULTS);
     return;
   }
-  data.forEach(biz => list.appendChild(cardForBusiness(biz)));
+  syncFilterWorker();
+  const { search, category, sort } = state.filters;
+  filter.worker.postMessage({ type: "query", id: ++filter.latest, search, category, sort });
+}
+
+function startFilterWorker() {
+  if (!window.Worker) return;
+  try {
+    filter.worker = new Worker("assets/filter-worker.js?v=1");
+  } catch (e) {
+    // Pages opened from file:// may not start workers
+    console.warn("Filtering on the main thread", e);
+    return;
+  }
+  filter.worker.onmessage = e => {
+    if (e.data.id !== filter.latest) return; // a newer query is on its way
+    showCards(Array.from(e.data.indices, i => state.businesses[i]), NO_RESULTS);
+  };
+  filter.worker.onerror = e => {
+    console.warn("Filter worker failed; filtering on the main thread", e);
+    filter.worker = null;
+    refreshList();
+  };
+}
+
+// Send the worker the fields it filters and sorts on whenever the list changed
+function syncFilterWorker() {
+  if (
+    filter.loaded === state.businesses &&
+    filter.loadedLength === state.businesses.length &&
+    filter.loadedVersion === state.dataVersion
+  ) {
+    return;
+  }
+  filter.loaded = state.businesses;
+  filter.loadedLength = state.businesses.length;
+  filter.loadedVersion = state.dataVersion;
+  filter.worker.postMessage({
+    type: "load",
+    rows: state.businesses.map(b => ({
+      name: b.name || "",
+      address: b.address || "",
+      category: b.category || "",
+      rating: averageRating(b),
+      reviews: totalReviews(b)
+    }))
+  });
+}
+
+function debounce(fn, wait) {
+  let timer;
+  return (...args) => {
+    clearTimeout(timer);
+    timer = setTimeout(() => fn(...args), wait);
+  };
+}
+
+function showCards(items, emptyMessage) {
+  const list = qs("businessList");
+  grid.items = items;
+  grid.first = grid.last = -1;
+  grid.cards.clear();
+  if (!items.length) {
+    list.style.paddingTop = list.style.paddingBottom = "";
+    list.innerHTML = `<div class="empty">${emptyMessage}</div>`;
+    return;
+  }
+  drawWindow();
+}
+
+// Draw the rows of cards that are on screen, plus a few either side
+function drawWindow() {
+  const items = grid.items;
+  if (!items.length) return;
+  const list = qs("businessList");
+  const columns = Math.max(1, Math.floor((list.clientWidth + GRID_GAP) / (CARD_MIN_WIDTH + GRID_GAP)));
+  const rows = Math.ceil(items.length / columns);
+  const top = list.getBoundingClientRect().top;
+  const firstRow = Math.min(rows - 1, Math.max(0, Math.floor(-top / grid.rowHeight) - OVERSCAN_ROWS));
+  const lastRow = Math.min(
+    rows - 1,
+    Math.max(firstRow, Math.ceil((window.innerHeight - top) / grid.rowHeight) + OVERSCAN_ROWS)
+  );
+  const first = firstRow * columns;
+  const last = Math.min(items.length, (lastRow + 1) * columns);
+  if (first === grid.first && last === grid.last) return;
+  grid.first = first;
+  grid.last = last;
+
+  // Cards still in the window are moved, not rebuilt
+  const cards = new Map();
+  const fragment = document.createDocumentFragment();
+  for (let i = first; i < last; i++) {
+    const biz = items[i];
+    const card = grid.cards.get(biz.id) || cardForBusiness(biz);
+    cards.set(biz.id, card);
+    fragment.appendChild(card);
+  }
+  grid.cards = cards;
+  list.style.paddingTop = `${firstRow * grid.rowHeight}px`;
+  list.style.paddingBottom = `${(rows - 1 - lastRow) * grid.rowHeight}px`;
+  list.replaceChildren(fragment);
+
+  // Learn the real row height (cards vary) from the rows just drawn
+  const drawnRows = lastRow - firstRow + 1;
+  const drawnHeight = list.getBoundingClientRect().height - (rows - drawnRows) * grid.rowHeight;
+  const measured = (drawnHeight + GRID_GAP) / drawnRows;
+  if (measured > 0 && Math.abs(measured - grid.rowHeight) > 1) {
+    grid.rowHeight = measured;
+    list.style.paddingTop = `${firstRow * grid.rowHeight}px`;
+    list.style.paddingBottom = `${(rows - 1 - lastRow) * grid.rowHeight}px`;
+  }
 }
 
 function cardForBusiness(biz) {
@@ -463,14 +871,14 @@ function cardForBusiness(biz) {
   favBtn.addEventListener("click", () => {
     if (state.favorites.has(biz.id)) state.favorites.delete(biz.id);
     else state.favorites.add(biz.id);
-    saveState();
+    persistFavorite(biz.id);
     syncFav();
   });
   syncFav();
 
   tpl.querySelector(".details-btn").addEventListener("click", () => openDetails(biz.id));
 
-  return tpl;
+  return tpl.firstElementChild;
 }
 
 function openDetails(id) {
@@ -574,7 +982,7 @@ function openDetails(id) {
   favToggle.addEventListener("click", () => {
     if (state.favorites.has(biz.id)) state.favorites.delete(biz.id);
     else state.favorites.add(biz.id);
-    saveState();
+    persistFavorite(biz.id);
     syncFavBtn();
     render();
   });
@@ -602,7 +1010,8 @@ function openDetails(id) {
       comment,
       date: new Date().toISOString().split("T")[0]
     });
-    saveState();
+    state.dataVersion++;
+    persistBusiness(biz);
     openDetails(biz.id);
     render();
   });
@@ -618,13 +1027,8 @@ function showFavorites() {
   state.filters.sort = "name";
   const favIds = state.favorites;
   const list = state.businesses.filter(b => favIds.has(b.id));
-  const container = qs("businessList");
-  container.innerHTML = "";
-  if (!list.length) {
-    container.innerHTML = `<div class="empty">No favorites yet. Click the heart on a business to add it.</div>`;
-  } else {
-    list.forEach(b => container.appendChild(cardForBusiness(b)));
-  }
+  filter.latest++; // drop replies still on their way
+  showCards(list, "No favorites yet. Click the heart on a business to add it.");
 }
 
 function addBusinessFlow() {
@@ -655,7 +1059,7 @@ function addBusinessFlow() {
     reviews: []
   };
   state.businesses.push(newBiz);
-  saveState();
+  persistBusiness(newBiz);
   buildCategories();
   render();
 }
@@ -668,6 +1072,32 @@ function bindEvents() {
     render();
   });
 
+  // Search as you type; the category and sort menus apply straight away
+  qs("search").addEventListener("input", debounce(() => {
+    state.filters.search = qs("search").value.trim();
+    refreshList();
+  }, 150));
+  ["category", "sort"].forEach(id => qs(id).addEventListener("change", () => {
+    state.filters[id] = qs(id).value;
+    render();
+  }));
+
+  // Keep the window of drawn cards in step with the viewport
+  let framePending = false;
+  const redraw = () => {
+    if (framePending) return;
+    framePending = true;
+    requestAnimationFrame(() => {
+      framePending = false;
+      drawWindow();
+    });
+  };
+  window.addEventListener("scroll", redraw, { passive: true });
+  window.addEventListener("resize", () => {
+    grid.first = grid.last = -1;
+    redraw();
+  });
+
   qs("topRatedBtn").addEventListener("click", () => {
     state.filters.sort = "rating";
     render();
@@ -696,11 +1126,12 @@ function bindEvents() {
   // No API key needed - OpenStreetMap is free!
 }
 
-function init() {
+async function init() {
   els.list = qs("businessList");
   // Hide API key banner - not needed with OpenStreetMap
   qs("apiKeyBanner").style.display = "none";
-  loadState();
+  await loadState();
+  startFilterWorker();
   buildCategories();
   bindEvents();
   render();
@@ -0,0 +1,66 @@
+// Byte-Sized Business Boost - search, category filter and sort for app.js,
+// run off the main thread so typing stays smooth with thousands of businesses.
+//
+// Messages in:
+//   { type: "load", rows: [{ name, address, category, rating, reviews }] }
+//   { type: "query", id, search, category, sort }
+// Messages out:
+//   { id, indices }  positions in the loaded rows, filtered and sorted
+
+const collator = new Intl.Collator();
+let rows = [];
+let orders = {}; // sort key -> every row position in that order, built on first use
+let last = null; // previous query and its result, which a longer search term narrows
+
+self.onmessage = e => {
+  const message = e.data;
+  if (message.type === "load") {
+    rows = message.rows.map(row => ({
+      ...row,
+      // One string to search; the separator keeps a term from matching across fields
+      text: `${row.name}\u0000${row.address}\u0000${row.category}`.toLowerCase()
+    }));
+    orders = {};
+    last = null;
+  } else if (message.type === "query") {
+    const indices = query(message);
+    self.postMessage({ id: message.id, indices }, [indices.buffer]);
+  }
+};
+
+function query({ search, category, sort }) {
+  const term = search.toLowerCase();
+  // Typing one more letter only removes matches, so filter the last result
+  // instead of everything; it is already in sort order.
+  const narrows = last && last.category === category && last.sort === sort && term.startsWith(last.term);
+  const source = narrows ? last.indices : orderFor(sort);
+
+  const found = new Int32Array(source.length);
+  let count = 0;
+  for (let i = 0; i < source.length; i++) {
+    const row = rows[source[i]];
+    if (category && row.category !== category) continue;
+    if (term && !row.text.includes(term)) continue;
+    found[count++] = source[i];
+  }
+
+  const indices = found.slice(0, count);
+  last = { term, category, sort, indices: indices.slice() }; // the reply's copy is transferred away
+  return indices;
+}
+
+function orderFor(sort) {
+  if (!orders[sort]) {
+    const order = Array.from(rows.keys());
+    // Same orders as filteredBusinesses() in app.js; the sort is stable, so ties keep list order
+    if (sort === "rating") {
+      order.sort((a, b) => rows[b].rating - rows[a].rating);
+    } else if (sort === "reviews") {
+      order.sort((a, b) => rows[b].reviews - rows[a].reviews);
+    } else {
+      order.sort((a, b) => collator.compare(rows[a].name, rows[b].name));
+    }
+    orders[sort] = Int32Array.from(order);
+  }
+  return orders[sort];
+}
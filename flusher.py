@@ -0,0 +1,69 @@
+"""
+Background group commit for Byte-Sized Business Boost
+"""
+
+import threading
+import time
+from typing import Callable
+
+
+class BackgroundFlusher:
+    """Runs a flush function on a background thread, batching many mutations into one write.
+
+    Mutations call ``notify()`` and return straight away. The first
+    notification after a flush starts a timer; the flush runs when the timer
+    reaches ``interval`` seconds or as soon as ``max_pending`` notifications
+    have piled up, whichever comes first.
+    """
+
+    def __init__(self, flush: Callable[[], None], interval: float = 1.0, max_pending: int = 100):
+        self.interval = interval
+        self.max_pending = max_pending
+        self.flushes = 0
+        self._flush = flush
+        self._pending = 0
+        self._stopped = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="business-boost-flusher", daemon=True)
+        self._thread.start()
+
+    def notify(self):
+        """Record that one more mutation is waiting to be written."""
+        with self._cond:
+            self._pending += 1
+            if self._pending == 1 or self._pending >= self.max_pending:
+                self._cond.notify()
+
+    def stop(self):
+        """Stop the thread after it has written whatever is pending."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopped:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                deadline = time.monotonic() + self.interval
+                while self._pending < self.max_pending and not self._stopped:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                self._pending = 0
+
+            try:
+                self._flush()
+                self.flushes += 1
+            except Exception as e:
+                # The mutations stay pending and are retried with the next flush
+                print(f"Error flushing data: {e}")
+                if self._stopped:
+                    return
+                with self._cond:
+                    self._pending += 1
+                time.sleep(self.interval)
@@ -0,0 +1,141 @@
+"""
+Spatial index for Byte-Sized Business Boost
+"""
+
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+MAX_RADIUS_KM = 500.0
+
+
+def distance_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle (haversine) distance between two points."""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def valid_coordinates(latitude, longitude) -> bool:
+    """Check that a latitude/longitude pair is a real point on the map."""
+    try:
+        return -90 <= float(latitude) <= 90 and -180 <= float(longitude) <= 180
+    except (TypeError, ValueError):
+        return False
+
+
+def parse_point(text: str, name: str = "location") -> Tuple[float, float]:
+    """Parse "latitude,longitude", raising ValueError with a message fit for the user."""
+    try:
+        latitude, longitude = (float(part) for part in text.split(","))
+    except ValueError:
+        raise ValueError(f"{name} must be latitude,longitude") from None
+    if not valid_coordinates(latitude, longitude):
+        raise ValueError(f"{name} is not a valid latitude,longitude")
+    return latitude, longitude
+
+
+def parse_near(near: str, radius: str = "") -> Tuple[float, float, float]:
+    """Parse the ``near=lat,lon`` and ``radius=`` (km, default 2) query arguments.
+
+    Raises ValueError with a message fit for the user.
+    """
+    latitude, longitude = parse_point(near, "near")
+    try:
+        radius_km = float(radius) if radius else 2.0
+    except ValueError:
+        raise ValueError("radius must be a number of kilometres") from None
+    if not 0 < radius_km <= MAX_RADIUS_KM:
+        raise ValueError(f"radius must be above 0 and at most {MAX_RADIUS_KM:g} km")
+    return latitude, longitude, radius_km
+
+
+class GeoIndex:
+    """Grid index over business coordinates for radius searches.
+
+    The map is cut into cells of ``CELL_DEGREES`` on each side (about 1 km
+    north to south) and each business is filed under its cell. A radius query
+    only looks at the cells overlapping the circle's bounding box, or at every
+    occupied cell when that is fewer, and measures the real distance to the
+    businesses there. Businesses without coordinates are not indexed.
+    """
+
+    CELL_DEGREES = 0.01
+    _LON_CELLS = round(360 / CELL_DEGREES)
+
+    def __init__(self):
+        self._cells: Dict[Tuple[int, int], List[Tuple[float, float, object]]] = {}  # (lat, lon, business)
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        return (math.floor(latitude / self.CELL_DEGREES),
+                math.floor(longitude / self.CELL_DEGREES) % self._LON_CELLS)
+
+    def add(self, business):
+        if business.latitude is None or business.longitude is None:
+            return
+        latitude, longitude = float(business.latitude), float(business.longitude)
+        self._cells.setdefault(self._cell(latitude, longitude), []).append((latitude, longitude, business))
+        self._count += 1
+
+    def remove(self, business):
+        if business.latitude is None or business.longitude is None:
+            return
+        key = self._cell(float(business.latitude), float(business.longitude))
+        cell = self._cells.get(key, [])
+        for i, entry in enumerate(cell):
+            if entry[2] is business:
+                del cell[i]
+                self._count -= 1
+                if not cell:
+                    del self._cells[key]
+                return
+
+    def _candidate_cells(self, latitude: float, longitude: float, radius_km: float) -> Iterable[List]:
+        lat_span = radius_km / KM_PER_DEGREE
+        south, _ = self._cell(max(latitude - lat_span, -90.0), longitude)
+        north, _ = self._cell(min(latitude + lat_span, 90.0), longitude)
+        # Longitude degrees shrink towards the poles, so size the columns for the
+        # box's edge furthest from the equator; near a pole every column is in range
+        cos_lat = math.cos(math.radians(min(abs(latitude) + lat_span, 90.0)))
+        lon_span = radius_km / (KM_PER_DEGREE * cos_lat) if cos_lat > 1e-9 else 360.0
+        if lon_span >= 180:
+            columns = range(self._LON_CELLS)
+        else:
+            west = math.floor((longitude - lon_span) / self.CELL_DEGREES)
+            east = math.floor((longitude + lon_span) / self.CELL_DEGREES)
+            columns = range(west, east + 1)
+
+        if (north - south + 1) * len(columns) > len(self._cells):
+            return (cell for (row, _), cell in self._cells.items() if south <= row <= north)
+        cells = self._cells
+        return (cells[key] for key in ((row, column % self._LON_CELLS)
+                                       for row in range(south, north + 1) for column in columns)
+                if key in cells)
+
+    def near(self, latitude: float, longitude: float, radius_km: float,
+             limit: Optional[int] = None) -> List[Tuple[object, float]]:
+        """Return (business, distance in km) within ``radius_km``, nearest first."""
+        # distance_km inlined, with the query point's terms worked out once
+        radians, sin, cos, asin, sqrt = math.radians, math.sin, math.cos, math.asin, math.sqrt
+        phi = radians(latitude)
+        cos_phi = cos(phi)
+        # Compare haversine terms instead of distances; only matches are converted to km
+        limit_h = sin(min(radius_km / (2 * EARTH_RADIUS_KM), math.pi / 2)) ** 2
+        found = []
+        for cell in self._candidate_cells(latitude, longitude, radius_km):
+            for lat, lon, business in cell:
+                h = (sin((radians(lat) - phi) / 2) ** 2
+                     + cos_phi * cos(radians(lat)) * sin(radians(lon - longitude) / 2) ** 2)
+                if h <= limit_h:
+                    found.append((h, len(found), business))
+        found.sort()
+        if limit is not None:
+            found = found[:limit]
+        return [(business, 2 * EARTH_RADIUS_KM * asin(min(1.0, sqrt(h)))) for h, _, business in found]
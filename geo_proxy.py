@@ -0,0 +1,293 @@
+"""
+Caching OpenStreetMap proxy for Byte-Sized Business Boost
+
+The GitHub Pages front end (docs/assets/app.js) looks up places with the
+Overpass API and geocodes searches with Nominatim. Sent straight from every
+browser, identical lookups hit those services again and again and get
+rate-limited. These endpoints answer them from a disk cache instead:
+
+    GET /api/v1/geo/places?lat=..&lon=..&radius=2000&category=food
+        -> {"elements": [...]}, Overpass elements within radius metres,
+           nearest first
+    GET /api/v1/geo/geocode?q=..
+        -> Nominatim's JSON result list (at most one result)
+
+Places are fetched and cached per map tile, category and radius, so every
+point in a tile shares one upstream query; each response is then cut down to
+the requested circle. Geocodes are cached per normalized query text. Entries
+expire after a TTL but are still served if the upstream fails. Identical
+lookups that arrive while one is being fetched wait for it rather than
+querying the upstream again, also across worker processes. The upstream URLs
+are settings, so tests can point them at a local stub server.
+"""
+
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from typing import Callable, Dict, List, Optional, Tuple
+
+from flask import Blueprint, current_app, jsonify, request
+
+from geo_index import KM_PER_DEGREE, distance_km, valid_coordinates
+from storage import FileLock
+
+OVERPASS_URL = "https://overpass-api.de/api/interpreter"
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+USER_AGENT = "BusinessBoost/1.0"  # Nominatim requires one
+
+# Same tag filters as getOSMCategoryTags in docs/assets/app.js
+CATEGORY_TAGS = {
+    "food": ("supermarket|bakery|butcher|confectionery|convenience",
+             "restaurant|cafe|fast_food|bar|pub|food_court|ice_cream"),
+    "retail": (".*", "marketplace|vending_machine"),
+    "services": ("hairdresser|beauty|laundry|dry_cleaning|car_repair|car_wash",
+                 "bank|pharmacy|post_office|library|community_centre|dentist|doctors|veterinary"),
+    "": (".*", "restaurant|cafe|fast_food|bar|pub|bank|pharmacy|post_office|library|marketplace"),
+}
+
+MAX_RADIUS_M = 5000
+
+
+class UpstreamError(Exception):
+    """The Overpass or Nominatim server could not be reached or gave an error."""
+
+
+class _Flight:
+    """One upstream lookup in progress, which identical lookups wait for."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class GeoProxy:
+    """Disk-cached, request-coalescing client for Overpass and Nominatim."""
+
+    TILE_DEGREES = 0.02  # about 2 km north to south
+    LOCK_STRIPES = 64
+
+    def __init__(self, cache_dir: str = "geo_cache", ttl: float = 86400,
+                 overpass_url: str = OVERPASS_URL, nominatim_url: str = NOMINATIM_URL,
+                 timeout: float = 30.0):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.overpass_url = overpass_url
+        self.nominatim_url = nominatim_url
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.stale = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, _Flight] = {}
+        # A thread lock plus a lock file per stripe, so one process at a time fetches a key
+        self._stripe_locks = [threading.Lock() for _ in range(self.LOCK_STRIPES)]
+        self._stripe_files = [FileLock(os.path.join(cache_dir, f".lock-{i:02d}"))
+                              for i in range(self.LOCK_STRIPES)]
+
+    def places(self, latitude: float, longitude: float, radius_m: int = 2000,
+               category: str = "") -> Tuple[Dict, str]:
+        """Overpass elements within radius_m of a point, nearest first, and the cache outcome."""
+        tile = (math.floor(latitude / self.TILE_DEGREES), math.floor(longitude / self.TILE_DEGREES))
+        # Radius rounded up to whole kilometres, so nearby radii share an entry
+        margin_km = math.ceil(radius_m / 1000)
+        key = f"places:{tile[0]}:{tile[1]}:{category}:{margin_km}"
+        body, status = self._cached(key, lambda: self._fetch_tile(tile, category, margin_km))
+
+        radius_km = radius_m / 1000
+        inside = []
+        for element in body.get("elements", []):
+            center = element.get("center") or {"lat": element.get("lat"), "lon": element.get("lon")}
+            if not valid_coordinates(center.get("lat"), center.get("lon")):
+                continue
+            distance = distance_km(latitude, longitude, float(center["lat"]), float(center["lon"]))
+            if distance <= radius_km:
+                inside.append((distance, len(inside), element))
+        inside.sort(key=lambda entry: entry[:2])
+        return {"elements": [element for _, _, element in inside]}, status
+
+    def geocode(self, query: str) -> Tuple[List, str]:
+        """Nominatim's result list for a place name, and the cache outcome."""
+        normalized = " ".join(query.casefold().split())
+        return self._cached(f"geocode:{normalized}", lambda: self._fetch_geocode(normalized))
+
+    def _fetch_tile(self, tile: Tuple[int, int], category: str, margin_km: int) -> Dict:
+        south = tile[0] * self.TILE_DEGREES
+        west = tile[1] * self.TILE_DEGREES
+        north = south + self.TILE_DEGREES
+        east = west + self.TILE_DEGREES
+        lat_margin = margin_km / KM_PER_DEGREE
+        cos_lat = max(math.cos(math.radians(min(max(abs(south), abs(north)) + lat_margin, 90.0))), 1e-6)
+        lon_margin = min(margin_km / (KM_PER_DEGREE * cos_lat), 180.0)
+        bbox = (f"{max(south - lat_margin, -90):.6f},{west - lon_margin:.6f},"
+                f"{min(north + lat_margin, 90):.6f},{east + lon_margin:.6f}")
+        shop, amenity = CATEGORY_TAGS[category]
+        query = f"""
+            [out:json][timeout:25];
+            (
+              node["shop"~"{shop}"]({bbox});
+              node["amenity"~"{amenity}"]({bbox});
+              way["shop"~"{shop}"]({bbox});
+              way["amenity"~"{amenity}"]({bbox});
+            );
+            out center meta;
+        """
+        body = urllib.parse.urlencode({"data": query}).encode()
+        data = self._request(urllib.request.Request(self.overpass_url, data=body, headers={
+            "Content-Type": "application/x-www-form-urlencoded", "User-Agent": USER_AGENT}))
+        if not isinstance(data, dict):
+            raise UpstreamError("unexpected Overpass response")
+        return {"elements": data.get("elements", [])}
+
+    def _fetch_geocode(self, query: str) -> List:
+        url = f"{self.nominatim_url}?{urllib.parse.urlencode({'format': 'json', 'q': query, 'limit': 1})}"
+        data = self._request(urllib.request.Request(url, headers={"User-Agent": USER_AGENT}))
+        if not isinstance(data, list):
+            raise UpstreamError("unexpected Nominatim response")
+        return data
+
+    def _request(self, upstream_request: urllib.request.Request):
+        try:
+            with urllib.request.urlopen(upstream_request, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except (OSError, ValueError) as e:  # URLError and HTTPError are OSErrors
+            raise UpstreamError(str(e)) from e
+
+    def _cached(self, key: str, fetch: Callable[[], object]) -> Tuple[object, str]:
+        """Serve a key from the cache, or fetch it once however many requests want it."""
+        entry = self._read(key)
+        if entry is not None and time.time() - entry["fetched_at"] < self.ttl:
+            self.hits += 1
+            return entry["body"], "HIT"
+
+        with self._lock:
+            flight = self._in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._in_flight[key] = _Flight()
+            else:
+                self.coalesced += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, "COALESCED"
+
+        try:
+            flight.result, status = self._fetch_once(key, fetch)
+            return flight.result, status
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            flight.done.set()
+
+    def _fetch_once(self, key: str, fetch: Callable[[], object]) -> Tuple[object, str]:
+        stripe = int(hashlib.sha1(key.encode()).hexdigest(), 16) % self.LOCK_STRIPES
+        with self._stripe_locks[stripe]:
+            self._stripe_files[stripe].acquire()
+            try:
+                # Another worker process may have fetched it while we waited
+                entry = self._read(key)
+                if entry is not None and time.time() - entry["fetched_at"] < self.ttl:
+                    self.hits += 1
+                    return entry["body"], "HIT"
+                try:
+                    body = fetch()
+                except UpstreamError:
+                    if entry is None:
+                        raise
+                    self.stale += 1
+                    return entry["body"], "STALE"
+                self.misses += 1
+                self._write(key, body)
+                return body, "MISS"
+            finally:
+                self._stripe_files[stripe].release()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode()).hexdigest() + ".json")
+
+    def _read(self, key: str) -> Optional[Dict]:
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return entry if entry.get("key") == key else None
+
+    def _write(self, key: str, body):
+        path = self._path(key)
+        temp_file = f"{path}.{os.getpid()}.tmp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump({"key": key, "fetched_at": time.time(), "body": body}, f, separators=(',', ':'))
+        os.replace(temp_file, path)
+
+
+geo = Blueprint('geo', __name__, url_prefix='/api/v1/geo')
+
+
+def _proxy() -> GeoProxy:
+    return current_app.extensions['geo_proxy']
+
+
+def _error(message: str, status: int):
+    return jsonify({'error': message}), status
+
+
+@geo.after_request
+def allow_pages_origin(response):
+    """The front end is served from GitHub Pages, another origin."""
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    return response
+
+
+@geo.route('/places', methods=['GET'])
+def places():
+    """OpenStreetMap businesses around a point, in the Overpass result format."""
+    try:
+        latitude = float(request.args.get('lat', ''))
+        longitude = float(request.args.get('lon', ''))
+        radius = int(request.args.get('radius', 2000))
+    except ValueError:
+        return _error('lat, lon and radius must be numbers.', 400)
+    if not valid_coordinates(latitude, longitude):
+        return _error('lat and lon must be a point on the map.', 400)
+    if not 0 < radius <= MAX_RADIUS_M:
+        return _error(f'radius must be between 1 and {MAX_RADIUS_M} metres.', 400)
+    category = request.args.get('category', '').strip().lower()
+    if category not in CATEGORY_TAGS:
+        return _error(f'Unknown category "{category}".', 400)
+
+    try:
+        body, status = _proxy().places(latitude, longitude, radius, category)
+    except UpstreamError as e:
+        return _error(f'OpenStreetMap lookup failed: {e}', 502)
+    response = jsonify(body)
+    response.headers['X-Cache'] = status
+    return response
+
+
+@geo.route('/geocode', methods=['GET'])
+def geocode():
+    """Coordinates for a place name, in the Nominatim result format."""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return _error('q is required.', 400)
+    try:
+        body, status = _proxy().geocode(query)
+    except UpstreamError as e:
+        return _error(f'Geocoding failed: {e}', 502)
+    response = jsonify(body)
+    response.headers['X-Cache'] = status
+    return response
@@ -2,32 +2,159 @@
 Business models for Byte-Sized Business Boost
 """
 
-import json
+import atexit
+import functools
 import os
 import random
 import string
-from datetime import datetime
-from typing import Dict, List, Optional
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from flusher import BackgroundFlusher
+from geo_index import GeoIndex
+from reviews import ReviewCache, ReviewList
+from rwlock import ReadWriteLock, read_locked, write_locked
+from search_index import FullTextIndex, TrigramIndex, tokenize
+from sorted_index import SortedIndex
+from storage import open_storage
+
+
+class IdGenerator:
+    """Generates unique, time-ordered business IDs.
+    
+    An ID is 12 base62 characters: a 7-character millisecond timestamp, a
+    3-character counter for IDs created within the same millisecond and a
+    2-character tag picked once per process. IDs from one process are strictly
+    increasing and never repeat; existing 8-character IDs stay valid because
+    IDs are only ever compared for equality.
+    """
+    
+    ALPHABET = string.digits + string.ascii_uppercase + string.ascii_lowercase
+    COUNTER_LIMIT = 62 ** 3
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_ms = 0
+        self._counter = 0
+        self.reseed()
+    
+    def reseed(self):
+        """Pick a new process tag (forked workers must not share their parent's)."""
+        self._tag = self._encode(random.randrange(62 ** 2), 2)
+    
+    @classmethod
+    def _encode(cls, value: int, width: int) -> str:
+        chars = []
+        for _ in range(width):
+            value, digit = divmod(value, 62)
+            chars.append(cls.ALPHABET[digit])
+        return ''.join(reversed(chars))
+    
+    def next_id(self) -> str:
+        """Return the next ID."""
+        with self._lock:
+            now = int(time.time() * 1000)
+            if now > self._last_ms:
+                self._last_ms = now
+                self._counter = 0
+            else:
+                # Same millisecond (or the clock went backwards): keep counting
+                self._counter += 1
+                if self._counter >= self.COUNTER_LIMIT:
+                    self._last_ms += 1
+                    self._counter = 0
+            return self._encode(self._last_ms, 7) + self._encode(self._counter, 3) + self._tag
+
+
+_id_generator = IdGenerator()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_id_generator.reseed)
+
+
+def _business_id(business: 'Business') -> str:
+    """Tie-break for sorted views; the same in every process, unlike load order."""
+    return business.id
+
+
+# Sort key of every sorted view; reviewed businesses come first in the rating order
+SORT_KEYS: Dict[str, Callable[['Business'], object]] = {
+    "name": lambda b: b.name,
+    "rating": lambda b: -b.get_average_rating(),
+    "reviews": lambda b: -b.get_review_count(),
+}
+
+
+def mutation(method):
+    """Run a BusinessBoost mutation under its write lock and the storage's
+    cross-process lock, after applying whatever other processes wrote."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock.write(), self.storage.locked():
+            self._sync()
+            return method(self, *args, **kwargs)
+    return wrapper
 
 
 class Business:
-    """Represents a local business."""
+    """Represents a local business.
+    
+    Businesses use ``__slots__`` and keep their reviews in a column-wise
+    ReviewList, since a large directory holds many of both. A business loaded
+    from a lazy snapshot starts with only its rating aggregates and review
+    search terms; its reviews are read through ``_review_loader`` on first use.
+    """
+    
+    __slots__ = ("id", "name", "category", "address", "phone", "description", "deals", "latitude",
+                 "longitude", "_reviews", "created_at", "_rating_count", "_rating_sum", "_rating_histogram", "version",
+                 "updated_at", "_review_terms", "_stored_reviews", "_review_loader")
     
     def __init__(self, name: str, category: str, address: str, phone: str = "", 
-                 description: str = "", deals: List[Dict] = None):
-        self.id = self._generate_id()
+                 description: str = "", deals: List[Dict] = None, business_id: Optional[str] = None,
+                 latitude: Optional[float] = None, longitude: Optional[float] = None):
+        self.id = business_id or self._generate_id()
         self.name = name
         self.category = category.lower()
         self.address = address
         self.phone = phone
         self.description = description
         self.deals = deals or []
-        self.reviews = []
+        # Location for radius searches; both are None when it is unknown
+        self.latitude = latitude
+        self.longitude = longitude
+        self._reviews = ReviewList()
         self.created_at = datetime.now().isoformat()
+        # Running rating aggregates so averages and counts never walk the review list
+        self._rating_count = 0
+        self._rating_sum = 0
+        self._rating_histogram = [0] * 5  # index 0 holds 1-star reviews, index 4 holds 5-star
+        # Sequence number of the last mutation of this business or its reviews (used
+        # for HTTP caching); stored with the data, so every process agrees on it
+        self.version = 0
+        self.updated_at: Optional[datetime] = None
+        # Lazy review loading: cached search terms of the reviews, how many reviews
+        # the store's review file holds for this business, and the cache to load them through
+        self._review_terms: Optional[Dict[str, int]] = None
+        self._stored_reviews = 0
+        self._review_loader: Optional[Callable[['Business'], ReviewList]] = None
     
-    def _generate_id(self) -> str:
+    @staticmethod
+    def _generate_id() -> str:
         """Generate a unique ID for the business."""
-        return ''.join(random.choices(string.ascii_letters + string.digits, k=8))
+        return _id_generator.next_id()
+    
+    @property
+    def reviews(self) -> ReviewList:
+        """The business's reviews; each one reads like a dict."""
+        if self._review_loader is not None:
+            return self._review_loader(self)
+        return self._reviews
+    
+    @reviews.setter
+    def reviews(self, reviews):
+        self._reviews = reviews if isinstance(reviews, ReviewList) else ReviewList(reviews)
+        self._review_terms = None
     
     def add_review(self, user_name: str, rating: int, comment: str, verified: bool = False):
         """Add a review to the business."""
@@ -41,31 +168,101 @@ class Business:
             "verified": verified,
             "date": datetime.now().isoformat()
         }
+        self._append_review(review)
+    
+    def _append_review(self, review: Dict):
+        """Store a review and fold its rating into the running aggregates."""
         self.reviews.append(review)
+        self._count_rating(review["rating"])
+        if self._review_terms is not None:
+            for term in tokenize(review.get("comment", "")):
+                self._review_terms[term] = self._review_terms.get(term, 0) + 1
+    
+    def _count_rating(self, rating: int):
+        rating = int(rating)
+        self._rating_count += 1
+        self._rating_sum += rating
+        self._rating_histogram[rating - 1] += 1
+    
+    def _rebuild_rating_stats(self):
+        """Recompute the rating aggregates from the review list's rating column."""
+        ratings = self._reviews.ratings()
+        self._rating_count = len(ratings)
+        self._rating_sum = sum(ratings)
+        self._rating_histogram = [ratings.count(stars) for stars in range(1, 6)]
+    
+    def review_terms(self) -> Dict[str, int]:
+        """Count the search terms in all review comments."""
+        if self._review_terms is not None:
+            return self._review_terms
+        terms: Dict[str, int] = {}
+        # Loaded reviews are read directly; the review cache calls this under its lock
+        reviews = self._reviews if self._reviews is not None else self.reviews
+        for review in reviews:
+            for term in tokenize(review.get("comment", "")):
+                terms[term] = terms.get(term, 0) + 1
+        return terms
+    
+    def _drop_reviews(self) -> bool:
+        """Free the loaded reviews if the store holds all of them; return whether it did."""
+        reviews = self._reviews
+        if reviews is not None:
+            if len(reviews) != self._stored_reviews:
+                return False
+            # The search terms are needed again for the next snapshot
+            self._review_terms = self.review_terms()
+            self._reviews = None
+        return True
     
     def get_average_rating(self) -> float:
         """Calculate average rating from all reviews."""
-        if not self.reviews:
+        if not self._rating_count:
             return 0.0
-        return sum(r["rating"] for r in self.reviews) / len(self.reviews)
+        return self._rating_sum / self._rating_count
     
     def get_review_count(self) -> int:
         """Get total number of reviews."""
-        return len(self.reviews)
+        return self._rating_count
     
-    def to_dict(self) -> Dict:
-        """Convert business to dictionary for JSON storage."""
-        return {
+    def get_rating_histogram(self) -> Dict[int, int]:
+        """Get the number of reviews for each star rating, from 5 stars down to 1."""
+        return {stars: self._rating_histogram[stars - 1] for stars in range(5, 0, -1)}
+    
+    def to_dict(self, lazy: bool = False) -> Dict:
+        """Convert business to dictionary for JSON storage.
+        
+        With lazy=True the dictionary carries the rating aggregates and review
+        search terms instead, plus the reviews only if the store does not
+        already hold all of them.
+        """
+        data = {
             "id": self.id,
             "name": self.name,
             "category": self.category,
             "address": self.address,
             "phone": self.phone,
             "description": self.description,
-            "deals": self.deals,
-            "reviews": self.reviews,
-            "created_at": self.created_at
+            "deals": self.deals
+        }
+        if self.latitude is not None:
+            data["latitude"] = self.latitude
+            data["longitude"] = self.longitude
+        if not lazy:
+            data["reviews"] = self.reviews.to_dicts()
+        elif self._reviews is not None and len(self._reviews) != self._stored_reviews:
+            data["reviews"] = self._reviews.to_dicts()
+        data["created_at"] = self.created_at
+        data["version"] = self.version
+        if not lazy:
+            return data
+        
+        data["review_stats"] = {
+            "count": self._rating_count,
+            "sum": self._rating_sum,
+            "histogram": list(self._rating_histogram)
         }
+        data["review_terms"] = dict(self.review_terms())
+        return data
     
     @classmethod
     def from_dict(cls, data: Dict) -> 'Business':
@@ -76,47 +273,450 @@ class Business:
             address=data["address"],
             phone=data.get("phone", ""),
             description=data.get("description", ""),
-            deals=data.get("deals", [])
+            deals=data.get("deals", []),
+            business_id=data["id"],
+            latitude=data.get("latitude"),
+            longitude=data.get("longitude")
         )
-        business.id = data["id"]
-        business.reviews = data.get("reviews", [])
+        stats = data.get("review_stats")
+        if stats is not None and "reviews" not in data:
+            # Header of a lazy snapshot: the reviews stay in the store until needed
+            business._reviews = None
+            business._stored_reviews = stats["count"]
+            business._rating_count = stats["count"]
+            business._rating_sum = stats["sum"]
+            business._rating_histogram = list(stats["histogram"])
+            business._review_terms = dict(data.get("review_terms", {}))
+        else:
+            business.reviews = data.get("reviews", [])
+            business._rebuild_rating_stats()
         business.created_at = data.get("created_at", datetime.now().isoformat())
+        business.version = data.get("version", 0)
         return business
 
 
 class BusinessBoost:
-    """Main application class for Byte-Sized Business Boost."""
+    """Main application class for Byte-Sized Business Boost.
+    
+    One instance can be shared by many threads. Public methods that only read
+    take ``lock`` for reading, so they run concurrently; mutations, loading and
+    saving take it for writing, so they run one at a time and never overlap a
+    read. Code that iterates over businesses returned by several calls, or
+    renders them, should hold ``lock.read()`` for the whole pass to see one
+    consistent state.
+    
+    With shared=True several processes (e.g. web server workers) can use the
+    same data file. Mutations lock the store across processes and first apply
+    what other processes wrote; refresh() does the same for readers.
+    
+    Passing flush_interval turns on group commit: mutations only queue their
+    records and return, and a background thread writes everything queued at
+    most once per flush_interval seconds (sooner once flush_every records are
+    waiting). flush() writes immediately, and close() (also run at exit)
+    writes whatever is left. Group commit needs a single-process store.
+    
+    Passing lazy_reviews=True (JSON stores only) keeps reviews out of the
+    snapshot in a separate review file. Startup then only reads business
+    headers with their rating aggregates, and a business's reviews are read
+    when first used and kept in ``review_cache`` (at most review_cache_size
+    reviews, not counting ones no snapshot holds yet).
     
-    def __init__(self, data_file: str = "business_data.json"):
+    A store that does not exist yet starts out with a few sample businesses,
+    unless sample_data=False.
+    """
+    
+    # Work the background thread does per read-lock hold: businesses
+    # tokenized, then postings put in impact order
+    TEXT_INDEX_CHUNK = 500
+    TEXT_ORDER_CHUNK = 50_000
+    
+    def __init__(self, data_file: str = "business_data.json", journal: bool = False,
+                 compact_threshold: int = 1000, storage=None, shared: bool = False,
+                 flush_interval: Optional[float] = None, flush_every: int = 100,
+                 lazy_reviews: bool = False, review_cache_size: int = 100_000,
+                 load_progress: Optional[Callable[[int, int], None]] = None,
+                 sample_data: bool = True):
         self.data_file = data_file
+        self.lock = ReadWriteLock()
+        # Storage backend; chosen from the file extension unless one is passed in
+        self.storage = storage or open_storage(data_file, journal=journal,
+                                               compact_threshold=compact_threshold,
+                                               shared=shared, lazy_reviews=lazy_reviews)
+        self.review_cache: Optional[ReviewCache] = None
+        if lazy_reviews:
+            self.review_cache = ReviewCache(self.storage.load_reviews, review_cache_size)
         self.businesses: List[Business] = []
         self.user_favorites: Dict[str, List[str]] = {}  # username -> [business_ids]
+        self._by_id: Dict[str, Business] = {}  # primary-key index
+        self._duplicate_ids: Set[str] = set()  # IDs shared by more than one business
+        self._by_category: Dict[str, List[Business]] = {}  # category -> businesses in insertion order
+        self._categories: Optional[List[str]] = None  # sorted category names, rebuilt lazily
+        self.search_index = TrigramIndex()
+        self.text_index = FullTextIndex()
+        self._text_index_thread: Optional[threading.Thread] = None  # finishes text_index after a load
+        self.geo_index = GeoIndex()
+        self.sorted_views: Dict[str, SortedIndex] = self._new_sorted_views()
+        # (category, sort) -> sorted view of that category, created the first time it is paged
+        self._category_views: Dict[Tuple[str, str], SortedIndex] = {}
+        self._category_views_lock = threading.Lock()
+        # Sequence number of the last mutation, counting ones still queued for the
+        # flusher; it comes from the store, so every process sharing it agrees.
+        # Together with last_modified it backs HTTP validators
+        self.data_version = 0
+        self.last_modified = datetime.now(timezone.utc)
+        # Called as listener(op, business, categories_changed) after every mutation
+        self._listeners: List[Callable[[str, Optional[Business], bool], None]] = []
+        self._category_set_changed = False
+        # Group commit: records waiting for the background flusher
+        self._pending: List[Tuple[str, Dict]] = []
+        self._flush_lock = threading.Lock()
+        self.flusher: Optional[BackgroundFlusher] = None
+        # Called as load_progress(bytes_read, total_bytes) while the data file is read
+        self.load_progress = load_progress
+        self.sample_data = sample_data
         self.load_data()
+        if flush_interval is not None:
+            if shared:
+                raise ValueError("group commit cannot be used with a shared store")
+            self.flusher = BackgroundFlusher(self.flush, flush_interval, flush_every)
+            atexit.register(self.close)
     
+    @write_locked
     def load_data(self):
-        """Load businesses and user data from JSON file."""
-        if os.path.exists(self.data_file):
-            try:
-                with open(self.data_file, 'r') as f:
-                    data = json.load(f)
-                    self.businesses = [Business.from_dict(b) for b in data.get("businesses", [])]
-                    self.user_favorites = data.get("user_favorites", {})
-            except Exception as e:
-                print(f"Error loading data: {e}")
+        """Load businesses and user data from the storage backend.
+        
+        Businesses are built and indexed one at a time as the backend reads
+        them, so a large JSON file is never held in memory as a whole. If
+        loading fails part way, whatever was read before the failure is kept.
+        The full-text index is built afterwards in a background thread.
+        """
+        # Hold the store's lock so two processes never both create the sample data
+        with self.storage.locked():
+            if self.storage.exists():
                 self.businesses = []
                 self.user_favorites = {}
+                self._reset_indexes()
+                try:
+                    data, records = self.storage.load(on_business=self._load_business,
+                                                      progress=self.load_progress)
+                    self.user_favorites = data.get("user_favorites", {})
+                    for record in records:
+                        self._apply_record(record)
+                except Exception as e:
+                    print(f"Error loading data: {e}")
+                self._category_set_changed = False
+            elif self.sample_data:
+                # Initialize with sample data
+                self._initialize_sample_data()
+                self._rebuild_indexes()
+            self.data_version = self.storage.seq
+        self._build_text_index()
+    
+    def _build_text_index(self):
+        """Finish building the full-text index in a background thread.
+        
+        The thread tokenizes the queued businesses and then prepares the impact
+        orders of common terms. Each chunk runs under the read lock, so searches
+        keep running and mutations wait for at most one chunk. A search that
+        comes before the thread is done does the rest of what it needs itself.
+        """
+        index = self.text_index
+        
+        def build():
+            while True:
+                with self.lock.read():
+                    # A reload replaces the index; the new one gets its own thread
+                    if self.text_index is not index:
+                        return
+                    if not (index.index_queued(self.TEXT_INDEX_CHUNK)
+                            or index.build_orders(self.TEXT_ORDER_CHUNK)):
+                        return
+        
+        self._text_index_thread = threading.Thread(target=build, name="text-index", daemon=True)
+        self._text_index_thread.start()
+    
+    def wait_for_text_index(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the background build of the full-text index; return whether it is done."""
+        thread = self._text_index_thread
+        if thread is not None:
+            thread.join(timeout)
+            return not thread.is_alive()
+        return True
+    
+    def _load_business(self, entry: Dict):
+        """Build and index one business read from the store, skipping unusable entries."""
+        try:
+            business = Business.from_dict(entry)
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            business_id = entry.get("id") if isinstance(entry, dict) else None
+            print(f"Error loading business {business_id}: {e}")
+            return
+        self.businesses.append(business)
+        self._index_business(business)
+    
+    def refresh(self) -> bool:
+        """Apply changes other processes made to a shared store.
+        
+        The check is a cheap, lock-free look at the store; the write lock is
+        only taken when there is something to apply. Returns True if anything
+        changed.
+        """
+        if not self.storage.changed():
+            return False
+        with self.lock.write():
+            self._sync()
+        return True
+    
+    def _sync(self):
+        """Apply pending records from other processes, reloading if too far behind."""
+        records = self.storage.poll()
+        if records is None:
+            self.load_data()
+            self._touch("reload", seq=self.storage.seq)
+            return
+        for record in records:
+            self._apply_record(record)
+    
+    def _rebuild_indexes(self):
+        """Build the in-memory indexes from scratch after a load."""
+        self._reset_indexes()
+        for business in self.businesses:
+            self._index_business(business)
+        self._category_set_changed = False
+    
+    def _reset_indexes(self):
+        """Start every in-memory index out empty."""
+        self._by_id = {}
+        self._duplicate_ids = set()
+        self._by_category = {}
+        self._categories = None
+        self.search_index = TrigramIndex()
+        self.text_index = FullTextIndex()
+        self.geo_index = GeoIndex()
+        self.sorted_views = self._new_sorted_views()
+        self._category_views = {}
+        if self.review_cache is not None:
+            self.review_cache.clear()
+    
+    @staticmethod
+    def _new_sorted_views() -> Dict[str, SortedIndex]:
+        """Create the order-maintaining views used for sorted listings."""
+        return {sort_by: SortedIndex(key, _business_id) for sort_by, key in SORT_KEYS.items()}
+    
+    def _index_business(self, business: Business, ordered: bool = True):
+        """Add one business to every in-memory index (but the sorted views unless ``ordered``)."""
+        if self.review_cache is not None:
+            business._review_loader = self.review_cache.load
+        # The first business loaded with a given ID wins, as with the old linear
+        # scan: lookups and both search indexes only ever see that one
+        first = self._by_id.setdefault(business.id, business)
+        if first is business:
+            self.search_index.add(business)
+            self.text_index.add(business)
         else:
-            # Initialize with sample data
-            self._initialize_sample_data()
+            self._duplicate_ids.add(business.id)
+        if business.category not in self._by_category:
+            self._by_category[business.category] = []
+            self._categories = None
+            self._category_set_changed = True
+        self._by_category[business.category].append(business)
+        self.geo_index.add(business)
+        if ordered:
+            for view in self.sorted_views.values():
+                view.add(business)
+            for view in self._views_of_category(business.category):
+                view.add(business)
+    
+    def _unindex_business(self, business: Business):
+        """Remove one business from every in-memory index."""
+        if self._by_id.get(business.id) is business:
+            del self._by_id[business.id]
+            self.search_index.remove(business)
+            self.text_index.remove(business)
+            if business.id in self._duplicate_ids:
+                self._promote_duplicate(business.id)
+        in_category = self._by_category.get(business.category)
+        if in_category and business in in_category:
+            in_category.remove(business)
+            if not in_category:
+                del self._by_category[business.category]
+                self._categories = None
+                self._category_set_changed = True
+        self.geo_index.remove(business)
+        for view in self.sorted_views.values():
+            view.remove(business)
+        for view in self._views_of_category(business.category):
+            view.remove(business)
+        if business.category not in self._by_category:
+            for sort_by in self.sorted_views:
+                self._category_views.pop((business.category, sort_by), None)
+        if self.review_cache is not None:
+            self.review_cache.discard(business)
+    
+    def _promote_duplicate(self, business_id: str):
+        """Let the next business sharing a removed business's ID take its place."""
+        remaining = [b for b in self.businesses if b.id == business_id]
+        if len(remaining) < 2:
+            self._duplicate_ids.discard(business_id)
+        if remaining:
+            self._by_id[business_id] = remaining[0]
+            self.search_index.add(remaining[0])
+            self.text_index.add(remaining[0])
+    
+    def _reindex_reviews(self, business: Business, review: Dict):
+        """Update the indexes that depend on a business's reviews."""
+        if self._by_id.get(business.id) is business:
+            self.text_index.add_review(business, review)
+        self.sorted_views["rating"].update(business)
+        self.sorted_views["reviews"].update(business)
+        for sort_by in ("rating", "reviews"):
+            view = self._category_views.get((business.category, sort_by))
+            if view is not None:
+                view.update(business)
+    
+    def _views_of_category(self, category: str) -> List[SortedIndex]:
+        """Get the per-category sorted views created so far for one category."""
+        return [view for (name, _), view in self._category_views.items() if name == category]
     
     def save_data(self):
-        """Save businesses and user data to JSON file."""
-        data = {
-            "businesses": [b.to_dict() for b in self.businesses],
-            "user_favorites": self.user_favorites
+        """Save businesses and user data as a full snapshot."""
+        if self.flusher is not None:
+            # Queued records are folded into the snapshot
+            self.flush(snapshot=True)
+        else:
+            self._save_snapshot()
+    
+    @mutation
+    def _save_snapshot(self):
+        data = self._snapshot_data()
+        self.storage.save(data)
+        self._mark_stored(data)
+    
+    def _snapshot_data(self) -> Dict:
+        """Copy the persistent state, so it can be written while mutations continue."""
+        lazy = self.review_cache is not None
+        return {
+            "businesses": [b.to_dict(lazy) for b in self.businesses],
+            "user_favorites": {username: list(ids) for username, ids in self.user_favorites.items()}
         }
-        with open(self.data_file, 'w') as f:
-            json.dump(data, f, indent=2)
+    
+    def _mark_stored(self, data: Dict):
+        """Note which reviews a lazy snapshot just wrote, so the review cache may drop them."""
+        if self.review_cache is None:
+            return
+        seen = set()
+        for entry in data["businesses"]:
+            # The store keys review lists by ID; later duplicates stay in memory
+            business = self._by_id.get(entry["id"])
+            if business is None or entry["id"] in seen:
+                continue
+            seen.add(entry["id"])
+            if "reviews" in entry:
+                business._stored_reviews = len(entry["reviews"])
+                self.review_cache.track(business)
+    
+    def compact(self):
+        """Fold any journaled mutations into a fresh snapshot."""
+        self.save_data()
+    
+    def _commit(self, op: str, **payload):
+        """Persist a single mutation, writing a full snapshot only when the backend asks for one."""
+        if self.flusher is not None:
+            self._pending.append((op, payload))
+            self.flusher.notify()
+            return
+        if self.storage.record(op, payload):
+            self.save_data()
+    
+    def flush(self, snapshot: bool = False):
+        """Write every queued mutation now (group commit mode).
+        
+        The queue is taken and, if needed, the snapshot copied under the read
+        lock, so mutations only wait for that copy, never for the disk.
+        """
+        with self._flush_lock:
+            with self.lock.read():
+                # Only flush() touches the queue while mutations are locked out
+                pending, self._pending = self._pending, []
+                if not pending and not snapshot:
+                    return
+                data = None
+                if snapshot or self.storage.wants_snapshot(len(pending)):
+                    data = self._snapshot_data()
+            try:
+                if data is None:
+                    self.storage.record_many(pending)
+                else:
+                    self.storage.save(data, pending=len(pending))
+            except Exception:
+                with self.lock.write():
+                    self._pending[:0] = pending
+                raise
+            if data is not None:
+                # Keeps writers from appending to a list the cache might drop
+                with self.lock.read():
+                    self._mark_stored(data)
+    
+    def close(self):
+        """Stop the background flusher and write anything still queued."""
+        if self.flusher is not None:
+            self.flusher.stop()
+            self.flusher = None
+            # Otherwise atexit keeps this instance, and all of its data, alive
+            atexit.unregister(self.close)
+            self.flush()
+    
+    def add_listener(self, listener: Callable[[str, Optional[Business], bool], None]):
+        """Register a callback to run after every mutation.
+        
+        The listener gets the operation name, the business it touched (None for
+        favorites changes and for a full "reload") and whether the set of
+        categories changed, so caches can drop only what the mutation affected.
+        """
+        self._listeners.append(listener)
+    
+    def _touch(self, op: str, business: Optional[Business] = None, seq: Optional[int] = None):
+        """Record that the data (and optionally one business) changed and notify listeners.
+        
+        ``seq`` is the sequence number the change has in the store; by default
+        the next one, which the store gives the mutation about to be committed.
+        """
+        self.data_version = self.data_version + 1 if seq is None else seq
+        self.last_modified = datetime.now(timezone.utc)
+        if business is not None:
+            business.version = self.data_version
+            business.updated_at = self.last_modified
+        categories_changed = self._category_set_changed
+        self._category_set_changed = False
+        for listener in self._listeners:
+            listener(op, business, categories_changed)
+    
+    def _apply_record(self, record: Dict):
+        """Re-apply one recorded mutation to the in-memory state."""
+        op = record["op"]
+        business = None
+        if op == "add_business":
+            business = Business.from_dict(record["business"])
+            self.businesses.append(business)
+            self._index_business(business)
+        elif op == "remove_business":
+            business = self.find_business_by_id(record["business_id"])
+            if business:
+                self._drop_business(business)
+        elif op == "add_review":
+            business = self.find_business_by_id(record["business_id"])
+            if business:
+                business._append_review(record["review"])
+                self._reindex_reviews(business, record["review"])
+        elif op == "add_favorite":
+            favorites = self.user_favorites.setdefault(record["username"], [])
+            if record["business_id"] not in favorites:
+                favorites.append(record["business_id"])
+        elif op == "remove_favorite":
+            favorites = self.user_favorites.get(record["username"], [])
+            if record["business_id"] in favorites:
+                favorites.remove(record["business_id"])
+        self._touch(op, business, seq=record["seq"])
     
     def _initialize_sample_data(self):
         """Initialize with sample businesses for demonstration."""
@@ -165,31 +765,251 @@ class BusinessBoost:
         self.businesses = sample_businesses
         self.save_data()
     
+    @mutation
     def add_business(self, name: str, category: str, address: str, phone: str = "", 
-                     description: str = "", deals: List[Dict] = None):
-        """Add a new business to the directory."""
-        business = Business(name, category, address, phone, description, deals)
+                     description: str = "", deals: List[Dict] = None,
+                     latitude: Optional[float] = None, longitude: Optional[float] = None):
+        """Add a new business to the directory and return it."""
+        business = Business(name, category, address, phone, description, deals,
+                            latitude=latitude, longitude=longitude)
+        # IDs from the generator are unique per process; this also guards against imported data
+        while business.id in self._by_id:
+            business.id = Business._generate_id()
         self.businesses.append(business)
-        self.save_data()
+        self._index_business(business)
+        self._touch("add_business", business)
+        self._commit("add_business", business=business.to_dict())
+        return business
+    
+    def bulk_import(self, records: Iterable[Dict]) -> Tuple[int, int]:
+        """Add many businesses at once and write them with a single snapshot.
+        
+        Each record holds the add_business arguments (already checked, see
+        bulk_import.py) and may bring its own "id"; the others get new IDs.
+        A record whose ID, or whose name and address, matches a business in
+        the directory or earlier in the batch is skipped as a duplicate. The
+        sorted views are built once for the whole batch rather than per
+        business. Returns (added, skipped).
+        
+        The imported businesses are not journaled, but they use up sequence
+        numbers, so other processes sharing the store see they missed records
+        and reload the new snapshot instead of overwriting it.
+        """
+        added = []
+        skipped = 0
+        # The flush lock keeps a background flush from writing while the snapshot is
+        with self._flush_lock, self.lock.write(), self.storage.locked():
+            self._sync()
+            keys = {self._duplicate_key(b.name, b.address) for b in self.businesses}
+            for record in records:
+                key = self._duplicate_key(record["name"], record["address"])
+                business_id = record.get("id")
+                if key in keys or business_id in self._by_id:
+                    skipped += 1
+                    continue
+                keys.add(key)
+                business = Business(record["name"], record["category"], record["address"],
+                                    record.get("phone", ""), record.get("description", ""),
+                                    record.get("deals"), business_id=business_id,
+                                    latitude=record.get("latitude"), longitude=record.get("longitude"))
+                while business_id is None and business.id in self._by_id:
+                    business.id = Business._generate_id()
+                self.businesses.append(business)
+                self._index_business(business, ordered=False)
+                added.append(business)
+            for view in self.sorted_views.values():
+                view.add_many(added)
+            for (category, _), view in self._category_views.items():
+                view.add_many([b for b in added if b.category == category])
+            if added:
+                # The snapshot uses up one sequence number per imported business
+                self._touch("reload", seq=self.data_version + len(added))
+                # Queued group-commit records are folded into the same snapshot
+                pending, self._pending = self._pending, []
+                data = self._snapshot_data()
+                try:
+                    self.storage.save(data, pending=len(pending) + len(added))
+                except Exception:
+                    self._pending[:0] = pending
+                    raise
+                self._mark_stored(data)
+        if added:
+            self._build_text_index()
+        return len(added), skipped
+    
+    @staticmethod
+    def _duplicate_key(name: str, address: str) -> Tuple[str, str]:
+        """What makes two businesses the same place for bulk imports."""
+        return " ".join(name.casefold().split()), " ".join(address.casefold().split())
+    
+    @mutation
+    def remove_business(self, business_id: str) -> bool:
+        """Remove a business from the directory."""
+        business = self.find_business_by_id(business_id)
+        if not business:
+            return False
+        
+        self._drop_business(business)
+        self._touch("remove_business", business)
+        self._commit("remove_business", business_id=business_id)
         return True
     
+    def _drop_business(self, business: Business):
+        """Remove a business from the list, the indexes and every favorites list."""
+        self.businesses.remove(business)
+        self._unindex_business(business)
+        for favorite_ids in self.user_favorites.values():
+            if business.id in favorite_ids:
+                favorite_ids.remove(business.id)
+    
+    @read_locked
     def get_businesses_by_category(self, category: str) -> List[Business]:
         """Get all businesses in a specific category."""
-        return [b for b in self.businesses if b.category.lower() == category.lower()]
+        return list(self._by_category.get(category.lower(), []))
     
+    @read_locked
     def get_all_categories(self) -> List[str]:
         """Get list of all available categories."""
-        categories = set(b.category for b in self.businesses)
-        return sorted(categories)
+        if self._categories is None:
+            self._categories = sorted(self._by_category)
+        return list(self._categories)
+    
+    @read_locked
+    def get_category_counts(self) -> Dict[str, int]:
+        """Get the number of businesses in each category, in category order."""
+        return {category: len(self._by_category[category]) for category in self.get_all_categories()}
+    
+    @read_locked
+    def search_businesses(self, query: str) -> List[Business]:
+        """Find businesses whose name, category or address contains the query."""
+        return self.search_index.search(query)
+    
+    @read_locked
+    def search_ranked(self, query: str, limit: Optional[int] = None, category: str = "",
+                      near: Optional[Tuple[float, float, float]] = None) -> List[Business]:
+        """Find businesses by full-text relevance over their details and review comments.
+        
+        With a limit only that many of the best matches are ranked, which is much
+        cheaper than ranking them all. category and near=(latitude, longitude,
+        radius_km) filter the matches as in filter_businesses.
+        """
+        where = self._ranked_filter(category, near)
+        return [business for business, _ in self.text_index.search(query, limit, where)]
+    
+    @read_locked
+    def count_ranked(self, query: str, category: str = "",
+                     near: Optional[Tuple[float, float, float]] = None) -> int:
+        """Count the businesses search_ranked finds with the same filters, without ranking them."""
+        return self.text_index.count(query, self._ranked_filter(category, near))
+    
+    def _ranked_filter(self, category: str,
+                       near: Optional[Tuple[float, float, float]]) -> Optional[Callable[[Business], bool]]:
+        """Turn the category and location filters into a test for the full-text index."""
+        category = category.lower()
+        inside = {id(business) for business, _ in self.find_nearby(*near)} if near is not None else None
+        if not category and inside is None:
+            return None
+        return lambda b: (not category or b.category == category) and (inside is None or id(b) in inside)
+    
+    @read_locked
+    def filter_businesses(self, search: str = "", category: str = "", ranked: bool = False,
+                          near: Optional[Tuple[float, float, float]] = None) -> Optional[List[Business]]:
+        """Apply the search, category and location filters used by the listings.
+        
+        Returns None when there is nothing to filter, meaning every business.
+        With ranked=True the search is a relevance-ordered full-text search over
+        descriptions and review comments too; otherwise it is a substring match
+        served from the trigram index. near=(latitude, longitude, radius_km)
+        keeps only businesses within the radius; without a ranked search they
+        come back nearest first.
+        """
+        if ranked and search:
+            return self.search_ranked(search, category=category, near=near)
+        if near is not None:
+            nearby = [business for business, _ in self.find_nearby(*near)]
+            matches = self.filter_businesses(search, category)
+            if matches is None:
+                return nearby
+            matching = set(map(id, matches))
+            return [b for b in nearby if id(b) in matching]
+        if search:
+            businesses = self.search_businesses(search)
+            if category:
+                businesses = [b for b in businesses if b.category == category.lower()]
+            return businesses
+        if category:
+            return self.get_businesses_by_category(category)
+        return None
     
+    @read_locked
     def sort_businesses_by_rating(self, reverse: bool = True) -> List[Business]:
         """Sort businesses by average rating."""
-        return sorted(self.businesses, key=lambda b: b.get_average_rating(), reverse=reverse)
+        if reverse:
+            return list(self.sorted_views["rating"])
+        return sorted(self.businesses, key=lambda b: b.get_average_rating())
     
+    @read_locked
     def sort_businesses_by_review_count(self, reverse: bool = True) -> List[Business]:
         """Sort businesses by number of reviews."""
-        return sorted(self.businesses, key=lambda b: b.get_review_count(), reverse=reverse)
+        if reverse:
+            return list(self.sorted_views["reviews"])
+        return sorted(self.businesses, key=lambda b: b.get_review_count())
+    
+    @read_locked
+    def sort_businesses(self, sort_by: str, businesses: Optional[List[Business]] = None) -> List[Business]:
+        """Order businesses by name, rating (highest first) or reviews (most first).
+        
+        With no list given, every business is returned straight from the sorted
+        view. A filtered list is ordered with the view's keys, so it comes out in
+        the same order the full listing would show.
+        """
+        view = self.get_sorted_view(sort_by)
+        if businesses is None:
+            return list(view)
+        return sorted(businesses, key=view.sort_key)
+    
+    @read_locked
+    def get_sorted_view(self, sort_by: str, category: str = "") -> SortedIndex:
+        """Get the sorted view for name, rating or reviews (name for anything else).
+        
+        With a category it is a view of just that category's businesses, built the
+        first time it is asked for and kept up to date from then on.
+        """
+        if sort_by not in self.sorted_views:
+            sort_by = "name"
+        if not category:
+            return self.sorted_views[sort_by]
+        category = category.lower()
+        members = self._by_category.get(category)
+        if not members:
+            return SortedIndex(SORT_KEYS[sort_by], _business_id)
+        with self._category_views_lock:
+            view = self._category_views.get((category, sort_by))
+            if view is None:
+                view = SortedIndex(SORT_KEYS[sort_by], _business_id)
+                view.add_many(members)
+                self._category_views[(category, sort_by)] = view
+            return view
+    
+    @read_locked
+    def get_reviewed_count(self) -> int:
+        """Get the number of businesses that have at least one review."""
+        # Reviewed businesses average at least 1, so they form a prefix of the rating view
+        return self.sorted_views["rating"].position((0,))
+    
+    @read_locked
+    def get_top_rated(self, limit: Optional[int] = None) -> List[Business]:
+        """Get the highest rated businesses, skipping ones without reviews."""
+        reviewed = self.get_reviewed_count()
+        return self.sorted_views["rating"].top(reviewed if limit is None else min(limit, reviewed))
     
+    @read_locked
+    def get_most_reviewed(self, limit: Optional[int] = None) -> List[Business]:
+        """Get the businesses with the most reviews."""
+        view = self.sorted_views["reviews"]
+        return view.top(len(view) if limit is None else limit)
+    
+    @mutation
     def add_review(self, business_id: str, user_name: str, rating: int, comment: str):
         """Add a review to a business."""
         business = self.find_business_by_id(business_id)
@@ -198,18 +1018,26 @@ class BusinessBoost:
         
         try:
             business.add_review(user_name, rating, comment, verified=True)
-            self.save_data()
+            review = dict(business.reviews[-1])
+            self._reindex_reviews(business, review)
+            self._touch("add_review", business)
+            self._commit("add_review", business_id=business_id, review=review)
             return True
         except ValueError:
             return False
     
+    @read_locked
+    def find_nearby(self, latitude: float, longitude: float, radius_km: float,
+                    limit: Optional[int] = None) -> List[Tuple[Business, float]]:
+        """Find businesses within radius_km of a point, nearest first, with their distances."""
+        return self.geo_index.near(latitude, longitude, radius_km, limit)
+    
+    @read_locked
     def find_business_by_id(self, business_id: str) -> Optional[Business]:
         """Find a business by its ID."""
-        for business in self.businesses:
-            if business.id == business_id:
-                return business
-        return None
+        return self._by_id.get(business_id)
     
+    @mutation
     def add_to_favorites(self, username: str, business_id: str):
         """Add a business to user's favorites."""
         if username not in self.user_favorites:
@@ -217,19 +1045,23 @@ class BusinessBoost:
         
         if business_id not in self.user_favorites[username]:
             self.user_favorites[username].append(business_id)
-            self.save_data()
+            self._touch("add_favorite")
+            self._commit("add_favorite", username=username, business_id=business_id)
     
+    @mutation
     def remove_from_favorites(self, username: str, business_id: str):
         """Remove a business from user's favorites."""
         if username in self.user_favorites and business_id in self.user_favorites[username]:
             self.user_favorites[username].remove(business_id)
-            self.save_data()
+            self._touch("remove_favorite")
+            self._commit("remove_favorite", username=username, business_id=business_id)
     
+    @read_locked
     def get_favorites(self, username: str) -> List[Business]:
         """Get user's favorite businesses."""
         if username not in self.user_favorites:
             return []
         
         favorite_ids = self.user_favorites[username]
-        return [b for b in self.businesses if b.id in favorite_ids]
+        return [self._by_id[i] for i in favorite_ids if i in self._by_id]
 
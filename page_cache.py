@@ -0,0 +1,100 @@
+"""
+Rendered-page cache for Byte-Sized Business Boost
+"""
+
+import sys
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+
+class PageCache:
+    """Byte-bounded LRU cache of rendered HTML, invalidated by tag.
+
+    Every entry is stored with a set of tags naming the data it was rendered
+    from (for example ``"category:food"``). Invalidating a tag drops exactly
+    the entries carrying it. When the total size of the cached strings goes
+    over ``max_bytes`` the least recently used entries are evicted first.
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Tuple[str, int, Tuple[str, ...]]]" = OrderedDict()
+        self._tagged: Dict[str, Set[Hashable]] = {}  # tag -> keys of the entries carrying it
+        self._generation = 0  # bumped by every invalidation
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable):
+        """Return the cached body for a key, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, body: str, tags: Iterable[str], generation: Optional[int] = None):
+        """Cache a body under a key.
+
+        If ``generation`` is given and an invalidation has happened since it
+        was read, the body may be stale and is not stored.
+        """
+        size = sys.getsizeof(body)
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            if size > self.max_bytes:
+                return
+            self._discard(key)
+            tags = tuple(tags)
+            self._entries[key] = (body, size, tags)
+            self.size += size
+            for tag in tags:
+                self._tagged.setdefault(tag, set()).add(key)
+            while self.size > self.max_bytes:
+                self._discard(next(iter(self._entries)))
+
+    def fetch(self, key: Hashable, tags: Iterable[str], render: Callable[[], str]) -> str:
+        """Return the cached body for a key, rendering and caching it on a miss."""
+        body = self.get(key)
+        if body is None:
+            generation = self._generation
+            body = render()
+            self.put(key, body, tags, generation)
+        return body
+
+    def invalidate(self, tag: str):
+        """Drop every entry carrying the given tag."""
+        with self._lock:
+            self._generation += 1
+            for key in list(self._tagged.get(tag, ())):
+                self._discard(key)
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._tagged.clear()
+            self.size = 0
+
+    def _discard(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        _, size, tags = entry
+        self.size -= size
+        for tag in tags:
+            keys = self._tagged.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tagged[tag]
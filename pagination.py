@@ -0,0 +1,163 @@
+"""
+Cursor-based pagination for Byte-Sized Business Boost listings
+
+A cursor names the sort key of the item at the edge of the current page, so
+the next page starts right after it even if businesses were added in the
+meantime. Cursors are opaque to clients: "n" cursors move forward and "p"
+cursors move backward.
+"""
+
+import base64
+import json
+import math
+from bisect import bisect_left, bisect_right
+from typing import List, Optional, Sequence, Tuple
+
+from sorted_index import SortedIndex
+
+
+DEFAULT_PER_PAGE = 24
+MAX_PER_PAGE = 100
+
+
+class Page:
+    """One page of a listing plus the cursors that lead to its neighbours."""
+
+    def __init__(self, items: List, total: int, start: int, per_page: int,
+                 next_cursor: Optional[str] = None, prev_cursor: Optional[str] = None):
+        self.items = items
+        self.total = total
+        self.start = start  # position of the first item within the whole listing
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def first_number(self) -> int:
+        """1-based position of the first item on the page."""
+        return self.start + 1 if self.items else 0
+
+    @property
+    def last_number(self) -> int:
+        """1-based position of the last item on the page."""
+        return self.start + len(self.items)
+
+
+def encode_cursor(direction: str, sort_key: Tuple) -> str:
+    """Turn a direction and sort key into a URL-safe cursor."""
+    raw = json.dumps([direction, list(sort_key)], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Optional[Tuple[str, Tuple]]:
+    """Read a cursor back; malformed cursors are treated as no cursor at all."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        direction, sort_key = json.loads(raw)
+    except ValueError:
+        return None
+    if direction not in ("n", "p") or not isinstance(sort_key, list):
+        return None
+    return direction, tuple(sort_key)
+
+
+def parse_per_page(value: Optional[str]) -> int:
+    """Clamp a requested page size to [1, MAX_PER_PAGE]."""
+    try:
+        return min(max(int(value), 1), MAX_PER_PAGE)
+    except (TypeError, ValueError):
+        return DEFAULT_PER_PAGE
+
+
+def _comparable(sort_key: Tuple, reference: Tuple) -> bool:
+    """Whether a cursor's key can be ordered against the keys of this listing."""
+    if len(sort_key) != len(reference):
+        return False
+    try:
+        for mine, theirs in zip(sort_key, reference):
+            mine < theirs
+    except TypeError:
+        return False
+    return True
+
+
+def _window(total: int, per_page: int, cursor: Optional[str], position,
+            reference: Optional[Tuple]) -> Tuple[int, int]:
+    """Work out [start, stop) for a cursor, given a key -> position function.
+
+    ``reference`` is the sort key of any item in the listing.
+    """
+    decoded = decode_cursor(cursor)
+    if decoded is None or not total:
+        return 0, min(per_page, total)
+
+    direction, sort_key = decoded
+    if not _comparable(sort_key, reference):
+        # A cursor from a different listing whose keys do not compare
+        return 0, min(per_page, total)
+    if direction == "n":
+        start = min(position(sort_key, after=True), total)
+        return start, min(start + per_page, total)
+    stop = min(position(sort_key, after=False), total)
+    return max(stop - per_page, 0), stop
+
+
+def _page(items: List, keys: Sequence[Tuple], total: int, start: int, stop: int, per_page: int) -> Page:
+    next_cursor = encode_cursor("n", keys[-1]) if items and stop < total else None
+    prev_cursor = encode_cursor("p", keys[0]) if items and start > 0 else None
+    return Page(items, total, start, per_page, next_cursor, prev_cursor)
+
+
+def paginate_view(view: SortedIndex, cursor: Optional[str], per_page: int,
+                  limit: Optional[int] = None) -> Page:
+    """Paginate a SortedIndex, optionally only its first ``limit`` entries."""
+    total = len(view) if limit is None else min(limit, len(view))
+    reference = view.sort_key(view.slice(0, 1)[0]) if total else None
+    start, stop = _window(total, per_page, cursor, view.position, reference)
+    items = view.slice(start, stop)
+    return _page(items, [view.sort_key(item) for item in items], total, start, stop, per_page)
+
+
+def paginate_list(items: Sequence, keys: Sequence[Tuple], cursor: Optional[str], per_page: int) -> Page:
+    """Paginate an already sorted list whose sort keys are given in ``keys``."""
+    def position(sort_key, after):
+        return (bisect_right if after else bisect_left)(keys, sort_key)
+
+    start, stop = _window(len(items), per_page, cursor, position, keys[0] if keys else None)
+    return _page(list(items[start:stop]), keys[start:stop], len(items), start, stop, per_page)
+
+
+def paginate_subset(view: SortedIndex, items: Sequence, cursor: Optional[str], per_page: int) -> Page:
+    """Paginate some of a view's items, ordered the way the view orders them."""
+    items = sorted(items, key=view.sort_key)
+    return paginate_list(items, [view.sort_key(item) for item in items], cursor, per_page)
+
+
+def paginate_ordered(items: Sequence, cursor: Optional[str], per_page: int,
+                     total: Optional[int] = None) -> Page:
+    """Paginate a list that is already in display order (e.g. search rank) by position.
+
+    ``items`` may be just the start of a listing of ``total`` items, as long
+    as it holds the first ``ordered_reach(cursor, per_page)`` of them.
+    """
+    total = len(items) if total is None else total
+    positions = range(total)
+
+    def position(sort_key, after):
+        return (bisect_right if after else bisect_left)(positions, sort_key[0])
+
+    start, stop = _window(total, per_page, cursor, position, (0,) if total else None)
+    return _page(list(items[start:stop]), [(i,) for i in range(start, stop)], total, start, stop, per_page)
+
+
+def ordered_reach(cursor: Optional[str], per_page: int) -> Optional[int]:
+    """How many leading items of an ordered listing the page at a cursor can show (None for all)."""
+    decoded = decode_cursor(cursor)
+    if decoded is None or not _comparable(decoded[1], (0,)):
+        return per_page
+    position = decoded[1][0]
+    if isinstance(position, float) and not math.isfinite(position):
+        return None
+    return max(math.floor(position) + 1, 0) + per_page
@@ -0,0 +1,236 @@
+"""
+Compact review storage for Byte-Sized Business Boost
+"""
+
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+# The layout every review written by the app has; anything else is kept as a dict
+REVIEW_KEYS = ("user_name", "rating", "comment", "verified", "date")
+_REVIEW_KEY_SET = frozenset(REVIEW_KEYS)
+
+
+def _timestamp(date: object) -> Optional[int]:
+    """Turn an ISO date string into microseconds since 1970, if it converts back unchanged."""
+    if type(date) is not str:
+        return None
+    try:
+        parsed = datetime.fromisoformat(date)
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None or parsed.isoformat() != date:
+        return None
+    return (parsed - _EPOCH) // _MICROSECOND
+
+
+class Review(Mapping):
+    """Read-only, dict-like view of one review in a ReviewList.
+
+    Templates can use ``review.user_name`` or ``review["rating"]``, and
+    ``dict(review)`` gives back the original review dict.
+    """
+
+    __slots__ = ("_reviews", "_index")
+
+    def __init__(self, reviews: "ReviewList", index: int):
+        self._reviews = reviews
+        self._index = index
+
+    def __getitem__(self, key: str):
+        return self._reviews._field(self._index, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._reviews._keys(self._index))
+
+    def __len__(self) -> int:
+        return len(self._reviews._keys(self._index))
+
+    def __repr__(self) -> str:
+        return f"Review({dict(self)!r})"
+
+
+class ReviewList(Sequence):
+    """Append-only list of reviews stored column by column.
+
+    Ratings live in a bytearray, dates as integer microseconds in an
+    ``array('q')``, verified flags as bits, and user names are interned so
+    repeat reviewers share one string. A review costs a few dozen bytes plus
+    its comment, instead of a dict with five keys and a date string. Reviews
+    that do not fit the columns (extra keys, unusual dates or types) are kept
+    as plain dicts on the side, so nothing is ever lost.
+    """
+
+    __slots__ = ("_ratings", "_dates", "_users", "_comments", "_verified", "_irregular")
+
+    def __init__(self, reviews: Iterable[Dict] = ()):
+        self._ratings = bytearray()
+        self._dates = array('q')
+        self._users: List[str] = []
+        self._comments: List[str] = []
+        self._verified = bytearray()  # bitset, one bit per review
+        self._irregular: Optional[Dict[int, Dict]] = None  # index -> review kept as a dict
+        for review in reviews:
+            self.append(review)
+
+    def __len__(self) -> int:
+        return len(self._ratings)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [Review(self, i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("review index out of range")
+        return Review(self, index)
+
+    def __iter__(self) -> Iterator[Review]:
+        for i in range(len(self)):
+            yield Review(self, i)
+
+    def __reversed__(self) -> Iterator[Review]:
+        for i in range(len(self) - 1, -1, -1):
+            yield Review(self, i)
+
+    def append(self, review: Mapping):
+        """Add a review given as a dict (or another Review)."""
+        index = len(self._ratings)
+        rating = review.get("rating")
+        timestamp = _timestamp(review.get("date"))
+        regular = (
+            timestamp is not None
+            and type(rating) is int and 1 <= rating <= 5
+            and type(review.get("user_name")) is str
+            and type(review.get("comment")) is str
+            and type(review.get("verified")) is bool
+            and len(review) == len(REVIEW_KEYS) and _REVIEW_KEY_SET.issuperset(review)
+        )
+        if regular:
+            self._ratings.append(rating)
+            self._dates.append(timestamp)
+            self._users.append(sys.intern(review["user_name"]))
+            self._comments.append(review["comment"])
+            verified = review["verified"]
+        else:
+            if self._irregular is None:
+                self._irregular = {}
+            self._irregular[index] = dict(review)
+            # Keep the rating column usable for aggregates
+            try:
+                self._ratings.append(min(max(int(rating), 0), 255))
+            except (TypeError, ValueError):
+                self._ratings.append(0)
+            self._dates.append(0)
+            self._users.append("")
+            self._comments.append("")
+            verified = False
+
+        if index % 8 == 0:
+            self._verified.append(0)
+        if verified:
+            self._verified[index // 8] |= 1 << (index % 8)
+
+    def _keys(self, index: int) -> Tuple[str, ...]:
+        if self._irregular is not None and index in self._irregular:
+            return tuple(self._irregular[index])
+        return REVIEW_KEYS
+
+    def _field(self, index: int, key: str):
+        if self._irregular is not None and index in self._irregular:
+            return self._irregular[index][key]
+        if key == "rating":
+            return self._ratings[index]
+        if key == "user_name":
+            return self._users[index]
+        if key == "comment":
+            return self._comments[index]
+        if key == "verified":
+            return bool(self._verified[index // 8] & (1 << (index % 8)))
+        if key == "date":
+            return (_EPOCH + timedelta(microseconds=self._dates[index])).isoformat()
+        raise KeyError(key)
+
+    def ratings(self) -> bytearray:
+        """The rating column (0 where an irregular review has no usable rating)."""
+        return self._ratings
+
+    def to_dicts(self) -> List[Dict]:
+        """Expand every review into a plain dict, e.g. for JSON storage."""
+        return [dict(Review(self, i)) for i in range(len(self))]
+
+
+class ReviewCache:
+    """Bounded LRU cache of review lists loaded on demand from the store.
+
+    Businesses loaded from a lazy snapshot start without their reviews; the
+    first access to ``business.reviews`` reads them through ``load`` and
+    keeps them here. Once more than ``max_reviews`` reviews are cached the
+    least recently used lists are dropped again, but only lists the store
+    holds in full: a business with reviews added since the last snapshot
+    keeps them in memory until a snapshot covers them.
+    """
+
+    def __init__(self, load: Callable[[str], List[Dict]], max_reviews: int = 100_000):
+        self.max_reviews = max_reviews
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._load = load
+        self._entries: "OrderedDict[object, int]" = OrderedDict()  # business -> reviews counted
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def load(self, business) -> ReviewList:
+        """Return a business's reviews, reading them from the store if needed."""
+        with self._lock:
+            reviews = business._reviews
+            if reviews is not None:
+                if business in self._entries:
+                    self._entries.move_to_end(business)
+                    self.hits += 1
+                return reviews
+            self.misses += 1
+            reviews = ReviewList(self._load(business.id))
+            business._reviews = reviews
+            self._add(business)
+            return reviews
+
+    def track(self, business):
+        """Start caching reviews that were already in memory (e.g. once a snapshot holds them)."""
+        with self._lock:
+            if business not in self._entries and business._reviews is not None:
+                self._add(business)
+
+    def discard(self, business):
+        """Stop caching a business, e.g. because it was removed."""
+        with self._lock:
+            self.size -= self._entries.pop(business, 0)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _add(self, business):
+        count = len(business._reviews)
+        self._entries[business] = count
+        self.size += count
+        if self.size <= self.max_reviews:
+            return
+        # The newest entry is never dropped: its caller is about to use it
+        for cached in list(self._entries)[:-1]:
+            if self.size <= self.max_reviews:
+                break
+            if cached._drop_reviews():
+                self.size -= self._entries.pop(cached)
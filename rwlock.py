@@ -0,0 +1,113 @@
+"""
+Reader/writer locking for Byte-Sized Business Boost
+"""
+
+import functools
+import threading
+from contextlib import contextmanager
+
+
+class ReadWriteLock:
+    """Lets any number of threads read at once, or one thread write.
+
+    Waiting writers are served before new readers, so a steady stream of
+    reads cannot starve a write. The lock is reentrant: a thread may take a
+    lock it already holds, and the writing thread may also take the read
+    lock. Taking the write lock while holding only the read lock would
+    deadlock against other readers, so it raises RuntimeError instead.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0  # threads holding the read lock
+        self._writers_waiting = 0
+        self._writer = None  # ident of the thread holding the write lock
+        self._write_depth = 0
+        self._local = threading.local()  # per-thread read depth
+
+    def acquire_read(self):
+        depth = getattr(self._local, "depth", 0)
+        if depth or self._writer == threading.get_ident():
+            self._local.depth = depth + 1
+            return
+        with self._cond:
+            while self._writer is not None or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        self._local.depth = 1
+
+    def release_read(self):
+        self._local.depth -= 1
+        if self._local.depth or self._writer == threading.get_ident():
+            return
+        with self._cond:
+            self._readers -= 1
+            if not self._readers:
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        me = threading.get_ident()
+        if self._writer == me:
+            self._write_depth += 1
+            return
+        if getattr(self._local, "depth", 0):
+            raise RuntimeError("cannot take the write lock while holding the read lock")
+        with self._cond:
+            self._writers_waiting += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer = me
+            self._write_depth = 1
+
+    def release_write(self):
+        self._write_depth -= 1
+        if self._write_depth:
+            return
+        with self._cond:
+            self._writer = None
+            self._cond.notify_all()
+
+    @contextmanager
+    def read(self):
+        """Hold the read lock for the duration of a ``with`` block."""
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self):
+        """Hold the write lock for the duration of a ``with`` block."""
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+def read_locked(method):
+    """Run a method while holding its instance's ``lock`` for reading."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self.lock.acquire_read()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self.lock.release_read()
+    return wrapper
+
+
+def write_locked(method):
+    """Run a method while holding its instance's ``lock`` for writing."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self.lock.acquire_write()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self.lock.release_write()
+    return wrapper
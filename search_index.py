@@ -0,0 +1,471 @@
+"""
+Search indexes for Byte-Sized Business Boost
+"""
+
+import functools
+import heapq
+import math
+import re
+import threading
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from itertools import islice
+from operator import itemgetter
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+
+class TrigramIndex:
+    """In-memory trigram inverted index for case-insensitive substring search.
+
+    Every indexed field is lowercased once when a business is added. A query
+    only looks at the businesses that contain all of its trigrams and then
+    confirms the match with a plain substring test, so results are exactly
+    those of scanning every business with ``query.lower() in field.lower()``.
+    Businesses are numbered in insertion order and postings are arrays of
+    those numbers, so they stay sorted and take four bytes per entry. Only
+    the fields searched by default are indexed; other fields, such as
+    description, can still be searched and are checked by a scan.
+    """
+
+    FIELDS = ("name", "category", "address")
+    DEFAULT_SEARCH_FIELDS = FIELDS
+
+    def __init__(self):
+        self._postings: Dict[str, array] = {}  # trigram -> sorted document numbers
+        self._docs: Dict[str, int] = {}  # business id -> document number
+        self._texts: Dict[int, Tuple[str, ...]] = {}  # document number -> lowered field values
+        self._businesses: Dict[int, object] = {}  # document number -> Business
+        self._next_doc = 0
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    @staticmethod
+    def _trigrams(text: str) -> Set[str]:
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    def _doc_trigrams(self, texts: Tuple[str, ...]) -> Set[str]:
+        return set().union(*(self._trigrams(text) for text in texts))
+
+    def add(self, business):
+        """Index a business, replacing any earlier entry with the same id."""
+        if business.id in self._docs:
+            self.remove(business)
+
+        doc = self._next_doc
+        self._next_doc += 1
+        texts = tuple((getattr(business, field) or "").lower() for field in self.FIELDS)
+        self._docs[business.id] = doc
+        self._texts[doc] = texts
+        self._businesses[doc] = business
+        postings = self._postings
+        for trigram in self._doc_trigrams(texts):
+            posting = postings.get(trigram)
+            if posting is None:
+                postings[trigram] = array("i", (doc,))
+            else:
+                # Numbers only grow, so appending keeps the posting sorted
+                posting.append(doc)
+
+    def remove(self, business):
+        """Drop a business from the index."""
+        doc = self._docs.pop(business.id, None)
+        if doc is None:
+            return
+        texts = self._texts.pop(doc)
+        del self._businesses[doc]
+        for trigram in self._doc_trigrams(texts):
+            posting = self._postings.get(trigram)
+            if posting is None:
+                continue
+            i = bisect_left(posting, doc)
+            if i < len(posting) and posting[i] == doc:
+                del posting[i]
+                if not posting:
+                    del self._postings[trigram]
+
+    def _candidates(self, query: str) -> Iterable[int]:
+        """Document numbers that contain every trigram of the query, in ascending order."""
+        trigrams = self._trigrams(query)
+        if not trigrams:
+            # Too short to have a trigram; fall back to the pre-lowered texts
+            return self._texts.keys()
+
+        postings = sorted((self._postings.get(t, ()) for t in trigrams), key=len)
+        candidates = postings[0]
+        for posting in postings[1:]:
+            if not candidates:
+                break
+            if len(candidates) * 16 < len(posting):
+                # Few candidates left: binary-search the long posting for each
+                candidates = [doc for doc in candidates if _contains(posting, doc)]
+            else:
+                candidates = sorted(set(candidates).intersection(posting))
+        return candidates
+
+    def search(self, query: str, fields: Tuple[str, ...] = DEFAULT_SEARCH_FIELDS) -> List:
+        """Return businesses whose given fields contain the query, in insertion order."""
+        query = query.lower()
+        positions = [self.FIELDS.index(field) for field in fields if field in self.FIELDS]
+        scanned = [field for field in fields if field not in self.FIELDS]
+        texts = self._texts
+        matches = [doc for doc in self._candidates(query)
+                   if any(query in texts[doc][i] for i in positions)] if positions else []
+        if scanned:
+            found = set(matches)
+            matches.extend(doc for doc, business in self._businesses.items() if doc not in found
+                           and any(query in (getattr(business, field) or "").lower() for field in scanned))
+            matches.sort()
+        return [self._businesses[doc] for doc in matches]
+
+
+def _contains(posting: array, doc: int) -> bool:
+    i = bisect_left(posting, doc)
+    return i < len(posting) and posting[i] == doc
+
+
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below
+between both but by can did do does doing down during each few for from further had has have having
+he her here hers herself him himself his how i if in into is it its itself just me more most my
+myself no nor not now of off on once only or other our ours ourselves out over own same she should
+so some such than that the their theirs them themselves then there these they this those through to
+too under until up very was we were what when where which while who whom why will with you your
+yours yourself yourselves
+""".split())
+
+# Suffix rules for a light stemmer, tried longest first. The same rules are
+# applied to documents and queries, so consistency matters more than grammar.
+_STEM_SUFFIXES = (
+    ("ational", "ate"), ("ization", "ize"), ("fulness", "ful"), ("ousness", "ous"),
+    ("iveness", "ive"), ("tional", "tion"), ("ingly", ""), ("edly", ""), ("ment", ""),
+    ("ness", ""), ("sses", "ss"), ("ies", "y"), ("ing", ""), ("ed", ""), ("ly", ""),
+    ("ss", "ss"), ("us", "us"), ("is", "is"), ("s", ""),
+)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+@functools.lru_cache(maxsize=100_000)
+def stem(word: str) -> str:
+    """Strip common English suffixes, keeping at least three characters."""
+    if len(word) <= 3:
+        return word
+    for suffix, replacement in _STEM_SUFFIXES:
+        if word.endswith(suffix):
+            if len(word) - len(suffix) + len(replacement) >= 3:
+                return word[:-len(suffix)] + replacement
+            return word
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase, stemmed terms with stopwords removed."""
+    return [stem(token) for token in _TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+class _ImpactOrder:
+    """One term's postings in an order that lets a top-k search stop early.
+
+    Postings are grouped by term frequency and each group is sorted by
+    document length, shortest first. Within a group a document's BM25 score
+    for the term falls as its length grows, whatever the average length is,
+    so the head of each group bounds the score of everything after it.
+    Documents only get longer, so the lengths recorded here stay lower
+    bounds; documents whose frequency went up since the order was built are
+    kept in ``changed`` and scored before the groups are read.
+    """
+
+    __slots__ = ("groups", "changed", "updates", "limit")
+
+    def __init__(self, postings: Dict[str, int], doc_lengths: Dict[str, int]):
+        by_tf: Dict[int, List[Tuple[int, str]]] = defaultdict(list)
+        for business_id, tf in postings.items():
+            by_tf[tf].append((doc_lengths[business_id], business_id))
+        self.groups: List[Tuple[int, List[int], List[str]]] = []  # (tf, lengths, business ids)
+        for tf, entries in by_tf.items():
+            entries.sort()
+            self.groups.append((tf, [length for length, _ in entries], [business_id for _, business_id in entries]))
+        self.changed: Set[str] = set()
+        self.updates = 0
+        # Rebuilt once this many postings changed, so scoring ``changed`` stays cheap
+        self.limit = max(64, len(postings) // 32)
+
+
+class FullTextIndex:
+    """BM25-ranked full-text index over business text and review comments.
+
+    Each business is one document. Name and category terms are weighted more
+    heavily than address, description and review text. Reviews can be added
+    to an indexed business without re-indexing the rest of its text.
+
+    Tokenizing every business is the slow part of a load, so added businesses
+    are only queued. ``index_queued`` works through the queue and
+    ``build_orders`` then prepares the impact orders of common terms
+    (BusinessBoost does both in a background thread after a load); a search
+    that finds anything still queued indexes the rest first.
+
+    A search with a limit does not score every matching business. It reads
+    each query term's postings in impact order (see ``_ImpactOrder``),
+    scores every business it meets in full, and stops once no business it
+    has not met can beat the limit-th best score. Results are ordered by
+    score and then business ID, so a search with a limit returns exactly the
+    first results of the same search without one.
+    """
+
+    K1 = 1.2
+    B = 0.75
+    FIELD_WEIGHTS = (("name", 3), ("category", 2), ("address", 1), ("description", 1))
+    BLOCK = 32  # postings read from one group before the stopping bound is checked again
+    ORDERED_POSTINGS = 1000  # terms with this many postings get an impact order ahead of time
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[str, int]] = defaultdict(dict)  # term -> {business id: weighted tf}
+        self._doc_terms: Dict[str, Dict[str, int]] = {}  # business id -> {term: weighted tf}
+        self._doc_lengths: Dict[str, int] = {}
+        self._businesses: Dict[str, object] = {}
+        self._total_length = 0
+        self._queued: Dict[str, object] = {}  # business id -> Business added but not yet tokenized
+        # Searches run concurrently under a read lock, so only one of them may index the queue
+        self._queue_lock = threading.Lock()
+        # term -> impact order, built by build_orders or else the first time a search needs it
+        self._orders: Dict[str, _ImpactOrder] = {}
+
+    def __len__(self) -> int:
+        return len(self._businesses)
+
+    def add(self, business):
+        """Queue a business to be indexed together with all of its review comments."""
+        if business.id in self._businesses:
+            self.remove(business)
+
+        self._businesses[business.id] = business
+        self._queued[business.id] = business
+
+    def index_queued(self, limit: Optional[int] = None) -> bool:
+        """Tokenize up to ``limit`` queued businesses (all by default); return whether any are left."""
+        with self._queue_lock:
+            batch = list(islice(self._queued.values(), limit))
+            for business in batch:
+                self._index(business)
+            # Dequeued only once indexed, so a search that finds the queue empty
+            # never sees a half-built index
+            for business in batch:
+                del self._queued[business.id]
+            return bool(self._queued)
+
+    def build_orders(self, budget: Optional[int] = None) -> bool:
+        """Build missing impact orders of common terms, up to about ``budget`` postings; return whether any are left."""
+        missing = [term for term, postings in self._postings.items()
+                   if len(postings) >= self.ORDERED_POSTINGS and term not in self._orders]
+        built = 0
+        for term in missing:
+            if budget is not None and built >= budget:
+                return True
+            postings = self._postings[term]
+            # Concurrent searches may build one too; either copy is correct
+            self._orders[term] = _ImpactOrder(postings, self._doc_lengths)
+            built += len(postings)
+        return False
+
+    def _index(self, business):
+        self._doc_terms[business.id] = {}
+        self._doc_lengths[business.id] = 0
+        for field, weight in self.FIELD_WEIGHTS:
+            self._add_terms(business.id, tokenize(getattr(business, field) or ""), weight)
+        # Counted by the business, so reviews that are not loaded need not be read
+        self._add_term_counts(business.id, business.review_terms())
+
+    def add_review(self, business, review: Dict):
+        """Fold a new review comment into an already indexed business."""
+        if business.id not in self._businesses:
+            self.add(business)
+            return
+        if business.id in self._queued:
+            return  # its reviews, this one included, are read when it is indexed
+        self._add_terms(business.id, tokenize(review.get("comment", "")), 1)
+
+    def remove(self, business):
+        """Drop a business from the index."""
+        if self._queued.pop(business.id, None) is not None:
+            del self._businesses[business.id]
+            return
+        terms = self._doc_terms.pop(business.id, None)
+        if terms is None:
+            return
+        del self._businesses[business.id]
+        self._total_length -= self._doc_lengths.pop(business.id)
+        for term in terms:
+            postings = self._postings[term]
+            del postings[business.id]
+            if not postings:
+                del self._postings[term]
+            # Its entries in an impact order are skipped from now on
+            self._order_changed(term)
+
+    def _add_terms(self, business_id: str, terms: List[str], weight: int):
+        doc_terms = self._doc_terms[business_id]
+        for term in terms:
+            tf = doc_terms.get(term, 0) + weight
+            doc_terms[term] = tf
+            self._postings[term][business_id] = tf
+            if self._orders:
+                self._order_changed(term, business_id)
+        self._doc_lengths[business_id] += len(terms) * weight
+        self._total_length += len(terms) * weight
+
+    def _add_term_counts(self, business_id: str, counts: Dict[str, int]):
+        doc_terms = self._doc_terms[business_id]
+        postings = self._postings
+        for term, count in counts.items():
+            tf = doc_terms.get(term, 0) + count
+            doc_terms[term] = tf
+            postings[term][business_id] = tf
+            if self._orders:
+                self._order_changed(term, business_id)
+        length = sum(counts.values())
+        self._doc_lengths[business_id] += length
+        self._total_length += length
+
+    def _order_changed(self, term: str, business_id: Optional[str] = None):
+        """Note that a term's postings changed (for ``business_id``, if it was added or went up)."""
+        order = self._orders.get(term)
+        if order is None:
+            return
+        order.updates += 1
+        if order.updates > order.limit:
+            del self._orders[term]
+        elif business_id is not None:
+            order.changed.add(business_id)
+
+    def _weights(self, query: str) -> List[Tuple[str, float]]:
+        """The query's indexed terms with their IDFs, in a fixed order."""
+        if self._queued:
+            self.index_queued()
+        doc_count = len(self._businesses)
+        weights = []
+        for term in sorted(set(tokenize(query))):
+            postings = self._postings.get(term)
+            if postings:
+                weights.append((term, math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))))
+        return weights
+
+    def count(self, query: str, where: Optional[Callable[[object], bool]] = None) -> int:
+        """Count the businesses matching any query term (and ``where``, if given)."""
+        weights = self._weights(query)
+        if len(weights) == 1 and where is None:
+            return len(self._postings[weights[0][0]])
+        matches = set().union(*(self._postings[term] for term, _ in weights))
+        if where is None:
+            return len(matches)
+        businesses = self._businesses
+        return sum(1 for business_id in matches if where(businesses[business_id]))
+
+    def search(self, query: str, limit: Optional[int] = None,
+               where: Optional[Callable[[object], bool]] = None) -> List[Tuple[object, float]]:
+        """Return (business, score) pairs matching any query term, best first.
+
+        With ``where``, only businesses it accepts are returned. Equal scores
+        are ordered by business ID.
+        """
+        weights = self._weights(query)
+        if not weights:
+            return []
+        avg_length = self._total_length / len(self._doc_terms) or 1.0
+        # With few postings per result wanted, reading them all is cheaper
+        candidates = sum(len(self._postings[term]) for term, _ in weights)
+        if limit is None or limit * 8 >= candidates:
+            ranked = self._score_all(weights, avg_length, where)
+        else:
+            ranked = self._score_top(weights, avg_length, limit, where)
+        businesses = self._businesses
+        return [(businesses[business_id], score) for business_id, score in ranked[:limit]]
+
+    def _score_all(self, weights: List[Tuple[str, float]], avg_length: float,
+                   where: Optional[Callable[[object], bool]]) -> List[Tuple[str, float]]:
+        """Score every matching business, term by term."""
+        k1, b = self.K1, self.B
+        doc_lengths = self._doc_lengths
+        scores: Dict[str, float] = defaultdict(float)
+        for term, idf in weights:
+            for business_id, tf in self._postings[term].items():
+                norm = k1 * (1 - b + b * doc_lengths[business_id] / avg_length)
+                scores[business_id] += idf * tf * (k1 + 1) / (tf + norm)
+        ranked = scores.items()
+        if where is not None:
+            businesses = self._businesses
+            ranked = [item for item in ranked if where(businesses[item[0]])]
+        # By ID, then stably by score: best first, equal scores in ID order
+        ranked = sorted(ranked, key=itemgetter(0))
+        ranked.sort(key=itemgetter(1), reverse=True)
+        return ranked
+
+    def _score_top(self, weights: List[Tuple[str, float]], avg_length: float, limit: int,
+                   where: Optional[Callable[[object], bool]]) -> List[Tuple[str, float]]:
+        """Find the ``limit`` best businesses with the threshold algorithm over impact orders."""
+        k1, b = self.K1, self.B
+        doc_terms, doc_lengths, businesses = self._doc_terms, self._doc_lengths, self._businesses
+        seen: Set[str] = set()
+        found: List[Tuple[str, float]] = []
+        best: List[float] = []  # min-heap of the ``limit`` best scores so far
+
+        def score(business_id: str):
+            seen.add(business_id)
+            terms = doc_terms.get(business_id)
+            if terms is None or (where is not None and not where(businesses[business_id])):
+                return  # removed since the order was built, or filtered out
+            # Summed in the same order as _score_all, so both give identical scores
+            norm = k1 * (1 - b + b * doc_lengths[business_id] / avg_length)
+            total = 0.0
+            for term, idf in weights:
+                tf = terms.get(term)
+                if tf:
+                    total += idf * tf * (k1 + 1) / (tf + norm)
+            found.append((business_id, total))
+            if len(best) < limit:
+                heapq.heappush(best, total)
+            elif total > best[0]:
+                heapq.heapreplace(best, total)
+
+        # Streams of [term number, idf, tf, lengths, business ids, position], one per term and tf group
+        streams = []
+        for number, (term, idf) in enumerate(weights):
+            order = self._orders.get(term)
+            if order is None:
+                # Concurrent searches may both build one; either copy is correct
+                order = self._orders[term] = _ImpactOrder(self._postings[term], doc_lengths)
+            for business_id in list(order.changed):
+                if business_id not in seen:
+                    score(business_id)
+            streams.extend([number, idf, tf, lengths, ids, 0] for tf, lengths, ids in order.groups)
+
+        def bound(stream) -> float:
+            """Upper bound of the term score of everything left in a stream."""
+            _, idf, tf, lengths, _, position = stream
+            if position >= len(lengths):
+                return 0.0
+            return idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * lengths[position] / avg_length))
+
+        bounds = [bound(stream) for stream in streams]
+        while True:
+            # A business not met yet scores at most the best bound of each of its terms
+            term_bounds = [0.0] * len(weights)
+            for stream, stream_bound in zip(streams, bounds):
+                if stream_bound > term_bounds[stream[0]]:
+                    term_bounds[stream[0]] = stream_bound
+            threshold = sum(term_bounds)
+            # Strictly better, with room for rounding, so ties are broken by ID as in _score_all
+            if not threshold or (len(best) == limit and best[0] > threshold * (1 + 1e-9)):
+                break
+            i = max(range(len(streams)), key=bounds.__getitem__)
+            stream = streams[i]
+            ids, position = stream[4], stream[5]
+            for business_id in ids[position:position + self.BLOCK]:
+                if business_id not in seen:
+                    score(business_id)
+            stream[5] = position + self.BLOCK
+            bounds[i] = bound(stream)
+        found.sort(key=itemgetter(0))
+        found.sort(key=itemgetter(1), reverse=True)
+        return found
@@ -0,0 +1,183 @@
+"""
+Order-maintaining indexes for Byte-Sized Business Boost
+"""
+
+import math
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class SortedIndex:
+    """Keeps items ordered by a key function as they are added, updated and removed.
+
+    Entries live in a list of sorted blocks (the layout used by the
+    ``sortedcontainers`` package), so an insert or removal costs a binary
+    search plus a memmove within one block instead of re-sorting everything.
+    Ties are broken by ``tiebreak`` (e.g. the business id), so an item's sort
+    key is the same in every process and cursors built from it stay valid
+    across workers and reloads. The running totals of block lengths are kept
+    between mutations, so positional lookups bisect instead of walking the
+    blocks.
+    """
+
+    BLOCK_SIZE = 512
+
+    def __init__(self, key: Callable[[Any], Any], tiebreak: Callable[[Any], Any]):
+        self._key = key
+        self._tiebreak = tiebreak
+        # Each block holds sorted (sort_key, seq, item) entries; seq only
+        # separates items whose sort keys are equal (duplicate ids)
+        self._blocks: List[List[Tuple]] = []
+        self._maxes: List[Tuple] = []  # last entry of every block
+        self._entries: Dict[int, Tuple] = {}  # id(item) -> (sort_key, seq)
+        self._offsets: Optional[List[int]] = None  # position of every block's first entry, rebuilt lazily
+        self._next_seq = 0
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator:
+        for block in self._blocks:
+            for _, _, item in block:
+                yield item
+
+    def __contains__(self, item) -> bool:
+        return id(item) in self._entries
+
+    def sort_key(self, item) -> Tuple:
+        """Return the key an indexed item is currently ordered by."""
+        return self._entries[id(item)][0]
+
+    def _sort_key(self, item) -> Tuple:
+        return (self._key(item), self._tiebreak(item))
+
+    def add(self, item):
+        """Insert an item at its sorted position."""
+        if id(item) in self._entries:
+            self.update(item)
+            return
+        sort_key = self._sort_key(item)
+        self._entries[id(item)] = (sort_key, self._next_seq)
+        self._insert((sort_key, self._next_seq, item))
+        self._next_seq += 1
+
+    def add_many(self, items: Iterable):
+        """Insert many new items with one sort instead of one insert each."""
+        entries = [entry for block in self._blocks for entry in block]
+        for item in items:
+            if id(item) in self._entries:
+                continue
+            sort_key = self._sort_key(item)
+            self._entries[id(item)] = (sort_key, self._next_seq)
+            entries.append((sort_key, self._next_seq, item))
+            self._next_seq += 1
+        entries.sort(key=_without_item)
+        self._blocks = [entries[i:i + self.BLOCK_SIZE] for i in range(0, len(entries), self.BLOCK_SIZE)]
+        self._maxes = [block[-1] for block in self._blocks]
+        self._offsets = None
+        self._len = len(entries)
+
+    def remove(self, item):
+        """Remove an item from the index."""
+        entry = self._entries.pop(id(item), None)
+        if entry is not None:
+            self._delete(entry)
+
+    def update(self, item):
+        """Move an item whose key may have changed to its new position."""
+        old = self._entries[id(item)]
+        new = (self._sort_key(item), old[1])
+        if new != old:
+            self._delete(old)
+            self._entries[id(item)] = new
+            self._insert((*new, item))
+
+    def _block_offsets(self) -> List[int]:
+        offsets = self._offsets
+        if offsets is None:
+            # Concurrent readers may both rebuild this; they get the same list
+            offsets = self._offsets = [0, *accumulate(len(block) for block in self._blocks)]
+        return offsets
+
+    def position(self, sort_key: Tuple, after: bool = False) -> int:
+        """Count the entries ordered before the given sort key.
+
+        With ``after=True`` entries whose key equals ``sort_key`` are counted
+        too, which gives the position just past them.
+        """
+        probe = (sort_key, math.inf) if after else (sort_key,)
+        i = bisect_left(self._maxes, probe)
+        if i == len(self._blocks):
+            return self._len
+        return self._block_offsets()[i] + bisect_left(self._blocks[i], probe)
+
+    def slice(self, start: int, stop: int) -> List:
+        """Return the items in sorted positions [start, stop)."""
+        start = max(start, 0)
+        stop = min(stop, self._len)
+        if start >= stop:
+            return []
+        offsets = self._block_offsets()
+        i = bisect_right(offsets, start) - 1
+        items = []
+        while offsets[i] < stop:
+            block = self._blocks[i]
+            items.extend(item for _, _, item in block[max(start - offsets[i], 0):stop - offsets[i]])
+            i += 1
+        return items
+
+    def top(self, k: int) -> List:
+        """Return the first k items in sorted order."""
+        return self.slice(0, k)
+
+    def page(self, number: int, size: int) -> List:
+        """Return page ``number`` (starting at 1) of ``size`` items."""
+        start = (number - 1) * size
+        return self.slice(start, start + size)
+
+    def _insert(self, entry: Tuple):
+        self._offsets = None
+        if not self._blocks:
+            self._blocks.append([entry])
+            self._maxes.append(entry)
+            self._len += 1
+            return
+
+        probe = entry[:2]
+        i = bisect_left(self._maxes, probe)
+        if i == len(self._blocks):
+            i -= 1
+            self._blocks[i].append(entry)
+            self._maxes[i] = entry
+        else:
+            block = self._blocks[i]
+            block.insert(bisect_left(block, probe), entry)
+        self._len += 1
+
+        block = self._blocks[i]
+        if len(block) > 2 * self.BLOCK_SIZE:
+            half = block[self.BLOCK_SIZE:]
+            del block[self.BLOCK_SIZE:]
+            self._blocks.insert(i + 1, half)
+            self._maxes[i] = block[-1]
+            self._maxes.insert(i + 1, half[-1])
+
+    def _delete(self, key: Tuple):
+        """Remove the entry with the given (sort_key, seq)."""
+        self._offsets = None
+        i = bisect_left(self._maxes, key)
+        block = self._blocks[i]
+        j = bisect_left(block, key)
+        del block[j]
+        self._len -= 1
+        if not block:
+            del self._blocks[i]
+            del self._maxes[i]
+        elif j == len(block):
+            self._maxes[i] = block[-1]
+
+
+def _without_item(entry: Tuple) -> Tuple:
+    return entry[:2]
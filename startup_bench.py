@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Byte-Sized Business Boost - Cold Start Benchmark
+Generates directories of different sizes, stores each one as an indented
+JSON file and as a SQLite database (optionally also in the lazy review
+layout), and times how long a fresh process takes to construct a
+BusinessBoost from each file.
+
+Usage: python3 startup_bench.py [--sizes 10000,100000,1000000] [--lazy-reviews]
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List
+
+from benchmarks.data import COMMENTS, KINDS, WORDS
+from storage import JSONStorage, SQLiteStorage, convert
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Runs in a fresh interpreter so every measurement is a cold start
+CHILD = """
+import json, sys, time
+sys.path.insert(0, {here!r})
+started = time.perf_counter()
+from models import BusinessBoost
+boost = BusinessBoost(data_file={data_file!r}, journal=True, lazy_reviews={lazy!r})
+elapsed = time.perf_counter() - started
+peak = None
+try:
+    # Linux; unlike ru_maxrss this does not carry over the parent's peak
+    with open("/proc/self/status") as f:
+        peak = int(next(line for line in f if line.startswith("VmHWM")).split()[1]) / 1024
+except OSError:
+    pass
+print(json.dumps({{"seconds": elapsed, "businesses": len(boost.businesses), "peak_mb": peak}}))
+"""
+
+
+def generate(count: int, seed: int = 42) -> Dict:
+    """Build a deterministic snapshot with ``count`` businesses and a few reviews each."""
+    rng = random.Random(seed)
+    businesses = []
+    for i in range(count):
+        category = rng.choice(tuple(KINDS))
+        reviews = [{
+            "user_name": f"user{rng.randrange(1000)}",
+            "rating": rng.randint(1, 5),
+            "comment": rng.choice(COMMENTS),
+            "verified": True,
+            "date": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T12:00:00"
+        } for _ in range(rng.randrange(5))]
+        businesses.append({
+            "id": f"B{i:011d}",
+            "name": f"{rng.choice(WORDS).title()} {rng.choice(KINDS[category])} {i}",
+            "category": category,
+            "address": f"{rng.randint(1, 9999)} {rng.choice(WORDS).title()} Street",
+            "phone": f"(555) {rng.randint(100, 999)}-{rng.randint(1000, 9999)}",
+            "description": f"A {rng.choice(WORDS)} {category} business",
+            "deals": [],
+            "reviews": reviews,
+            "created_at": "2024-01-01T00:00:00"
+        })
+    return {"businesses": businesses, "user_favorites": {}}
+
+
+def cold_start(data_file: str, lazy: bool) -> Dict:
+    """Construct a BusinessBoost in a new process and return its timing."""
+    code = CHILD.format(here=HERE, data_file=data_file, lazy=lazy)
+    output = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def run(sizes: List[int], lazy: bool):
+    print(f"{'businesses':>11}  {'format':<18} {'file MB':>8} {'cold start':>11} {'peak MB':>8}")
+    with tempfile.TemporaryDirectory() as data_dir:
+        for size in sizes:
+            data = generate(size)
+            json_file = os.path.join(data_dir, f"bench-{size}.json")
+            db_file = os.path.join(data_dir, f"bench-{size}.db")
+            JSONStorage(json_file).save(data)
+            database = SQLiteStorage(db_file)
+            database.save(data)
+            database.close()
+            del data
+            variants = [("json", json_file, False), ("sqlite", db_file, False)]
+            if lazy:
+                lazy_json = os.path.join(data_dir, f"bench-{size}-lazy.json")
+                convert(json_file, lazy_json, lazy_reviews=True)
+                variants.append(("json, lazy", lazy_json, True))
+
+            for name, data_file, variant_lazy in variants:
+                megabytes = sum(os.path.getsize(os.path.join(data_dir, f)) for f in os.listdir(data_dir)
+                                if f.startswith(os.path.basename(data_file))) / (1024 * 1024)
+                result = cold_start(data_file, variant_lazy)
+                if result["businesses"] != size:
+                    print(f"❌ {name} loaded {result['businesses']} of {size} businesses")
+                    sys.exit(1)
+                peak = f"{result['peak_mb']:8.0f}" if result["peak_mb"] is not None else f"{'-':>8}"
+                print(f"{size:>11,}  {name:<18} {megabytes:8.1f} {result['seconds']:10.2f}s {peak}")
+
+            for name in os.listdir(data_dir):
+                os.remove(os.path.join(data_dir, name))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare BusinessBoost cold-start time across snapshot formats.")
+    parser.add_argument("--sizes", default="10000,100000,1000000",
+                        help="comma-separated directory sizes (default 10000,100000,1000000)")
+    parser.add_argument("--lazy-reviews", action="store_true",
+                        help="also time the lazy review layouts")
+    args = parser.parse_args()
+    run([int(size) for size in args.sizes.split(",")], args.lazy_reviews)
+
+
+if __name__ == "__main__":
+    main()
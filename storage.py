@@ -0,0 +1,1052 @@
+#!/usr/bin/env python3
+"""
+Storage backends for Byte-Sized Business Boost
+
+A backend persists the state held by BusinessBoost. Every backend offers:
+
+    exists()              -> whether anything has been stored yet
+    load(on_business, progress)
+                          -> (snapshot dict, list of pending mutation records);
+                             with on_business, each business dict is passed to
+                             it as soon as it is read instead of being kept in
+                             the snapshot, and progress(done, total) is called
+                             as the data file is read
+    save(data, pending)   -> write a full snapshot (that also covers
+                             ``pending`` mutations never passed to record)
+    record(op, payload)   -> persist one mutation; returns True if a full
+                             snapshot should be written afterwards
+    record_many(records)  -> durably persist a batch of (op, payload) pairs
+    wants_snapshot(n)     -> whether n more mutations are better written as a
+                             full snapshot than recorded one by one
+    locked()              -> context manager holding the store's cross-process
+                             write lock
+    changed()             -> cheap check for writes by other processes
+    poll()                -> records other processes wrote since the last load
+                             or poll, or None if a full reload is needed
+    load_reviews(id)      -> the reviews a lazy snapshot keeps out of line for
+                             one business (JSON stores with lazy_reviews=True)
+
+The last three only do real work for stores opened with shared=True, which
+several worker processes can use at once. The others belong to a single
+process and never see outside changes.
+
+Run this file directly to migrate a JSON data file into SQLite:
+
+    python3 storage.py migrate business_data.json business_data.db
+
+or to convert between formats, e.g. SQLite back to JSON:
+
+    python3 storage.py convert business_data.db business_data.json
+"""
+
+import argparse
+import codecs
+import json
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+SQLITE_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+def _fsync_directory(path: str):
+    """Make a rename inside a directory durable (not possible on Windows)."""
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class FileLock:
+    """Cross-process lock backed by a lock file.
+
+    Uses ``fcntl.flock`` where available and ``msvcrt.locking`` on Windows,
+    where every lock is exclusive. Threads of one process share the lock, so
+    callers must serialize their own threads. The file is reopened after a
+    fork so that parent and child do not share one lock.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd = None
+        self._pid = None
+        self._depth = 0
+
+    @contextmanager
+    def held(self, shared: bool = False):
+        """Hold the lock for a block; nested use keeps the outer lock."""
+        if self._depth:
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+            return
+
+        self.acquire(shared)
+        self._depth = 1
+        try:
+            yield
+        finally:
+            self._depth = 0
+            self.release()
+
+    def _open(self) -> int:
+        if self._pid != os.getpid():
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            self._pid = os.getpid()
+        return self._fd
+
+    def acquire(self, shared: bool = False):
+        fd = self._open()
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            return
+        os.lseek(fd, 0, os.SEEK_SET)
+        while True:
+            try:
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                # LK_LOCK gives up after about ten seconds; keep waiting
+                time.sleep(0.01)
+
+    def release(self):
+        fd = self._open()
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+def _hand_over(businesses: List[Dict], on_business: Callable[[Dict], None]):
+    """Pass businesses to on_business in order, letting go of each one once passed."""
+    businesses.reverse()
+    while businesses:
+        on_business(businesses.pop())
+
+
+class SnapshotReader:
+    """Incremental parser for a JSON snapshot.
+
+    Iterating yields ``("businesses", element)`` for every element of the
+    top-level "businesses" array (or whichever ``array_key`` names) and
+    ``(key, value)`` for every other top-level key, in file order. The file is read in chunks and each value
+    is decoded with ``raw_decode`` as soon as it is complete, so only one
+    business is held as a dict at a time. Where the file stops being valid
+    JSON (e.g. a truncated or overwritten tail) iteration ends and
+    ``damaged`` is set; everything yielded before that is intact.
+    """
+
+    CHUNK_SIZE = 1 << 20
+
+    def __init__(self, f, total: int = 0, progress: Optional[Callable[[int, int], None]] = None,
+                 array_key: str = "businesses"):
+        self.array_key = array_key
+        self.damaged = False
+        self.bytes_read = 0
+        self._file = f
+        self._total = total
+        self._progress = progress
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def __iter__(self) -> Iterator[Tuple[str, object]]:
+        try:
+            if not self._take("{"):
+                raise ValueError("a snapshot must be a JSON object")
+            if self._take("}"):
+                return
+            while True:
+                key = self._value()
+                if not isinstance(key, str) or not self._take(":"):
+                    raise ValueError("expected a key")
+                if key == self.array_key and self._take("["):
+                    if not self._take("]"):
+                        while True:
+                            yield key, self._value()
+                            if self._take("]"):
+                                break
+                            if not self._take(","):
+                                raise ValueError("expected , or ]")
+                else:
+                    yield key, self._value()
+                if self._take("}"):
+                    return
+                if not self._take(","):
+                    raise ValueError("expected , or }")
+        except ValueError:  # includes JSONDecodeError and UnicodeDecodeError
+            self.damaged = True
+
+    @property
+    def offset(self) -> int:
+        """Byte offset of the first value not yet parsed."""
+        return self.bytes_read - len(self._buffer[self._pos:].encode("utf-8", "surrogatepass"))
+
+    def _fill(self, size: int = 0) -> bool:
+        """Read at least another chunk into the buffer; False at the end of the file."""
+        if self._eof:
+            return False
+        raw = self._file.read(max(size, self.CHUNK_SIZE))
+        self._eof = not raw
+        self.bytes_read += len(raw)
+        self._buffer = self._buffer[self._pos:] + self._text.decode(raw, final=self._eof)
+        self._pos = 0
+        if self._progress is not None and raw:
+            self._progress(self.bytes_read, self._total)
+        return bool(raw)
+
+    def _skip_whitespace(self):
+        while True:
+            self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer) or not self._fill():
+                return
+
+    def _take(self, char: str) -> bool:
+        """Consume ``char`` if it is the next thing after any whitespace."""
+        self._skip_whitespace()
+        if self._buffer.startswith(char, self._pos):
+            self._pos += 1
+            return True
+        return False
+
+    def _value(self):
+        """Decode the next value, reading more of the file until it is complete."""
+        self._skip_whitespace()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                # Usually a value cut off by the end of the chunk; read twice as much and retry
+                if self._fill(len(self._buffer) - self._pos):
+                    continue
+                raise
+            # A number running up to the end of the buffer may continue in the next chunk
+            if end == len(self._buffer) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+
+class JSONStorage:
+    """Stores everything in one JSON snapshot plus an optional append-only journal.
+
+    With lazy_reviews=True every snapshot puts the reviews in a separate
+    review file (``<data_file>.reviews-<token>``), one JSON array per
+    business, and the snapshot records the file name and each business's
+    byte range in it. ``load_reviews`` reads one business's range. Each
+    snapshot writes a new review file before the snapshot that names it, so
+    the two always match; reviews of businesses that were never loaded are
+    copied over byte for byte. Snapshots in this layout are read by either
+    mode, so lazy loading can be switched on and off.
+    """
+
+    def __init__(self, data_file: str, journal: bool = False, compact_threshold: int = 1000,
+                 lazy_reviews: bool = False):
+        self.data_file = data_file
+        self.journal = journal
+        self.journal_file = data_file + ".journal"
+        self.compact_threshold = compact_threshold
+        self.lazy_reviews = lazy_reviews
+        self.seq = 0  # sequence number of the last persisted mutation
+        self.journal_entries = 0  # records in the journal since the last compaction
+        self.offset = 0  # bytes of the journal already read
+        # Review file of the snapshot we loaded or wrote last, and business id -> (offset, length) in it
+        self._reviews_handle = None
+        self._review_index: Dict[str, Tuple[int, int]] = {}
+        self._reviews_lock = threading.Lock()
+
+    def exists(self) -> bool:
+        """Check whether a snapshot has been written."""
+        return os.path.exists(self.data_file)
+
+    def load(self, on_business: Optional[Callable[[Dict], None]] = None,
+             progress: Optional[Callable[[int, int], None]] = None) -> Tuple[Dict, List[Dict]]:
+        """Read the snapshot and the journal records written after it."""
+        data = self._read_snapshot(on_business, progress)
+        self.seq = data.get("journal_seq", 0)
+        return data, self._read_journal()
+
+    def _read_snapshot(self, on_business: Optional[Callable[[Dict], None]] = None,
+                       progress: Optional[Callable[[int, int], None]] = None) -> Dict:
+        """Stream the snapshot, handing over businesses as they are parsed.
+
+        A damaged file keeps every business before the damage; a copy of it
+        is saved next to the data file, since the next snapshot replaces it.
+        """
+        data = {}
+        businesses = []
+        deliver = on_business or businesses.append
+        directory = os.path.dirname(os.path.abspath(self.data_file))
+        handle = None
+        index = {}
+        seen = set()
+        waiting = []  # businesses held back until the review file is named, to keep their order
+        with open(self.data_file, 'rb') as f:
+            reader = SnapshotReader(f, os.fstat(f.fileno()).st_size, progress)
+            for key, value in reader:
+                if key == "businesses" and isinstance(value, dict):
+                    ref = value.pop("reviews_at", None)
+                    first = value["id"] not in seen
+                    seen.add(value["id"])
+                    if self.lazy_reviews and first and "review_stats" in value:
+                        if ref is not None:
+                            index[value["id"]] = tuple(ref)
+                        ref = None
+                    elif "review_stats" in value:
+                        # Not loading lazily, or a duplicate ID the index cannot tell apart
+                        value.setdefault("reviews", [])
+                    if waiting or (ref is not None and handle is None):
+                        waiting.append((value, ref))
+                        continue
+                    if ref is not None:
+                        value["reviews"] = self._read_reviews(handle, ref)
+                    deliver(value)
+                elif key == "reviews_file":
+                    handle = open(os.path.join(directory, value), 'rb')
+                    for business, ref in waiting:
+                        if ref is not None:
+                            business["reviews"] = self._read_reviews(handle, ref)
+                        deliver(business)
+                    waiting = []
+                else:
+                    data[key] = value
+
+        if reader.damaged:
+            backup = self.data_file + ".damaged"
+            shutil.copyfile(self.data_file, backup)
+            if not seen and not data:
+                raise ValueError(f"{self.data_file} is not a valid snapshot (copy saved as {backup})")
+            print(f"Error reading {self.data_file}: damaged after {len(seen)} businesses "
+                  f"(at byte {reader.offset}); keeping those, copy saved as {backup}")
+        for business, _ in waiting:
+            # The review file name was lost with the damaged tail
+            deliver(business)
+        if handle is None:
+            index = {}
+        elif not self.lazy_reviews:
+            handle.close()
+            handle = None
+        self._swap_reviews(handle, index)
+        if on_business is None:
+            data["businesses"] = businesses
+        return data
+
+    def _swap_reviews(self, handle, index: Dict[str, Tuple[int, int]]):
+        with self._reviews_lock:
+            old = self._reviews_handle
+            self._reviews_handle = handle
+            self._review_index = index
+        if old is not None:
+            old.close()
+
+    @staticmethod
+    def _read_reviews(handle, ref) -> List[Dict]:
+        offset, length = ref
+        handle.seek(offset)
+        return json.loads(handle.read(length))
+
+    def load_reviews(self, business_id: str) -> List[Dict]:
+        """Read one business's reviews from the review file of a lazy snapshot."""
+        with self._reviews_lock:
+            ref = self._review_index.get(business_id)
+            if ref is None:
+                return []
+            return self._read_reviews(self._reviews_handle, ref)
+
+    def _stored_reviews_bytes(self, business_id: str) -> Optional[bytes]:
+        with self._reviews_lock:
+            ref = self._review_index.get(business_id)
+            if ref is None:
+                return None
+            offset, length = ref
+            self._reviews_handle.seek(offset)
+            return self._reviews_handle.read(length)
+
+    def _write_reviews(self, data: Dict) -> Tuple[Dict, str, Dict[str, Tuple[int, int]]]:
+        """Write the reviews of a snapshot to a new review file.
+
+        A business dict without "reviews" keeps the reviews the current
+        review file holds for it. Returns the snapshot to write in their
+        place, the new file's path and its index.
+        """
+        name = f"{os.path.basename(self.data_file)}.reviews-{os.urandom(6).hex()}"
+        path = os.path.join(os.path.dirname(os.path.abspath(self.data_file)), name)
+        businesses = []
+        index = {}
+        seen = set()
+        offset = 0
+        with open(path, 'wb') as f:
+            for business in data.get("businesses", []):
+                business = dict(business)
+                first = business["id"] not in seen
+                seen.add(business["id"])
+                if "reviews" not in business:
+                    chunk = self._stored_reviews_bytes(business["id"]) if first else None
+                elif first:
+                    reviews = business.pop("reviews")
+                    chunk = json.dumps(reviews, separators=(',', ':')).encode() if reviews else None
+                else:
+                    # A duplicate ID keeps its reviews inline
+                    chunk = None
+                if chunk:
+                    business["reviews_at"] = [offset, len(chunk)]
+                    index[business["id"]] = (offset, len(chunk))
+                    f.write(chunk + b"\n")
+                    offset += len(chunk) + 1
+                businesses.append(business)
+            f.flush()
+            os.fsync(f.fileno())
+        # Named ahead of the businesses, so a streaming load can resolve them as it goes
+        return {"reviews_file": name, **dict(data, businesses=businesses)}, path, index
+
+    def _remove_review_files(self, keep: Optional[str] = None):
+        """Delete review files no snapshot refers to any more."""
+        directory = os.path.dirname(os.path.abspath(self.data_file))
+        prefix = os.path.basename(self.data_file) + ".reviews-"
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if name.startswith(prefix) and path != keep:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass  # still open on Windows; a later snapshot retries
+
+    def _read_journal(self) -> List[Dict]:
+        """Collect journal records that are newer than the snapshot."""
+        records, self.journal_entries, self.offset = self._tail_journal(0)
+        return records
+
+    def _tail_journal(self, offset: int, journal_file: Optional[str] = None) -> Tuple[List[Dict], int, int]:
+        """Read complete journal lines from a byte offset.
+
+        Returns the records newer than ``seq``, the number of lines read and
+        the offset just past the last complete line.
+        """
+        journal_file = journal_file or self.journal_file
+        records = []
+        entries = 0
+        if not os.path.exists(journal_file):
+            return records, entries, offset
+
+        with open(journal_file, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("incomplete line")
+                    record = json.loads(line)
+                except ValueError:
+                    # A torn final line from an interrupted append; everything before it is intact
+                    break
+                entries += 1
+                offset += len(line)
+                # Records already folded into the snapshot are skipped
+                if record["seq"] > self.seq:
+                    records.append(record)
+                    self.seq = record["seq"]
+        return records, entries, offset
+
+    def save(self, data: Dict, pending: int = 0):
+        """Write a full snapshot and start an empty journal."""
+        # Mutations folded in without being recorded still use up sequence numbers
+        self.seq += pending
+        self._write_snapshot(dict(data, journal_seq=self.seq))
+        self._retire_journal()
+        self.journal_entries = 0
+        self.offset = 0
+
+    def _write_snapshot(self, data: Dict):
+        reviews_path = None
+        if self.lazy_reviews:
+            data, reviews_path, index = self._write_reviews(data)
+        # Write to a temporary file first so a crash never leaves a half-written snapshot
+        temp_file = self.data_file + ".tmp"
+        with open(temp_file, 'w') as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_file, self.data_file)
+        _fsync_directory(self.data_file)
+        if reviews_path is not None:
+            self._swap_reviews(open(reviews_path, 'rb'), index)
+        # Processes still reading an older review file keep it open (not on Windows)
+        self._remove_review_files(keep=reviews_path)
+
+    def _retire_journal(self):
+        """Get rid of the journal once a snapshot has absorbed it."""
+        if os.path.exists(self.journal_file):
+            os.remove(self.journal_file)
+
+    def record(self, op: str, payload: Dict) -> bool:
+        """Append one mutation to the journal, or ask for a snapshot when not journaling."""
+        self.seq += 1
+        if not self.journal:
+            return True
+
+        record = {"seq": self.seq, "op": op, **payload}
+        self._append((json.dumps(record, separators=(',', ':')) + "\n").encode())
+        self.journal_entries += 1
+        return self.journal_entries >= self.compact_threshold
+
+    def wants_snapshot(self, pending: int) -> bool:
+        """Whether ``pending`` more mutations should go into a snapshot rather than the journal."""
+        return not self.journal or self.journal_entries + pending >= self.compact_threshold
+
+    def record_many(self, records: List[Tuple[str, Dict]]):
+        """Append several mutations to the journal with a single write and fsync."""
+        lines = []
+        for op, payload in records:
+            self.seq += 1
+            lines.append(json.dumps({"seq": self.seq, "op": op, **payload}, separators=(',', ':')) + "\n")
+        self._append("".join(lines).encode(), sync=True)
+        self.journal_entries += len(records)
+
+    def _append(self, data: bytes, sync: bool = False):
+        """Append complete lines to the journal, dropping anything past the last good line first."""
+        with open(self.journal_file, 'ab') as f:
+            # A torn line from an interrupted append would hide every line written after it
+            if f.tell() != self.offset:
+                f.truncate(self.offset)
+            f.write(data)
+            if sync:
+                f.flush()
+                os.fsync(f.fileno())
+        self.offset += len(data)
+
+    @contextmanager
+    def locked(self, shared: bool = False):
+        """Hold the cross-process lock (a no-op for a single-process store)."""
+        yield
+
+    def changed(self) -> bool:
+        """Check for writes by other processes (never, for a single-process store)."""
+        return False
+
+    def poll(self) -> Optional[List[Dict]]:
+        """Return records written by other processes (none, for a single-process store)."""
+        return []
+
+
+class SharedJSONStorage(JSONStorage):
+    """A journaled JSON store that several processes can read and write at once.
+
+    Every write happens under an exclusive lock on ``<data_file>.lock`` by a
+    process that has already applied everything in the journal, so all
+    processes see one order of mutations. After each write the
+    ``<data_file>.state`` file is replaced with the snapshot generation, the
+    sequence number the snapshot covers and the latest sequence number.
+    Readers compare that small file with what they last saw. When it differs
+    they read only the journal lines written since their last byte offset.
+    Compaction keeps the journal it replaces as ``<data_file>.journal.prev``
+    so readers one generation behind can finish it; a reader that missed two
+    compactions has to reload everything.
+    """
+
+    def __init__(self, data_file: str, compact_threshold: int = 1000, lazy_reviews: bool = False):
+        super().__init__(data_file, journal=True, compact_threshold=compact_threshold,
+                         lazy_reviews=lazy_reviews)
+        self.state_file = data_file + ".state"
+        self.prev_journal_file = self.journal_file + ".prev"
+        self.generation = 0  # bumped by every snapshot
+        self.base_seq = 0  # sequence number the current snapshot covers
+        self._state = None  # contents of the state file when we last synced
+        self._lock = FileLock(data_file + ".lock")
+
+    @contextmanager
+    def locked(self, shared: bool = False):
+        """Hold the cross-process lock; nested use keeps the outer lock."""
+        with self._lock.held(shared):
+            yield
+
+    def exists(self) -> bool:
+        """Check whether a snapshot has been written."""
+        with self.locked(shared=True):
+            return super().exists()
+
+    def load(self, on_business: Optional[Callable[[Dict], None]] = None,
+             progress: Optional[Callable[[int, int], None]] = None) -> Tuple[Dict, List[Dict]]:
+        """Read the snapshot and journal as one consistent state."""
+        with self.locked(shared=True):
+            self._state = self._read_state()
+            data, records = super().load(on_business, progress)
+            self.generation = data.get("generation", 0)
+            self.base_seq = data.get("journal_seq", 0)
+            return data, records
+
+    def save(self, data: Dict, pending: int = 0):
+        """Write a full snapshot, starting a new generation."""
+        with self.locked():
+            self.generation += 1
+            self.base_seq = self.seq + pending
+            super().save(dict(data, generation=self.generation), pending)
+            self._write_state()
+
+    def record(self, op: str, payload: Dict) -> bool:
+        """Append one mutation; the caller must have applied every earlier one."""
+        with self.locked():
+            if self._read_state() != self._state:
+                raise RuntimeError("shared store changed since the last poll(); sync before writing")
+            self.seq += 1
+            record = {"seq": self.seq, "op": op, **payload}
+            self._append((json.dumps(record, separators=(',', ':')) + "\n").encode())
+            self.journal_entries += 1
+            self._write_state()
+            return self.journal_entries >= self.compact_threshold
+
+    def changed(self) -> bool:
+        """Check, without locking, whether another process wrote since we last synced."""
+        return self._read_state() != self._state
+
+    def poll(self) -> Optional[List[Dict]]:
+        """Read the records other processes appended since the last load or poll."""
+        with self.locked(shared=True):
+            state = self._read_state()
+            if state == self._state:
+                return []
+            generation, base_seq, _ = self._parse_state(state)
+            records = []
+            if generation != self.generation:
+                if self.seq < base_seq and generation == self.generation + 1:
+                    # Finish the journal the compaction retired
+                    records, _, _ = self._tail_journal(self.offset, self.prev_journal_file)
+                if self.seq < base_seq:
+                    # Records we never saw were compacted away
+                    return None
+                self.generation = generation
+                self.base_seq = base_seq
+                self.offset = 0
+                self.journal_entries = 0
+            new_records, entries, self.offset = self._tail_journal(self.offset)
+            self.journal_entries += entries
+            self._state = state
+            return records + new_records
+
+    def _retire_journal(self):
+        """Keep the absorbed journal around for readers still part-way through it."""
+        if os.path.exists(self.journal_file):
+            os.replace(self.journal_file, self.prev_journal_file)
+
+    def _read_state(self) -> bytes:
+        try:
+            with open(self.state_file, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return b""
+
+    @staticmethod
+    def _parse_state(state: bytes) -> Tuple[int, int, int]:
+        try:
+            generation, base_seq, seq = (int(part) for part in state.split())
+        except ValueError:
+            return 0, 0, 0
+        return generation, base_seq, seq
+
+    def _write_state(self):
+        state = f"{self.generation} {self.base_seq} {self.seq}\n".encode()
+        temp_file = self.state_file + ".tmp"
+        with open(temp_file, 'wb') as f:
+            f.write(state)
+        os.replace(temp_file, self.state_file)
+        self._state = state
+
+
+class SQLiteStorage:
+    """Stores businesses, reviews, deals and favorites as rows in a SQLite database.
+
+    SQLite keeps each transaction consistent, but a mutation is a poll for
+    other processes' changes followed by a write, so with shared=True
+    ``locked`` holds the same ``.lock`` file lock as the shared JSON store
+    around both. Every write also goes into a ``changes`` table, so other
+    processes can pick up what changed instead of reloading the whole database.
+    """
+
+    CHANGE_LOG_SIZE = 10000  # change-log entries kept for processes that fall behind
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS businesses (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            category TEXT NOT NULL,
+            address TEXT NOT NULL,
+            phone TEXT NOT NULL DEFAULT '',
+            description TEXT NOT NULL DEFAULT '',
+            created_at TEXT NOT NULL,
+            latitude REAL,
+            longitude REAL,
+            version INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS deals (
+            business_id TEXT NOT NULL REFERENCES businesses(id),
+            position INTEGER NOT NULL,
+            title TEXT,
+            description TEXT,
+            expires TEXT,
+            PRIMARY KEY (business_id, position)
+        );
+        CREATE TABLE IF NOT EXISTS reviews (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            business_id TEXT NOT NULL REFERENCES businesses(id),
+            user_name TEXT NOT NULL,
+            rating INTEGER NOT NULL CHECK (rating BETWEEN 1 AND 5),
+            comment TEXT NOT NULL DEFAULT '',
+            verified INTEGER NOT NULL DEFAULT 0,
+            date TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS favorites (
+            username TEXT NOT NULL,
+            business_id TEXT NOT NULL,
+            PRIMARY KEY (username, business_id)
+        );
+        CREATE TABLE IF NOT EXISTS changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            origin TEXT NOT NULL,
+            record TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_businesses_category ON businesses(category);
+        CREATE INDEX IF NOT EXISTS idx_businesses_name ON businesses(name COLLATE NOCASE);
+        CREATE INDEX IF NOT EXISTS idx_reviews_business ON reviews(business_id);
+    """
+
+    def __init__(self, db_file: str, shared: bool = False):
+        self.db_file = db_file
+        self.shared = shared
+        self._existed = os.path.exists(db_file)
+        # Flask serves requests from several threads; callers serialize writes
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(self.SCHEMA)
+        columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(businesses)")}
+        for column in ("latitude", "longitude"):
+            if column not in columns:
+                # Databases created before businesses had locations
+                self.conn.execute(f"ALTER TABLE businesses ADD COLUMN {column} REAL")
+        if "version" not in columns:
+            self.conn.execute("ALTER TABLE businesses ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+        self.conn.commit()
+        self.seq = 0  # sequence number of the last mutation, shared with the change log
+        self._origin = os.urandom(8).hex()  # tells our own change-log entries apart
+        if shared:
+            # changed() runs outside the callers' locking, so it gets its own connection
+            self._probe = sqlite3.connect(db_file, check_same_thread=False)
+            self._probe_lock = threading.Lock()
+            self._probe_version = self._data_version()
+            self._lock = FileLock(db_file + ".lock")
+
+    def exists(self) -> bool:
+        """Check whether the database held any data when it was opened."""
+        return self._existed
+
+    def load(self, on_business: Optional[Callable[[Dict], None]] = None,
+             progress: Optional[Callable[[int, int], None]] = None) -> Tuple[Dict, List[Dict]]:
+        """Read every table back into the snapshot layout used by the JSON file."""
+        # One read transaction, so the tables and the change-log position agree
+        self.conn.execute("BEGIN")
+        try:
+            return self._load(on_business)
+        finally:
+            self.conn.execute("COMMIT")
+
+    def _load(self, on_business: Optional[Callable[[Dict], None]] = None) -> Tuple[Dict, List[Dict]]:
+        if self.shared:
+            with self._probe_lock:
+                self._probe_version = self._data_version()
+        self.seq = self._stored_seq()
+
+        deals: Dict[str, List[Dict]] = {}
+        for row in self.conn.execute("SELECT * FROM deals ORDER BY business_id, position"):
+            deals.setdefault(row["business_id"], []).append(self._deal_from_row(row))
+
+        reviews: Dict[str, List[Dict]] = {}
+        for row in self.conn.execute("SELECT * FROM reviews ORDER BY id"):
+            reviews.setdefault(row["business_id"], []).append(self._review_from_row(row))
+
+        businesses = []
+        deliver = on_business or businesses.append
+        for row in self.conn.execute("SELECT * FROM businesses ORDER BY rowid"):
+            business = dict(row)
+            business["deals"] = deals.get(row["id"], [])
+            business["reviews"] = reviews.pop(row["id"], [])
+            deliver(business)
+
+        user_favorites: Dict[str, List[str]] = {}
+        for row in self.conn.execute("SELECT username, business_id FROM favorites ORDER BY rowid"):
+            user_favorites.setdefault(row["username"], []).append(row["business_id"])
+
+        data = {"user_favorites": user_favorites}
+        if on_business is None:
+            data["businesses"] = businesses
+        return data, []
+
+    def save(self, data: Dict, pending: int = 0):
+        """Replace the contents of every table with a full snapshot.
+
+        Mutations folded in use up sequence numbers without change-log
+        entries, so other processes see the gap and reload.
+        """
+        with self.conn:
+            for table in ("reviews", "deals", "favorites", "businesses"):
+                self.conn.execute(f"DELETE FROM {table}")
+            for business in data.get("businesses", []):
+                self._insert_business(business)
+            for username, business_ids in data.get("user_favorites", {}).items():
+                for business_id in business_ids:
+                    self._insert_favorite(username, business_id)
+            self.seq += pending
+            self._store_seq()
+        self._existed = True
+
+    def record(self, op: str, payload: Dict) -> bool:
+        """Apply one mutation as a row-level write."""
+        with self.conn:
+            self._write(op, payload)
+            self._store_seq()
+        return False
+
+    def record_many(self, records: List[Tuple[str, Dict]]):
+        """Apply several mutations in one transaction."""
+        with self.conn:
+            for op, payload in records:
+                self._write(op, payload)
+            self._store_seq()
+
+    def _stored_seq(self) -> int:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'seq'").fetchone()
+        if row is not None:
+            return row[0]
+        # Databases from before the sequence number was stored
+        return self.conn.execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+
+    def _store_seq(self):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('seq', ?)", (self.seq,))
+
+    def wants_snapshot(self, pending: int) -> bool:
+        """Row-level writes never need a full snapshot."""
+        return False
+
+    def _write(self, op: str, payload: Dict):
+        self.seq += 1
+        if op == "add_business":
+            self._insert_business(payload["business"])
+        elif op == "remove_business":
+            for table, column in (("reviews", "business_id"), ("deals", "business_id"),
+                                  ("favorites", "business_id"), ("businesses", "id")):
+                self.conn.execute(f"DELETE FROM {table} WHERE {column} = ?", (payload["business_id"],))
+        elif op == "add_review":
+            self._insert_review(payload["business_id"], payload["review"])
+            # A business's version is the sequence number of the last mutation that touched it
+            self.conn.execute("UPDATE businesses SET version = ? WHERE id = ?", (self.seq, payload["business_id"]))
+        elif op == "add_favorite":
+            self._insert_favorite(payload["username"], payload["business_id"])
+        elif op == "remove_favorite":
+            self.conn.execute("DELETE FROM favorites WHERE username = ? AND business_id = ?",
+                              (payload["username"], payload["business_id"]))
+        if self.shared:
+            self.conn.execute("INSERT INTO changes (seq, origin, record) VALUES (?, ?, ?)",
+                              (self.seq, self._origin, json.dumps({"op": op, **payload}, separators=(',', ':'))))
+            self.conn.execute("DELETE FROM changes WHERE seq <= ?", (self.seq - self.CHANGE_LOG_SIZE,))
+
+    @contextmanager
+    def locked(self, shared: bool = False):
+        """Hold the cross-process lock (a no-op for a single-process store); nested use keeps the outer lock."""
+        if not self.shared:
+            yield
+            return
+        with self._lock.held(shared):
+            yield
+
+    def changed(self) -> bool:
+        """Check whether any connection committed since the last load or poll."""
+        if not self.shared:
+            return False
+        with self._probe_lock:
+            return self._data_version() != self._probe_version
+
+    def poll(self) -> Optional[List[Dict]]:
+        """Read the change-log entries other processes wrote since the last load or poll."""
+        if not self.shared:
+            return []
+        with self._probe_lock:
+            self._probe_version = self._data_version()
+        # One read transaction, so the log and the stored sequence number agree
+        self.conn.execute("BEGIN")
+        try:
+            stored_seq = self._stored_seq()
+            rows = self.conn.execute("SELECT seq, origin, record FROM changes WHERE seq > ? ORDER BY seq",
+                                     (self.seq,)).fetchall()
+        finally:
+            self.conn.execute("COMMIT")
+
+        records = []
+        seq = self.seq
+        for row in rows:
+            if row["seq"] != seq + 1:
+                break
+            seq = row["seq"]
+            if row["origin"] != self._origin:
+                records.append(dict(json.loads(row["record"]), seq=seq))
+        if seq != stored_seq:
+            # Entries we never saw were pruned from the log, or folded into a snapshot
+            return None
+        self.seq = seq
+        return records
+
+    def _data_version(self) -> int:
+        return self._probe.execute("PRAGMA data_version").fetchone()[0]
+
+    def close(self):
+        """Close the database connection."""
+        self.conn.close()
+        if self.shared:
+            self._probe.close()
+
+    @staticmethod
+    def _deal_from_row(row: sqlite3.Row) -> Dict:
+        return {"title": row["title"], "description": row["description"], "expires": row["expires"]}
+
+    @staticmethod
+    def _review_from_row(row: sqlite3.Row) -> Dict:
+        return {
+            "user_name": row["user_name"],
+            "rating": row["rating"],
+            "comment": row["comment"],
+            "verified": bool(row["verified"]),
+            "date": row["date"]
+        }
+
+    def _insert_business(self, business: Dict):
+        self.conn.execute(
+            "INSERT INTO businesses (id, name, category, address, phone, description, created_at, "
+            "latitude, longitude, version) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (business["id"], business["name"], business["category"], business["address"],
+             business.get("phone", ""), business.get("description", ""), business["created_at"],
+             business.get("latitude"), business.get("longitude"), business.get("version", 0)))
+        for position, deal in enumerate(business.get("deals", [])):
+            self.conn.execute(
+                "INSERT INTO deals (business_id, position, title, description, expires) VALUES (?, ?, ?, ?, ?)",
+                (business["id"], position, deal.get("title"), deal.get("description"), deal.get("expires")))
+        for review in business.get("reviews", []):
+            self._insert_review(business["id"], review)
+
+    def _insert_review(self, business_id: str, review: Dict):
+        self.conn.execute(
+            "INSERT INTO reviews (business_id, user_name, rating, comment, verified, date) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (business_id, review["user_name"], review["rating"], review.get("comment", ""),
+             int(review.get("verified", False)), review["date"]))
+
+    def _insert_favorite(self, username: str, business_id: str):
+        self.conn.execute("INSERT OR IGNORE INTO favorites (username, business_id) VALUES (?, ?)",
+                          (username, business_id))
+
+
+def open_storage(data_file: str, journal: bool = False, compact_threshold: int = 1000,
+                 shared: bool = False, lazy_reviews: bool = False):
+    """Pick a storage backend from the data file's extension.
+
+    With shared=True the store can be used by several processes at once; a
+    shared JSON store is always journaled. lazy_reviews=True needs a JSON store.
+    """
+    if data_file.lower().endswith(SQLITE_EXTENSIONS):
+        if lazy_reviews:
+            raise ValueError("lazy review loading needs a JSON data file")
+        return SQLiteStorage(data_file, shared=shared)
+    if shared:
+        return SharedJSONStorage(data_file, compact_threshold=compact_threshold,
+                                 lazy_reviews=lazy_reviews)
+    return JSONStorage(data_file, journal=journal, compact_threshold=compact_threshold,
+                       lazy_reviews=lazy_reviews)
+
+
+def migrate(json_file: str, db_file: str) -> Tuple[int, int]:
+    """Copy a JSON data file (and its journal) into a SQLite database."""
+    from models import BusinessBoost
+
+    if not os.path.exists(json_file):
+        raise FileNotFoundError(json_file)
+    source = BusinessBoost(data_file=json_file, journal=True)
+    target = SQLiteStorage(db_file)
+    target.save({
+        "businesses": [b.to_dict() for b in source.businesses],
+        "user_favorites": source.user_favorites
+    }, pending=source.storage.seq)
+    target.close()
+    review_count = sum(b.get_review_count() for b in source.businesses)
+    return len(source.businesses), review_count
+
+
+def convert(source_file: str, target_file: str, lazy_reviews: bool = False) -> Tuple[int, int]:
+    """Copy a data file (and its journal) into a fresh snapshot of another format.
+
+    Both formats follow the file extensions, e.g. business_data.db to
+    business_data.json. With lazy_reviews=True a JSON target keeps the
+    reviews out of line for lazy loading.
+    """
+    from models import BusinessBoost
+
+    if not os.path.exists(source_file):
+        raise FileNotFoundError(source_file)
+    source = BusinessBoost(data_file=source_file, journal=True)
+    target = open_storage(target_file, lazy_reviews=lazy_reviews)
+    # The sequence number carries over, so versions (and HTTP ETags) keep meaning the same data
+    target.save({
+        "businesses": [b.to_dict(lazy_reviews) for b in source.businesses],
+        "user_favorites": source.user_favorites
+    }, pending=source.storage.seq)
+    if isinstance(target, SQLiteStorage):
+        target.close()
+    review_count = sum(b.get_review_count() for b in source.businesses)
+    return len(source.businesses), review_count
+
+
+def main():
+    """Command line entry point for storage maintenance."""
+    parser = argparse.ArgumentParser(description="Business Boost storage tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    migrate_parser = subparsers.add_parser("migrate", help="migrate a JSON data file into SQLite")
+    migrate_parser.add_argument("json_file")
+    migrate_parser.add_argument("db_file")
+    convert_parser = subparsers.add_parser("convert", help="convert a data file to another format")
+    convert_parser.add_argument("source_file")
+    convert_parser.add_argument("target_file")
+    convert_parser.add_argument("--lazy-reviews", action="store_true",
+                                help="write the layout used for lazy review loading")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        businesses, reviews = migrate(args.json_file, args.db_file)
+        print(f"✅ Migrated {businesses} businesses and {reviews} reviews into {args.db_file}")
+    elif args.command == "convert":
+        businesses, reviews = convert(args.source_file, args.target_file, args.lazy_reviews)
+        print(f"✅ Converted {businesses} businesses and {reviews} reviews into {args.target_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Byte-Sized Business Boost - Concurrency Stress Test
+Hammers one shared BusinessBoost from many threads, the way a threaded web
+server does, and then checks that nothing was lost or corrupted. With
+--processes it runs that in several processes sharing one data file, like a
+multi-worker deployment, and checks that every process ends up with the same
+data as the file.
+
+Usage: python3 stress.py [--threads 16] [--seconds 5] [--processes 1] [--lazy-reviews]
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List
+
+from models import BusinessBoost
+
+
+class Stress:
+    """Runs a mix of reads and writes against one BusinessBoost and checks the results."""
+
+    def __init__(self, boost: BusinessBoost, write_ratio: float, prefix: str = "stress"):
+        self.boost = boost
+        self.write_ratio = write_ratio
+        self.prefix = prefix  # distinguishes the users of different processes
+        self.errors: List[str] = []
+        self.ops: Dict[str, int] = {"read": 0, "add_review": 0, "add_business": 0, "favorite": 0}
+        self.reviews_added = 0
+        self.businesses_added = 0
+        self.favorites: Dict[str, set] = {}  # username -> business ids it should end with
+        self.max_readers = 0
+        self._readers = 0
+        self._stats_lock = threading.Lock()
+        boost.add_listener(self._check_exclusive)
+
+    def _check_exclusive(self, op, business, categories_changed):
+        # Listeners run under the write lock, so no reader may be inside
+        if self._readers:
+            self._error(f"{op} ran while {self._readers} reader(s) held the lock")
+
+    def _error(self, message: str):
+        with self._stats_lock:
+            self.errors.append(message)
+
+    def _count(self, op: str):
+        with self._stats_lock:
+            self.ops[op] += 1
+
+    def read(self, rng: random.Random):
+        """Take a listing snapshot and check that it is internally consistent."""
+        boost = self.boost
+        # What the web app does before every request
+        boost.refresh()
+        with boost.lock.read():
+            with self._stats_lock:
+                self._readers += 1
+                self.max_readers = max(self.max_readers, self._readers)
+            try:
+                sort_by = rng.choice(("name", "rating", "reviews"))
+                listing = boost.sort_businesses(sort_by)
+                if len(listing) != len(boost.businesses):
+                    self._error(f"{sort_by} view has {len(listing)} of {len(boost.businesses)} businesses")
+                view = boost.get_sorted_view(sort_by)
+                keys = [view.sort_key(b) for b in listing]
+                if keys != sorted(keys):
+                    self._error(f"{sort_by} view is out of order")
+                for business in listing[:50]:
+                    if business.get_review_count() != len(business.reviews):
+                        self._error(f"{business.id}: review count does not match its reviews")
+                    if sum(business.get_rating_histogram().values()) != len(business.reviews):
+                        self._error(f"{business.id}: rating histogram does not match its reviews")
+                counts = boost.get_category_counts()
+                if sum(counts.values()) != len(listing):
+                    self._error("category counts do not add up to the number of businesses")
+                boost.search_businesses(rng.choice(("cafe", "shop", "a", "repair", "main")))
+            finally:
+                with self._stats_lock:
+                    self._readers -= 1
+        self._count("read")
+
+    def write(self, rng: random.Random, worker: int):
+        """Perform one random mutation and remember its expected effect."""
+        boost = self.boost
+        roll = rng.random()
+        if roll < 0.7:
+            business = rng.choice(boost.sort_businesses("name"))
+            if boost.add_review(business.id, f"{self.prefix}{worker}", rng.randint(1, 5), "stress test review"):
+                with self._stats_lock:
+                    self.reviews_added += 1
+            self._count("add_review")
+        elif roll < 0.8:
+            boost.add_business(f"Stress Shop {self.prefix}{worker}-{rng.random():.6f}",
+                               rng.choice(("food", "retail", "services")), f"{worker} Stress Street")
+            with self._stats_lock:
+                self.businesses_added += 1
+            self._count("add_business")
+        else:
+            # Each worker owns its username, so its expected favorites are exact
+            username = f"{self.prefix}{worker}"
+            business = rng.choice(boost.sort_businesses("name"))
+            expected = self.favorites.setdefault(username, set())
+            if business.id in expected:
+                boost.remove_from_favorites(username, business.id)
+                expected.discard(business.id)
+            else:
+                boost.add_to_favorites(username, business.id)
+                expected.add(business.id)
+            self._count("favorite")
+
+    def worker(self, worker: int, deadline: float):
+        rng = random.Random(f"{self.prefix}{worker}")
+        while time.time() < deadline:
+            try:
+                if rng.random() < self.write_ratio:
+                    self.write(rng, worker)
+                else:
+                    self.read(rng)
+            except Exception as e:
+                self._error(f"worker {worker}: {type(e).__name__}: {e}")
+
+    def run(self, threads: int, seconds: float):
+        deadline = time.time() + seconds
+        workers = [threading.Thread(target=self.worker, args=(i, deadline)) for i in range(threads)]
+        for t in workers:
+            t.start()
+        for t in workers:
+            t.join()
+
+
+def snapshot(boost: BusinessBoost) -> Dict:
+    """Reduce a BusinessBoost to the state that must survive a reload."""
+    return {
+        "reviews": {b.id: len(b.reviews) for b in boost.businesses},
+        "favorites": {user: sorted(ids) for user, ids in boost.user_favorites.items() if ids},
+    }
+
+
+def run_process(data_file: str, index: int, args, barrier, results):
+    """Run the threaded stress in one of several processes sharing a data file."""
+    boost = BusinessBoost(data_file=data_file, shared=True, compact_threshold=200,
+                          lazy_reviews=args.lazy_reviews, review_cache_size=args.review_cache_size)
+    stress = Stress(boost, args.write_ratio, prefix=f"p{index}-")
+    stress.run(args.threads, args.seconds)
+    # Wait until every process has stopped writing, then catch up
+    barrier.wait()
+    boost.refresh()
+    results.put({
+        "ops": stress.ops,
+        "errors": stress.errors,
+        "reviews_added": stress.reviews_added,
+        "businesses_added": stress.businesses_added,
+        "favorites": {user: sorted(ids) for user, ids in stress.favorites.items()},
+        "max_readers": stress.max_readers,
+        "snapshot": snapshot(boost),
+    })
+
+
+def run_processes(data_file: str, args) -> List[str]:
+    """Stress several processes sharing one data file; return any errors."""
+    # Create the data file up front so the workers only load it
+    boost = BusinessBoost(data_file=data_file, shared=True, lazy_reviews=args.lazy_reviews)
+    start_reviews = sum(len(b.reviews) for b in boost.businesses)
+    start_businesses = len(boost.businesses)
+
+    print(f"Running {args.processes} processes x {args.threads} threads for {args.seconds:g}s...")
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(args.processes)
+    results = context.Queue()
+    started = time.time()
+    processes = [context.Process(target=run_process, args=(data_file, i, args, barrier, results))
+                 for i in range(args.processes)]
+    for process in processes:
+        process.start()
+    reports = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    elapsed = time.time() - started
+
+    ops: Dict[str, int] = {}
+    for report in reports:
+        for op, count in report["ops"].items():
+            ops[op] = ops.get(op, 0) + count
+    total_ops = sum(ops.values())
+    print(f"{total_ops} operations in {elapsed:.1f}s ({total_ops / elapsed:,.0f} ops/s): "
+          + ", ".join(f"{op} {count}" for op, count in ops.items()))
+    print(f"Most readers holding the lock at once in one process: {max(r['max_readers'] for r in reports)}")
+
+    errors = [message for report in reports for message in report["errors"]]
+    final = BusinessBoost(data_file=data_file, shared=True, lazy_reviews=args.lazy_reviews)
+    expected_reviews = start_reviews + sum(r["reviews_added"] for r in reports)
+    total_reviews = sum(len(b.reviews) for b in final.businesses)
+    if total_reviews != expected_reviews:
+        errors.append(f"expected {expected_reviews} reviews, found {total_reviews}")
+    expected_businesses = start_businesses + sum(r["businesses_added"] for r in reports)
+    if len(final.businesses) != expected_businesses:
+        errors.append(f"expected {expected_businesses} businesses, found {len(final.businesses)}")
+    for report in reports:
+        for username, expected in report["favorites"].items():
+            if sorted(final.user_favorites.get(username, [])) != expected:
+                errors.append(f"favorites for {username} do not match")
+    for i, report in enumerate(reports):
+        if report["snapshot"] != snapshot(final):
+            errors.append(f"process {i} ended with different data than the data file holds")
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stress-test BusinessBoost from many threads.")
+    parser.add_argument("--threads", type=int, default=16, help="number of worker threads (default 16)")
+    parser.add_argument("--seconds", type=float, default=5.0, help="how long to run (default 5)")
+    parser.add_argument("--write-ratio", type=float, default=0.3,
+                        help="fraction of operations that write (default 0.3)")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="processes sharing one data file (default 1)")
+    parser.add_argument("--lazy-reviews", action="store_true",
+                        help="load reviews on demand through a small review cache")
+    parser.add_argument("--review-cache-size", type=int, default=200,
+                        help="reviews the cache holds with --lazy-reviews (default 200)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        data_file = os.path.join(data_dir, "business_data.json")
+        if args.processes > 1:
+            report(run_processes(data_file, args))
+            return
+
+        # A low threshold makes snapshots happen in the middle of the run too
+        boost = BusinessBoost(data_file=data_file, journal=True, compact_threshold=200,
+                              lazy_reviews=args.lazy_reviews, review_cache_size=args.review_cache_size)
+        start_reviews = sum(len(b.reviews) for b in boost.businesses)
+        start_businesses = len(boost.businesses)
+
+        print(f"Running {args.threads} threads for {args.seconds:g}s...")
+        stress = Stress(boost, args.write_ratio)
+        started = time.time()
+        stress.run(args.threads, args.seconds)
+        elapsed = time.time() - started
+
+        total_ops = sum(stress.ops.values())
+        print(f"{total_ops} operations in {elapsed:.1f}s ({total_ops / elapsed:,.0f} ops/s): "
+              + ", ".join(f"{op} {count}" for op, count in stress.ops.items()))
+        print(f"Most readers holding the lock at once: {stress.max_readers}")
+
+        errors = list(stress.errors)
+        total_reviews = sum(len(b.reviews) for b in boost.businesses)
+        if total_reviews != start_reviews + stress.reviews_added:
+            errors.append(f"expected {start_reviews + stress.reviews_added} reviews, found {total_reviews}")
+        if len(boost.businesses) != start_businesses + stress.businesses_added:
+            errors.append(f"expected {start_businesses + stress.businesses_added} businesses, "
+                          f"found {len(boost.businesses)}")
+        for username, expected in stress.favorites.items():
+            if set(boost.user_favorites.get(username, [])) != expected:
+                errors.append(f"favorites for {username} do not match")
+
+        # Whatever was written to disk must reload to the same state
+        reloaded = BusinessBoost(data_file=data_file, journal=True, lazy_reviews=args.lazy_reviews)
+        if snapshot(reloaded) != snapshot(boost):
+            errors.append("reloading the data file gives a different state")
+
+    report(errors)
+
+
+def report(errors: List[str]):
+    """Print the outcome and exit non-zero if anything went wrong."""
+    if errors:
+        for message in errors[:20]:
+            print(f"❌ {message}")
+        if len(errors) > 20:
+            print(f"... and {len(errors) - 20} more")
+        sys.exit(1)
+    print("✅ No lost updates, inconsistent reads or persistence errors")
+
+
+if __name__ == "__main__":
+    main()